@@ -516,7 +516,9 @@ class MaskDialog(MaskDialogBase):
         project_info: ProjectTuple = self.settings.get_project_info()
         mask_property = self.mask_widget.get_mask_property()
         self.settings.set("mask_manager.mask_property", mask_property)
-        mask = calculate_mask_from_project(mask_description=mask_property, project=project_info)
+        mask = calculate_mask_from_project(
+            mask_description=mask_property, project=project_info, workers=os.cpu_count() or 1
+        )
         self.settings.add_history_element(
             create_history_element_from_project(
                 project_info,
@@ -542,9 +544,7 @@ class MaskDialog(MaskDialogBase):
         self.settings.set(
             f"algorithm.{history.segmentation_parameters['algorithm_name']}", history.segmentation_parameters["values"]
         )
-        history.arrays.seek(0)
-        seg = np.load(history.arrays)
-        history.arrays.seek(0)
+        seg = history.get_arrays()
         self.settings.roi = seg["segmentation"]
         if "mask" in seg:
             self.settings.mask = seg["mask"]
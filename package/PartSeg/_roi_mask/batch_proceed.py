@@ -2,7 +2,7 @@ import re
 import sys
 from collections import defaultdict
 from functools import partial
-from os import path
+from os import cpu_count, path
 from queue import Queue
 from typing import List, NamedTuple, Optional, Tuple, Union
 
@@ -73,6 +73,7 @@ class BatchProceed(QThread):
                 name = path.basename(file_path)
                 blank = get_mask(project_tuple.segmentation, project_tuple.mask, project_tuple.selected_components)
                 algorithm: StackAlgorithm = mask_algorithm_dict[task.parameters.algorithm]()
+                algorithm.workers = cpu_count() or 1
                 algorithm.set_image(project_tuple.image)
                 algorithm.set_mask(blank)
                 algorithm.set_parameters(**task.parameters.values)
@@ -74,12 +74,16 @@ class MaskDialog(MaskDialogBase):
         project_info: MaskProjectTuple = self.settings.get_project_info()
         mask_property = self.mask_widget.get_mask_property()
         self.settings.set("mask_manager.mask_property", mask_property)
-        mask = calculate_mask_from_project(mask_description=mask_property, project=project_info)
+        mask = calculate_mask_from_project(
+            mask_description=mask_property, project=project_info, workers=os.cpu_count() or 1
+        )
 
+        previous = self.settings.history_current_element() if self.settings.history_size() else None
         self.settings.add_history_element(
             create_history_element_from_segmentation_tuple(
                 project_info,
                 mask_property,
+                previous,
             )
         )
         self.settings.mask = mask
@@ -88,9 +92,7 @@ class MaskDialog(MaskDialogBase):
 
     def prev_mask(self):
         history: HistoryElement = self.settings.history_pop()
-        history.arrays.seek(0)
-        seg = np.load(history.arrays)
-        history.arrays.seek(0)
+        seg = history.get_arrays()
         self.settings.roi = seg["segmentation"]
         self.settings.set_segmentation(
             seg["segmentation"],
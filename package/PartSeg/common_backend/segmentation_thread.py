@@ -1,3 +1,4 @@
+import os
 import sys
 
 from qtpy.QtCore import QMutex, QThread, Signal
@@ -29,6 +30,8 @@ class SegmentationThread(QThread):
         super().__init__()
         self.finished.connect(self.finished_task)
         self.algorithm = algorithm
+        # interactive calculation, so per layer operations may use all cores
+        self.algorithm.workers = os.cpu_count() or 1
         self.clean_later = False
         self.cache = None
         self.mutex = QMutex()
@@ -5,17 +5,9 @@ import os
 import sys
 from functools import partial
 
-try:
-    from napari._qt.qthreading import wait_for_workers_to_quit
-except ImportError:
-    from napari._qt.threading import wait_for_workers_to_quit
-
-from qtpy.QtCore import Qt
-from qtpy.QtGui import QFontDatabase
-
 from PartSeg import ANALYSIS_NAME, APP_NAME, MASK_NAME
 from PartSeg.common_backend.base_argparser import CustomParser
-from PartSeg.custom_application import CustomApplication
+from PartSegCore.analysis.batch_processing import batch_cli
 from PartSegData import font_dir, icons_dir
 from PartSegImage import TiffImageReader
 
@@ -25,6 +17,7 @@ multiprocessing.freeze_support()
 # noinspection PyUnresolvedReferences,PyUnusedLocal
 def _test_imports():
     print("start_test_import")
+    from qtpy.QtGui import QFontDatabase
     from qtpy.QtWidgets import QApplication
 
     app = QApplication([])
@@ -70,11 +63,30 @@ def main():
     sp_a.add_argument("mask", nargs="?", help="mask to read on begin", default=None)
     sp_a.add_argument("--batch", action="store_true", help=argparse.SUPPRESS)
     sp_s.add_argument("image", nargs="?", help="image to read on begin", default="")
+    sp_b = sp.add_parser("batch", help="Run batch calculation without GUI")
+    sp_b.set_defaults(gui="batch")
+    batch_cli.add_batch_arguments(sp_b)
     argv = [x for x in sys.argv[1:] if not (x.startswith("parent") or x.startswith("pipe"))]
     args = parser.parse_args(argv)
     # print(args)
 
     logging.basicConfig(level=logging.INFO)
+    if args.gui == "batch":
+        sys.exit(batch_cli.main(args))
+    _start_gui(args)
+
+
+def _start_gui(args: argparse.Namespace):
+    try:
+        from napari._qt.qthreading import wait_for_workers_to_quit
+    except ImportError:
+        from napari._qt.threading import wait_for_workers_to_quit
+
+    from qtpy.QtCore import Qt
+    from qtpy.QtGui import QFontDatabase
+
+    from PartSeg.custom_application import CustomApplication
+
     CustomApplication.setAttribute(Qt.AA_EnableHighDpiScaling)
     my_app = CustomApplication(sys.argv, name="PartSeg", icon=os.path.join(icons_dir, "icon.png"))
     my_app.check_release()
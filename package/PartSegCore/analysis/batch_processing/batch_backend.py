@@ -20,9 +20,12 @@ Calculation hierarchy:
    }
 
 """
+import hashlib
 import json
 import logging
 import os
+import pickle  # nosec
+import shutil
 import threading
 import traceback
 import uuid
@@ -31,7 +34,7 @@ from enum import Enum
 from os import path
 from queue import Queue
 from traceback import StackSummary
-from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Type, Union
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Type, Union
 
 import numpy as np
 import pandas as pd
@@ -61,7 +64,7 @@ from PartSegCore.analysis.calculation_plan import (
 from PartSegCore.analysis.io_utils import ProjectTuple
 from PartSegCore.analysis.load_functions import LoadMaskSegmentation, LoadProject, load_dict
 from PartSegCore.analysis.measurement_base import AreaType, PerComponent
-from PartSegCore.analysis.measurement_calculation import MeasurementResult
+from PartSegCore.analysis.measurement_calculation import MeasurementCache, MeasurementResult
 from PartSegCore.analysis.save_functions import save_dict
 from PartSegCore.mask_create import calculate_mask
 from PartSegCore.segmentation.algorithm_base import AdditionalLayerDescription, SegmentationAlgorithm, report_empty_fun
@@ -133,6 +136,8 @@ class CalculationProcess:
         self.history: List[HistoryElement] = []
         self.algorithm_parameters: dict = {}
         self.results: CalculationResultList = []
+        self.algorithm_dict: Dict[Tuple[str, int], Tuple[Optional[np.ndarray], RestartableAlgorithm]] = {}
+        self.measurement_cache = MeasurementCache()
 
     def do_calculation(self, calculation: FileCalculation) -> CalculationResultList:
         """
@@ -172,6 +177,8 @@ class CalculationProcess:
         for project in projects:
             project: ProjectTuple
             self.image = project.image
+            self.algorithm_dict = {}
+            self.measurement_cache.clear()
             if operation == RootType.Mask_project:
                 self.mask = project.mask
             if operation == RootType.Project:
@@ -189,6 +196,8 @@ class CalculationProcess:
                 ResponseData(path.relpath(project.image.file_path, calculation.base_prefix), self.measurement)
             )
             self.measurement = []
+        self.algorithm_dict = {}
+        self.measurement_cache.clear()
         return self.results
 
     def iterate_over(self, node: Union[CalculationTree, List[CalculationTree]]):
@@ -230,6 +239,8 @@ class CalculationProcess:
         self.mask = mask
         self.iterate_over(children)
         self.mask = old_mask
+        self.release_algorithms(mask)
+        self.measurement_cache.invalidate(mask)
 
     def step_segmentation(self, operation: ROIExtractionProfile, children: List[CalculationTree]):
         """
@@ -238,12 +249,7 @@ class CalculationProcess:
         :param ROIExtractionProfile operation: Specification of segmentation operation
         :param List[CalculationTree] children: list of nodes to iterate over after perform segmentation
         """
-        segmentation_class = analysis_algorithm_dict.get(operation.algorithm, None)
-        if segmentation_class is None:  # pragma: no cover
-            raise ValueError(f"Segmentation class {operation.algorithm} do not found")
-        segmentation_algorithm: RestartableAlgorithm = segmentation_class()
-        segmentation_algorithm.set_image(self.image)
-        segmentation_algorithm.set_mask(self.mask)
+        segmentation_algorithm = self.get_algorithm(operation.algorithm)
         segmentation_algorithm.set_parameters(**operation.values)
         result = segmentation_algorithm.calculation_run(report_empty_fun)
         backup_data = self.roi_info, self.additional_layers, self.algorithm_parameters
@@ -251,7 +257,37 @@ class CalculationProcess:
         self.additional_layers = result.additional_layers
         self.algorithm_parameters = {"algorithm_name": operation.algorithm, "values": operation.values}
         self.iterate_over(children)
+        self.measurement_cache.invalidate(self.roi_info)
         self.roi_info, self.additional_layers, self.algorithm_parameters = backup_data
+        self.algorithm_dict[(operation.algorithm, id(self.mask))] = self.mask, segmentation_algorithm
+
+    def get_algorithm(self, algorithm_name: str) -> RestartableAlgorithm:
+        """
+        Get segmentation algorithm instance for current image and mask.
+        Instance used by previous sibling node with the same algorithm is reused, so
+        restart logic of algorithm could skip stages with unchanged parameters.
+        Instance is removed from cache until it is returned by :py:meth:`step_segmentation`,
+        so nested segmentation with the same algorithm and mask do not overwrite its state.
+
+        :param str algorithm_name: name of segmentation algorithm
+        """
+        cached = self.algorithm_dict.pop((algorithm_name, id(self.mask)), None)
+        if cached is not None and cached[0] is self.mask:
+            return cached[1]
+        segmentation_class = analysis_algorithm_dict.get(algorithm_name, None)
+        if segmentation_class is None:  # pragma: no cover
+            raise ValueError(f"Segmentation class {algorithm_name} do not found")
+        segmentation_algorithm: RestartableAlgorithm = segmentation_class()
+        # batch runs files in parallel processes, so each of them use single thread
+        segmentation_algorithm.workers = 1
+        segmentation_algorithm.set_image(self.image)
+        segmentation_algorithm.set_mask(self.mask)
+        return segmentation_algorithm
+
+    def release_algorithms(self, mask: Optional[np.ndarray]):
+        """Remove cached algorithm instances which use ``mask``"""
+        for key in [k for k, (cached_mask, _) in self.algorithm_dict.items() if cached_mask is mask]:
+            del self.algorithm_dict[key]
 
     def step_mask_use(self, operation: MaskUse, children: List[CalculationTree]):
         """
@@ -284,6 +320,8 @@ class CalculationProcess:
         self.mask = mask
         self.iterate_over(children)
         self.mask = old_mask
+        self.release_algorithms(mask)
+        self.measurement_cache.invalidate(mask)
 
     def step_save(self, operation: Save):
         """
@@ -331,6 +369,9 @@ class CalculationProcess:
         self.history.append(history_element)
         self.iterate_over(children)
         self.mask, self.history = backup
+        if operation.name not in self.reused_mask:
+            self.release_algorithms(mask)
+            self.measurement_cache.invalidate(mask)
 
     def step_measurement(self, operation: MeasurementCalculate):
         """
@@ -355,6 +396,7 @@ class CalculationProcess:
             channel,
             self.roi_info,
             operation.units,
+            measurement_context=self.measurement_cache.get_context(self.roi_info, self.mask),
         )
         self.measurement.append(measurement)
         self.image.set_mask(old_mask)
@@ -401,10 +443,111 @@ class CalculationInfo(NamedTuple):
     measurement: List[MeasurementCalculate]
 
 
+class CalculationJournal:
+    """
+    Append only journal of files which calculation finished without errors.
+    It is stored next to measurement file and allows to resume interrupted calculation.
+    First record contains key describing calculation (plan, file list, prefixes and voxel size).
+    Journal with different key is ignored and overwritten.
+
+    :param BaseCalculation calculation: calculation information
+    """
+
+    version = 1
+
+    def __init__(self, calculation: Calculation):
+        self.path = self.journal_path(calculation)
+        self.key = self.calculation_key(calculation)
+        self._file = None
+        self._valid_size = 0
+
+    @staticmethod
+    def journal_path(calculation: BaseCalculation) -> str:
+        return f"{calculation.measurement_file_path}.{calculation.sheet_name.encode('utf8').hex()}.journal"
+
+    @staticmethod
+    def calculation_key(calculation: Calculation) -> str:
+        description = json.dumps(
+            [
+                calculation.calculation_plan,
+                calculation.file_list,
+                calculation.base_prefix,
+                calculation.result_prefix,
+                list(calculation.voxel_size),
+            ],
+            cls=PartEncoder,
+        )
+        return hashlib.sha1(description.encode("utf8")).hexdigest()  # nosec
+
+    def load(self) -> Dict[int, List[ResponseData]]:
+        """
+        Read results stored in journal. Incomplete last record (from interrupted write) is skipped.
+
+        :return: mapping from file index to its results
+        """
+        res = {}
+        self._valid_size = 0
+        if not path.exists(self.path):
+            return res
+        with open(self.path, "rb") as journal_file:
+            try:
+                header = pickle.load(journal_file)  # nosec
+            except Exception:  # pylint: disable=W0703
+                return res
+            if header != {"version": self.version, "key": self.key}:
+                return res
+            self._valid_size = journal_file.tell()
+            while True:
+                try:
+                    index, result_list = pickle.load(journal_file)  # nosec
+                except Exception:  # pylint: disable=W0703
+                    break
+                res[index] = result_list
+                self._valid_size = journal_file.tell()
+        return res
+
+    def open(self):
+        """
+        Open journal for append. Should be called after :py:meth:`load`.
+        If journal cannot be created then calculation is not journaled.
+        """
+        try:
+            if self._valid_size:
+                self._file = open(self.path, "r+b")
+                self._file.seek(self._valid_size)
+                self._file.truncate()
+            else:
+                self._file = open(self.path, "wb")
+                pickle.dump({"version": self.version, "key": self.key}, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+                self._file.flush()
+        except OSError as e:
+            logging.warning(f"Cannot create calculation journal {self.path}: {e}")
+            self.close()
+
+    def add(self, index: int, result_list: List[ResponseData]):
+        """Store results of single file"""
+        if self._file is None:
+            return
+        pickle.dump((index, result_list), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Close and remove journal file"""
+        self.close()
+        if path.exists(self.path):
+            os.remove(self.path)
+
+
 class CalculationManager:
     """
     This class manage batch processing in PartSeg.
-
+    Progress of each calculation is stored in :py:class:`CalculationJournal`,
+    so rerun of interrupted calculation process only files which are not finished.
     """
 
     def __init__(self):
@@ -417,6 +560,7 @@ class CalculationManager:
         self.counter_dict = OrderedDict()
         self.errors_list = []
         self.writer = DataWriter()
+        self.journal_dict: Dict[uuid.UUID, CalculationJournal] = {}
 
     def is_valid_sheet_name(self, excel_path: str, sheet_name: str) -> bool:
         """
@@ -436,14 +580,27 @@ class CalculationManager:
         self.calculation_dict[calculation.uuid] = CalculationInfo(
             calculation, calculation.calculation_plan.get_measurements()
         )
-        self.counter_dict[calculation.uuid] = 0
         size = len(calculation.file_list)
         self.calculation_sizes.append(size)
         self.calculation_size += size
+        self.writer.add_data_part(calculation)
+        journal = CalculationJournal(calculation)
+        finished = journal.load()
+        journal.open()
+        self.journal_dict[calculation.uuid] = journal
+        for ind, result_list in finished.items():
+            for el in result_list:
+                self.writer.add_result(el, calculation, ind=ind)
+        self.counter_dict[calculation.uuid] = len(finished)
+        self.calculation_done += len(finished)
+        if len(finished) == size:
+            self.writer.calculation_finished(calculation, journal)
+            return
         self.batch_manager.add_work(
-            list(enumerate(calculation.file_list)), calculation.get_base_calculation(), do_calculation
+            [(i, file_path) for i, file_path in enumerate(calculation.file_list) if i not in finished],
+            calculation.get_base_calculation(),
+            do_calculation,
         )
-        self.writer.add_data_part(calculation)
 
     @property
     def has_work(self) -> bool:
@@ -477,6 +634,8 @@ class CalculationManager:
             self.calculation_done += 1
             self.counter_dict[uuid_id] += 1
             calculation = self.calculation_dict[uuid_id].calculation
+            if ind != -1 and all(isinstance(el, ResponseData) for el in result_list):
+                self.journal_dict[uuid_id].add(ind, result_list)
             for el in result_list:
                 if isinstance(el, ResponseData):
                     errors = self.writer.add_result(el, calculation, ind=ind)
@@ -492,7 +651,7 @@ class CalculationManager:
                     new_errors.append((file_info, el))
 
                 if self.counter_dict[uuid_id] == len(calculation.file_list):
-                    errors = self.writer.calculation_finished(calculation)
+                    errors = self.writer.calculation_finished(calculation, self.journal_dict[uuid_id])
                     for err in errors:
                         new_errors.append(("", err))
         return BatchResultDescription(
@@ -508,14 +667,14 @@ class FileType(Enum):
 
 class SheetData:
     """
-    Store single sheet information
+    Store single sheet information. Only rows which are not passed yet to writer are kept in memory.
     """
 
     def __init__(self, name: str, columns: List[Tuple[str, str]]):
         self.name = name
         self.columns = pd.MultiIndex.from_tuples([("name", "units")] + columns)
-        self.data_frame = pd.DataFrame([], columns=self.columns)
         self.row_list: List[Any] = []
+        self.rows_written = 0
 
     def add_data(self, data, ind):
         if ind is None:
@@ -529,17 +688,21 @@ class SheetData:
 
     def get_data_to_write(self) -> Tuple[str, pd.DataFrame]:
         """
-        Get data for write
+        Get rows added since last call. Index of returned data frame
+        continues numbering of rows returned in previous calls.
 
         :return: sheet name and data to write
         :rtype: Tuple[str, pd.DataFrame]
         """
         sorted_row = [x[1] for x in sorted(self.row_list)]
-        df = pd.DataFrame(sorted_row, columns=self.columns)
-        df2 = self.data_frame.append(df)
-        self.data_frame = df2.reset_index(drop=True)
+        df = pd.DataFrame(
+            sorted_row,
+            columns=self.columns,
+            index=pd.RangeIndex(self.rows_written, self.rows_written + len(sorted_row)),
+        )
+        self.rows_written += len(sorted_row)
         self.row_list = []
-        return self.name, self.data_frame
+        return self.name, df
 
 
 class FileData:
@@ -549,6 +712,10 @@ class FileData:
     This class run separate thread for writing purpose.
     This need additional synchronisation. but not freeze
 
+    New rows are appended to per sheet files (in :py:attr:`parts_path` directory for excel output)
+    so cost of single write does not depend on number of already calculated files.
+    Excel file is created from them when calculation is finished.
+
     :param BaseCalculation calculation: calculation information
     :param int write_threshold: every how many lines of data are written to disk
     :cvar component_str: separator for per component sheet information
@@ -562,6 +729,7 @@ class FileData:
         :param int write_threshold: every how many lines of data are written to disk
         """
         self.file_path = calculation.measurement_file_path
+        self.parts_path = self.file_path + ".partial"
         ext = path.splitext(calculation.measurement_file_path)[1]
         if ext == ".xlsx":
             self.file_type = FileType.excel_xlsx_file
@@ -569,6 +737,8 @@ class FileData:
             self.file_type = FileType.excel_xls_file
         else:  # pragma: no cover
             self.file_type = FileType.text_file
+        if self.file_type != FileType.text_file and path.exists(self.parts_path):
+            shutil.rmtree(self.parts_path, ignore_errors=True)
         self.writing = False
         data = SheetData("calculation_info", [("Description", "str"), ("JSON", "str")])
         data.add_data([str(calculation.calculation_plan), json.dumps(calculation.calculation_plan, cls=PartEncoder)], 0)
@@ -691,9 +861,12 @@ class FileData:
         self.new_count += 1
         self._error_info.append((file_path, str(error_description)))
 
-    def dump_data(self):
+    def dump_data(self, finalize: bool = False, journal: Optional[CalculationJournal] = None):
         """
         Fire writing data to disc
+
+        :param bool finalize: if excel file should be created from already written data
+        :param journal: journal to be removed when data are written
         """
         data = []
         for main_sheet, component_sheets, _ in self.sheet_dict.values():
@@ -702,36 +875,87 @@ class FileData:
                 if sheet is not None:
                     data.append(sheet.get_data_to_write())
         segmentation_info = [x for x in self.calculation_info.values()]
-        self.wrote_queue.put((data, segmentation_info, self._error_info[:]))
+        self.wrote_queue.put((data, segmentation_info, self._error_info[:], finalize, journal))
+
+    def _part_path(self, sheet_name: str) -> str:
+        return path.join(self.parts_path, sheet_name.encode("utf8").hex() + ".pkl")
+
+    def append_parts(self, sheets: List[Tuple[str, pd.DataFrame]]):
+        """Append new rows to files with partial results"""
+        os.makedirs(self.parts_path, exist_ok=True)
+        for sheet_name, data_frame in sheets:
+            if data_frame.empty:
+                continue
+            with open(self._part_path(sheet_name), "ab") as part_file:
+                pickle.dump(data_frame, part_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def read_part(self, sheet_name: str, columns: pd.MultiIndex) -> pd.DataFrame:
+        """Read all rows of given sheet written with :py:meth:`append_parts`"""
+        chunks = []
+        part_path = self._part_path(sheet_name)
+        if path.exists(part_path):
+            with open(part_path, "rb") as part_file:
+                while True:
+                    try:
+                        chunks.append(pickle.load(part_file))  # nosec
+                    except EOFError:
+                        break
+        if not chunks:
+            return pd.DataFrame([], columns=columns)
+        return pd.concat(chunks)
+
+    def append_csv(self, sheets: List[Tuple[str, pd.DataFrame]], created_files: Set[str]):
+        """Append new rows to text files. First write for each sheet creates file with header."""
+        base_path, ext = path.splitext(self.file_path)
+        for sheet_name, data_frame in sheets:
+            file_path = base_path + "_" + sheet_name + ext
+            if file_path not in created_files:
+                data_frame.to_csv(file_path)
+                created_files.add(file_path)
+            elif not data_frame.empty:
+                data_frame.to_csv(file_path, mode="a", header=False)
 
     def wrote_data_to_file(self):
         """
         Main function to write data to hard drive.
         It is executed in separate thread.
         """
+        created_files = set()
+        materialized = True
         while True:
             data = self.wrote_queue.get()
             if data == "finish":
+                if materialized:
+                    shutil.rmtree(self.parts_path, ignore_errors=True)
                 break
             self.writing = True
             try:
+                sheets, plans, errors, finalize, journal = data
                 if self.file_type == FileType.text_file:
-                    base_path, ext = path.splitext(self.file_path)
-                    for sheet_name, data_frame in data[0]:
-                        data_frame.to_csv(base_path + "_" + sheet_name + ext)
+                    self.append_csv(sheets, created_files)
+                    if journal is not None:
+                        journal.remove()
+                    continue
+                self.append_parts(sheets)
+                materialized = False
+                if not finalize:
                     continue
+                full_sheets = [(name, self.read_part(name, data_frame.columns)) for name, data_frame in sheets]
                 file_path = self.file_path
                 i = 0
                 while i < 100:
                     i += 1
                     try:
-                        self.write_to_excel(file_path, data)
+                        self.write_to_excel(file_path, (full_sheets, plans, errors))
                         break
                     except (PermissionError, OSError):
                         base, ext = path.splitext(self.file_path)
                         file_path = f"{base}({i}){ext}"
                 if i == 100:  # pragma: no cover
                     raise PermissionError(f"Fail to write result excel {self.file_path}")
+                materialized = True
+                if journal is not None:
+                    journal.remove()
             except Exception as e:  # pragma: no cover
                 logging.error(f"[batch_backend] {e}")
                 self.error_queue.put(prepare_error_data(e))
@@ -799,8 +1023,15 @@ class FileData:
             res.append(self.error_queue.get())
         return res
 
-    def finish(self):
+    def finish(self, wait: bool = False):
+        """
+        Close file after all pending data are written.
+
+        :param bool wait: block until writing thread ends
+        """
         self.wrote_queue.put("finish")
+        if wait:
+            self.write_thread.join()
 
     def is_empty_sheet(self, sheet_name) -> bool:
         return self.good_sheet_name(sheet_name)[0]
@@ -860,19 +1091,25 @@ class DataWriter:
         """check if all data are written to disc"""
         return all(x.finished() for x in self.file_dict.values())
 
-    def finish(self):
-        """close all files"""
+    def finish(self, wait: bool = False):
+        """
+        close all files
+
+        :param bool wait: block until all data are written to disc
+        """
         for file_data in self.file_dict.values():
-            file_data.finish()
+            file_data.finish(wait)
 
-    def calculation_finished(self, calculation) -> List[ErrorInfo]:
+    def calculation_finished(self, calculation, journal: Optional[CalculationJournal] = None) -> List[ErrorInfo]:
         """
         Force write data for given calculation.
 
+        :param calculation: finished calculation
+        :param journal: journal of calculation which should be removed after data are written
         :raises ValueError: when measurement is not added with :py:meth:`.add_data_part`
         :return: list of errors during write.
         """
         if calculation.measurement_file_path not in self.file_dict:
             raise ValueError("Unknown measurement file")
-        self.file_dict[calculation.measurement_file_path].dump_data()
+        self.file_dict[calculation.measurement_file_path].dump_data(finalize=True, journal=journal)
         return self.file_dict[calculation.measurement_file_path].get_errors()
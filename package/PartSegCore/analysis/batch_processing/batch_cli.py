@@ -0,0 +1,211 @@
+"""
+This module contains headless batch processing which could be run from command line without GUI.
+It is exposed as ``PartSeg batch`` subcommand.
+
+Example::
+
+    PartSeg batch plans.json "data/**/*.tif" -o result.xlsx -j 8
+
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from typing import Iterable, List, Optional, TextIO
+
+from PartSegCore import plugins
+from PartSegCore.analysis.batch_processing.batch_backend import CalculationManager, ErrorInfo
+from PartSegCore.analysis.calculation_plan import Calculation, CalculationPlan
+from PartSegCore.analysis.load_functions import load_metadata
+from PartSegCore.universal_const import UNIT_SCALE, Units
+
+
+def load_plan(plan_path: str, plan_name: Optional[str] = None) -> CalculationPlan:
+    """
+    Load calculation plan from json file. File could contain single plan
+    or dict of plans (format used by export from GUI).
+
+    :param plan_path: path to json file
+    :param plan_name: name of plan to choose if file contains more than one plan
+    :raise ValueError: if plan could not be unambiguously chosen
+    """
+    data = load_metadata(plan_path)
+    if isinstance(data, CalculationPlan):
+        return data
+    if not isinstance(data, dict) or not data or not all(isinstance(x, CalculationPlan) for x in data.values()):
+        raise ValueError(f"File {plan_path} does not contain calculation plan")
+    if plan_name is not None:
+        if plan_name not in data:
+            raise ValueError(f"Plan {plan_name} not found in {plan_path}. Available plans: {', '.join(data)}")
+        return data[plan_name]
+    if len(data) != 1:
+        raise ValueError(f"File {plan_path} contains more than one plan. Choose one of: {', '.join(data)}")
+    return next(iter(data.values()))
+
+
+def collect_files(patterns: Iterable[str], file_list: Optional[str] = None) -> List[str]:
+    """
+    Collect paths of files to process.
+
+    :param patterns: paths or glob patterns (``**`` is supported)
+    :param file_list: path to text file with one path per line
+    :return: sorted list of unique absolute paths
+    """
+    res = set()
+    for pattern in patterns:
+        res.update(x for x in glob.glob(pattern, recursive=True) if os.path.isfile(x))
+    if file_list is not None:
+        with open(file_list) as f_p:
+            res.update(line.strip() for line in f_p if line.strip())
+    return sorted(os.path.abspath(x) for x in res)
+
+
+def prepare_calculation(
+    file_list: List[str],
+    calculation_plan: CalculationPlan,
+    measurement_file_path: str,
+    sheet_name: str = "Sheet1",
+    base_prefix: Optional[str] = None,
+    result_prefix: Optional[str] = None,
+    voxel_size=(10 ** -6, 10 ** -6, 10 ** -6),
+) -> Calculation:
+    """
+    Create :py:class:`.Calculation` with the same defaults as batch window in GUI.
+    If ``base_prefix`` is not provided then common directory of all files is used.
+    ``result_prefix`` default to ``base_prefix``.
+    """
+    if base_prefix is None:
+        base_prefix = os.path.commonpath(file_list) if file_list else os.getcwd()
+        if not os.path.isdir(base_prefix):
+            base_prefix = os.path.dirname(base_prefix)
+    if result_prefix is None:
+        result_prefix = base_prefix
+    return Calculation(
+        file_list,
+        base_prefix=base_prefix,
+        result_prefix=result_prefix,
+        measurement_file_path=os.path.abspath(measurement_file_path),
+        sheet_name=sheet_name,
+        calculation_plan=calculation_plan,
+        voxel_size=voxel_size,
+    )
+
+
+def format_error(file_path: str, error: ErrorInfo, verbose: bool = False) -> str:
+    exception, trace = error
+    if isinstance(trace, tuple):
+        trace = trace[1]
+    text = f"Error: {file_path}: {exception!r}" if file_path else f"Error: {exception!r}"
+    if verbose and trace:
+        text += "\n" + "".join(traceback.format_list(trace)).rstrip()
+    return text
+
+
+def run_calculation(
+    calculation: Calculation,
+    workers: int = 1,
+    stream: Optional[TextIO] = None,
+    verbose: bool = False,
+    refresh_interval: float = 0.1,
+) -> int:
+    """
+    Run calculation with :py:class:`.CalculationManager` and report progress and errors to ``stream``.
+
+    :param calculation: calculation to perform
+    :param workers: number of worker process
+    :param stream: stream to write progress information, default is :py:data:`sys.stdout`
+    :param verbose: print traceback of errors
+    :param refresh_interval: time between checks of calculation status
+    :return: number of errors
+    """
+    if stream is None:
+        stream = sys.stdout
+    manager = CalculationManager()
+    manager.set_number_of_workers(workers)
+    manager.add_calculation(calculation)
+    total = len(calculation.file_list)
+    errors = 0
+    done = manager.calculation_done
+    start = time.time()
+    if done:
+        print(f"Resume calculation, {done} files already processed", file=stream)
+    print(f"Processing {total - done} files with {workers} workers", file=stream, flush=True)
+    while manager.has_work:
+        time.sleep(refresh_interval)
+        res = manager.get_results()
+        for file_path, error in res.errors:
+            errors += 1
+            print(format_error(file_path, error, verbose), file=stream)
+        if res.global_counter != done:
+            done = res.global_counter
+            print(f"[{done}/{total}] {time.time() - start:.1f}s", file=stream)
+        stream.flush()
+    manager.writer.finish(wait=True)
+    print(
+        f"Finished {total} files in {time.time() - start:.1f}s with {errors} errors. "
+        f"Result saved in {calculation.measurement_file_path}",
+        file=stream,
+        flush=True,
+    )
+    return errors
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser):
+    """Add arguments of batch subcommand to parser"""
+    parser.add_argument("plan", help="path to json file with calculation plan (could be exported from GUI)")
+    parser.add_argument("files", nargs="*", help="files or glob patterns (quote it to use recursive **)")
+    parser.add_argument("-o", "--output", required=True, help="path to measurement result file (xlsx or csv)")
+    parser.add_argument("--plan_name", default=None, help="name of plan if file contains more than one")
+    parser.add_argument("--file_list", default=None, help="text file with list of files to process, one per line")
+    parser.add_argument("--sheet_name", default="Sheet1", help="name of sheet in result file")
+    parser.add_argument("--base_prefix", default=None, help="data prefix, default is common directory of all files")
+    parser.add_argument("--result_prefix", default=None, help="prefix for saved files, default is data prefix")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="number of worker process, default is number of cpu",
+    )
+    parser.add_argument(
+        "--voxel_size",
+        type=float,
+        nargs=3,
+        default=(1000, 1000, 1000),
+        metavar=("Z", "Y", "X"),
+        help="voxel size in nanometers for files without this information in metadata",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="print traceback of errors")
+
+
+def main(args: argparse.Namespace, stream: Optional[TextIO] = None) -> int:
+    """
+    Run batch calculation described by parsed arguments.
+
+    :return: exit code
+    """
+    plugins.register()
+    try:
+        plan = load_plan(args.plan, args.plan_name)
+    except (ValueError, OSError) as e:
+        print(f"Cannot load calculation plan: {e}", file=sys.stderr)
+        return 2
+    file_list = collect_files(args.files, args.file_list)
+    if not file_list:
+        print("No files to process", file=sys.stderr)
+        return 2
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    calculation = prepare_calculation(
+        file_list,
+        plan,
+        args.output,
+        sheet_name=args.sheet_name,
+        base_prefix=args.base_prefix,
+        result_prefix=args.result_prefix,
+        voxel_size=tuple(x / UNIT_SCALE[Units.nm.value] for x in args.voxel_size),
+    )
+    errors = run_calculation(calculation, max(args.workers, 1), stream=stream, verbose=args.verbose)
+    return 1 if errors else 0
@@ -7,6 +7,13 @@ Main workflow is to add work with :py:meth:`BatchManager.add_work`
 and consume results (:py:meth:`BatchManager.get_result`) until
 :py:attr:`BatchManager.has_work` is evaluating to true
 
+Each :py:class:`BatchWorker` is connected with manager by its own pipe and blocks on it
+until the next task or :py:attr:`SubprocessOrder.kill` sentinel arrives.
+Dispatching is done by a single thread of :py:class:`BatchManager` which waits on all pipes
+and hands the next pending task to a worker just after it returns a result.
+Global parameters of work are sent only with the first task of given work passed to worker
+and are cached on worker side.
+
 .. graphviz::
 
    digraph foo {
@@ -18,13 +25,14 @@ import logging
 import multiprocessing
 import os
 import sys
-import time
 import traceback
 import uuid
+from collections import deque
 from enum import Enum
+from multiprocessing.connection import Connection, wait
 from queue import Empty, Queue
-from threading import RLock, Timer
-from typing import Any, Callable, Dict, List, Tuple
+from threading import Lock, RLock, Thread
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
 
 __author__ = "Grzegorz Bokota"
 
@@ -38,31 +46,56 @@ class SubprocessOrder(Enum):
     wait = 2
 
 
+class WorkerInfo:
+    """
+    Manager side state of single worker process.
+
+    :param process: worker process
+    :param connection: manager end of worker pipe
+    """
+
+    def __init__(self, process: multiprocessing.Process, connection: Connection):
+        self.process = process
+        self.connection = connection
+        self.task: Optional[Tuple[Any, uuid.UUID]] = None
+        self.known_calculations: Set[uuid.UUID] = set()
+
+    @property
+    def busy(self) -> bool:
+        return self.task is not None
+
+
 class BatchManager:
     """
     This class is used for manage pending works.
     It use :py:class:`.BatchWorker` for running calculation.
 
-    :type task_queue: Queue
-    :type order_queue: Queue
+    :type task_queue: Deque[Tuple[Any, uuid.UUID]]
     :type result_queue: Queue
     :type calculation_dict: dict
     :type process_list: list[multiprocessing.Process]
     """
 
     def __init__(self):
-        self.manager = multiprocessing.Manager()
-        self.task_queue = self.manager.Queue()
-        self.order_queue = self.manager.Queue()
-        self.result_queue = self.manager.Queue()
-        self.calculation_dict = self.manager.dict()
+        self.task_queue: Deque[Tuple[Any, uuid.UUID]] = deque()
+        self.result_queue = Queue()
+        self.calculation_dict: Dict[uuid.UUID, Tuple[Any, Callable[[Any, Any], Any]]] = {}
         self.number_off_available_process = 1
-        self.number_off_process = 0
-        self.number_off_alive_process = 0
         self.work_task = 0
         self.in_work = False
         self.process_list = []
+        self.workers: List[WorkerInfo] = []
         self.locker = RLock()
+        self._wakeup_reader, self._wakeup_writer = multiprocessing.Pipe(duplex=False)
+        # separated from locker, so sending wakeup never waits for dispatcher
+        self._wakeup_lock = Lock()
+        self._wakeup_pending = False
+        self._dispatcher: Optional[Thread] = None
+
+    @property
+    def number_off_process(self) -> int:
+        """Number of workers which accept new tasks"""
+        return len(self.workers)
 
     def get_result(self) -> List[Tuple[uuid.UUID, Any]]:
         """
@@ -72,12 +105,17 @@ class BatchManager:
             function result or tuple with exception as first argument and second is traceback
         """
         res = []
-        while not self.result_queue.empty():
-            res.append(self.result_queue.get())
-        self.work_task -= len(res)
-        if self.work_task == 0:
-            logging.debug("computation finished")
-            Timer(0.1, self._change_process_num, args=[-self.number_off_available_process]).start()
+        while True:
+            try:
+                res.append(self.result_queue.get_nowait())
+            except Empty:
+                break
+        with self.locker:
+            self.work_task -= len(res)
+            if self.work_task == 0 and res:
+                logging.debug("computation finished")
+                self.in_work = False
+        self._ensure_workers()
         return res
 
     def add_work(self, individual_parameters_list: List, global_parameters, fun: Callable[[Any, Any], Any]) -> str:
@@ -92,29 +130,51 @@ class BatchManager:
             First argument is task specific, second is const for whole work.
         :return: work uuid
         """
-        self.calculation_dict[global_parameters.uuid] = global_parameters, fun
-        self.work_task += len(individual_parameters_list)
         if hasattr(global_parameters, "uuid"):
             task_uuid = global_parameters.uuid
         else:
             task_uuid = uuid.uuid4()
-        for el in individual_parameters_list:
-            self.task_queue.put((el, task_uuid))
-        if self.number_off_available_process > self.number_off_process:
-            for _ in range(self.number_off_available_process - self.number_off_process):
-                self._spawn_process()
-        self.in_work = True
+        with self.locker:
+            self.calculation_dict[task_uuid] = global_parameters, fun
+            self.work_task += len(individual_parameters_list)
+            self.task_queue.extend((el, task_uuid) for el in individual_parameters_list)
+            self.in_work = True
+            if self._dispatcher is None:
+                self._dispatcher = Thread(target=self._dispatch_loop, daemon=True)
+                self._dispatcher.start()
+        self._ensure_workers(wakeup=True)
         return task_uuid
 
+    def _wakeup(self):
+        """Wake up dispatcher. At most one message is pending in pipe, so it never blocks."""
+        with self._wakeup_lock:
+            if not self._wakeup_pending:
+                self._wakeup_pending = True
+                self._wakeup_writer.send(None)
+
+    def _ensure_workers(self, wakeup: bool = False):
+        """
+        Start missing workers if there are pending tasks and wake up dispatcher if workers were started.
+        New processes are started only from this method to not fork from dispatcher thread.
+
+        :param wakeup: wake up dispatcher also if no worker was started (for example on new tasks)
+        """
+        with self.locker:
+            missed = min(self.number_off_available_process - len(self.workers), len(self.task_queue))
+            for _ in range(missed):
+                self._spawn_process()
+        # outside locker, dispatcher holds it while handling results
+        if wakeup or missed > 0:
+            self._wakeup()
+
     def _spawn_process(self):
         with self.locker:
-            process = multiprocessing.Process(
-                target=spawn_worker, args=(self.task_queue, self.order_queue, self.result_queue, self.calculation_dict)
-            )
+            manager_end, worker_end = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=spawn_worker, args=(worker_end,), daemon=True)
             process.start()
+            worker_end.close()
+            self.workers.append(WorkerInfo(process, manager_end))
             self.process_list.append(process)
-            self.number_off_alive_process += 1
-            self.number_off_process += 1
 
     @property
     def has_work(self) -> bool:
@@ -122,61 +182,102 @@ class BatchManager:
         return self.work_task > 0 or (not self.result_queue.empty())
 
     def kill_jobs(self):
-        for p in self.process_list:
-            p.terminate()
+        with self.locker:
+            self.work_task -= len(self.task_queue)
+            self.task_queue.clear()
+            for p in self.process_list:
+                p.terminate()
 
     def set_number_of_process(self, num: int):
         """
-        Change number of workers which should be used for calculation
+        Change number of workers which should be used for calculation.
+        Additional workers are started immediately if there is pending work.
+        Superfluous workers are stopped after they finish current task.
 
         :param num: target number of process
         """
-        process_diff = num - self.number_off_available_process
-        logging.debug(f"[set_number_of_process] process diff: {process_diff}")
+        logging.debug(f"[set_number_of_process] process diff: {num - self.number_off_available_process}")
         self.number_off_available_process = num
-        if not self.has_work:
-            return
-        self._change_process_num(process_diff)
+        if self._dispatcher is not None:
+            self._ensure_workers(wakeup=True)
 
-    def _change_process_num(self, process_diff):
-        if process_diff > 0:
-            for _ in range(process_diff):
-                self._spawn_process()
-        else:
-            for _ in range(-process_diff):
-                logging.debug("[set_number_of_process] process kill")
-                self.order_queue.put(SubprocessOrder.kill)
-            with self.locker:
-                self.number_off_process += process_diff
+    def _retire_worker(self, worker: WorkerInfo):
+        logging.debug("[set_number_of_process] process kill")
+        self.workers.remove(worker)
+        try:
+            worker.connection.send(SubprocessOrder.kill)
+        except (BrokenPipeError, OSError):  # pragma: no cover
+            pass
+        worker.connection.close()
+
+    def _worker_died(self, worker: WorkerInfo):
+        """Release resources of worker which ends without sentinel and report its current task as failed"""
+        logging.warning(f"Worker process {worker.process.pid} died")
+        self.workers.remove(worker)
+        worker.connection.close()
+        if worker.task is not None:
+            exc = RuntimeError(f"Worker process ended with exit code {worker.process.exitcode}")
+            self.result_queue.put((worker.task[1], (-1, [(exc, traceback.StackSummary())])))
+            worker.task = None
+
+    def _schedule(self):
+        """Adjust number of workers and pass pending tasks to idle ones"""
+        with self.locker:
+            for worker in [x for x in self.workers if not x.busy]:
+                if not self.task_queue or len(self.workers) > self.number_off_available_process:
+                    self._retire_worker(worker)
+            for worker in self.workers:
+                if not self.task_queue:
+                    break
+                if worker.busy:
+                    continue
+                task = self.task_queue.popleft()
+                if task[1] in worker.known_calculations:
+                    message = task
+                else:
+                    message = task + self.calculation_dict[task[1]]
+                try:
+                    worker.connection.send(message)
+                    worker.task = task
+                    worker.known_calculations.add(task[1])
+                except (BrokenPipeError, OSError):  # pragma: no cover
+                    self.task_queue.appendleft(task)
             self.join_all()
 
+    def _dispatch_loop(self):
+        while True:
+            with self.locker:
+                connections = {worker.connection: worker for worker in self.workers}
+            for ready in wait(list(connections) + [self._wakeup_reader]):
+                if ready is self._wakeup_reader:
+                    with self._wakeup_lock:
+                        self._wakeup_pending = False
+                        while self._wakeup_reader.poll():
+                            self._wakeup_reader.recv()
+                    continue
+                worker = connections[ready]
+                with self.locker:
+                    if worker not in self.workers:  # pragma: no cover
+                        continue
+                    try:
+                        self.result_queue.put(ready.recv())
+                        worker.task = None
+                    except (EOFError, OSError):
+                        self._worker_died(worker)
+            self._schedule()
+
     def join_all(self):
-        logging.debug("Join begin {} {}".format(len(self.process_list), self.number_off_process))
+        """Join process which already ends"""
         with self.locker:
-            if len(self.process_list) > self.number_off_process:
-                to_remove = []
-                logging.debug(f"Process list start {self.process_list}")
-                for p in self.process_list:
-                    if not p.is_alive():
-                        p.join()
-                        self.number_off_alive_process -= 1
-                        to_remove.append(p)
-                for p in to_remove:
-                    self.process_list.remove(p)
-                self.number_off_alive_process -= len(to_remove)
-                logging.debug(f"Process list end {self.process_list}")
-                # FIXME self.number_off_alive_process,  self.number_off_process negative values
-                if len(self.process_list) > self.number_off_process and len(self.process_list) > 0:
-                    logging.info(
-                        "Wait on process, time {}, {}, {}, {}".format(
-                            time.time(), self.number_off_alive_process, len(self.process_list), self.number_off_process
-                        )
-                    )
-                    Timer(1, self.join_all).start()
+            to_remove = [p for p in self.process_list if not p.is_alive()]
+            for p in to_remove:
+                p.join()
+                self.process_list.remove(p)
 
     @property
     def finished(self):
         """Check if any process is running"""
+        self.join_all()
         logging.debug(self.process_list)
         return len(self.process_list) == 0
 
@@ -185,80 +286,53 @@ class BatchWorker:
     """
     Worker spawned by :py:class:`BatchManager` instance
 
-    :param task_queue: Queue with task data
-    :param order_queue: Queue with additional orders (like kill)
-    :param result_queue: Queue to put result
-    :param calculation_dict: to store global parameters of task
+    :param connection: pipe to receive tasks and send results
     """
 
-    def __init__(
-        self,
-        task_queue: Queue,
-        order_queue: Queue,
-        result_queue: Queue,
-        calculation_dict: Dict[uuid.UUID, Tuple[Any, Callable[[Any, Any], Any]]],
-    ):
-        self.task_queue = task_queue
-        self.order_queue = order_queue
-        self.result_queue = result_queue
-        self.calculation_dict = calculation_dict
-
-    def calculate_task(self, val: Tuple[Any, uuid.UUID]):
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.calculation_dict: Dict[uuid.UUID, Tuple[Any, Callable[[Any, Any], Any]]] = {}
+
+    def calculate_task(self, val: Tuple):
         """
         Calculate single task.
-        ``val`` is tuple with two elements (task_data, uuid).
-        function and global parameters are obtained from :py:attr:`.calculation_dict`
+        ``val`` is tuple (task_data, uuid) or (task_data, uuid, global_data, function).
+        Second form is used for first task of given work and global data are stored in :py:attr:`calculation_dict`
         """
-        data, task_uuid = val
+        data, task_uuid = val[:2]
+        if len(val) == 4:
+            self.calculation_dict[task_uuid] = val[2:]
         global_data, fun = self.calculation_dict[task_uuid]
         try:
             res = fun(data, global_data)
-            self.result_queue.put((task_uuid, res))
+            self.connection.send((task_uuid, res))
         except Exception as e:  # pragma: no cover
             traceback.print_exc()
             exc_type, _exc_obj, exc_tb = sys.exc_info()
             f_name = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
             print(exc_type, f_name, exc_tb.tb_lineno, file=sys.stderr)
-            self.result_queue.put((task_uuid, (-1, [(e, traceback.extract_tb(e.__traceback__))])))
+            self.connection.send((task_uuid, (-1, [(e, traceback.extract_tb(e.__traceback__))])))
 
     def run(self):
         """Worker main loop"""
         logging.debug(f"Process started {os.getpid()}")
         while True:
-            if not self.order_queue.empty():
-                try:
-                    order = self.order_queue.get_nowait()
-                    logging.debug(f"Order message: {order}")
-                    if order == SubprocessOrder.kill:
-                        break
-                except Empty:  # pragma: no cover
-                    pass
-            if not self.task_queue.empty():
-                try:
-                    task = self.task_queue.get_nowait()
-                    self.calculate_task(task)
-                except Empty:
-                    time.sleep(0.1)
-                    continue
-                except MemoryError:  # pragma: no cover
-                    pass
-                except OSError:  # pragma: no cover
-                    pass
-                except Exception as ex:  # pragma: no cover
-                    logging.warning(f"Unsupported exception {ex}")
-            else:
-                time.sleep(0.1)
+            try:
+                task = self.connection.recv()
+            except EOFError:
+                break
+            if task == SubprocessOrder.kill:
+                break
+            self.calculate_task(task)
+        self.connection.close()
         logging.info(f"Process {os.getpid()} ended")
 
 
-def spawn_worker(task_queue: Queue, order_queue: Queue, result_queue: Queue, calculation_dict: Dict[uuid.UUID, Any]):
+def spawn_worker(connection: Connection):
     """
     Function for spawning worker. Designed as argument for :py:meth:`multiprocessing.Process`.
 
-    :param task_queue: Queue with tasks
-    :param order_queue: Queue with additional orders (like kill)
-    :param result_queue: Queue for calculation result
-    :param calculation_dict: dict with global parameters
+    :param connection: worker end of pipe created by :py:class:`BatchManager`
     """
-    worker = BatchWorker(task_queue, order_queue, result_queue, calculation_dict)
+    worker = BatchWorker(connection)
     worker.run()
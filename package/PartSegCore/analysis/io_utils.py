@@ -12,7 +12,9 @@ from PartSegCore.segmentation.algorithm_base import AdditionalLayerDescription
 from PartSegCore.utils import numpy_repr
 from PartSegImage import Image
 
-project_version_info = packaging.version.Version("1.1")
+project_version_info = packaging.version.Version("2.0")
+# last version of project format which could be read by PartSeg before introduction of format 2.0
+project_version_info_v1 = packaging.version.Version("1.1")
 
 
 @dataclass(frozen=True)
@@ -5,7 +5,7 @@ import tarfile
 import typing
 from copy import copy
 from functools import partial
-from io import BufferedIOBase, BytesIO, IOBase, RawIOBase, TextIOBase
+from io import BufferedIOBase, BufferedReader, BytesIO, IOBase, RawIOBase, TextIOBase
 from pathlib import Path
 from threading import Lock
 
@@ -15,16 +15,18 @@ from packaging.version import Version
 from packaging.version import parse as parse_version
 from tifffile import TiffFile
 
-from PartSegImage import GenericImageReader
+from PartSegImage import GenericImageReader, Image
 
 from ..algorithm_describe_base import Register, ROIExtractionProfile
 from ..io_utils import (
     HistoryElement,
     LoadBase,
     SegmentationType,
+    TarMemberBuffer,
     UpdateLoadedMetadataBase,
     WrongFileTypeException,
     check_segmentation_type,
+    load_chunked_array,
     open_tar_file,
     proxy_callback,
     tar_to_buff,
@@ -50,22 +52,58 @@ __all__ = [
 ]
 
 
+def _load_project_arrays_v1(tar_file: tarfile.TarFile, file_path: str, version: Version):
+    image_buffer = BytesIO()
+    image_tar = tar_file.extractfile(tar_file.getmember("image.tif"))
+    image_buffer.write(image_tar.read())
+    image_buffer.seek(0)
+    reader = GenericImageReader()
+    image = reader.read(image_buffer, ext=".tif")
+    image.file_path = file_path
+    if version == Version("1.0"):
+        seg_dict = np.load(tar_to_buff(tar_file, "segmentation.npz"))
+        mask = seg_dict["mask"] if "mask" in seg_dict else None
+        segmentation = seg_dict["segmentation"]
+    else:
+        segmentation = tifffile.imread(tar_to_buff(tar_file, "segmentation.tif"))
+        if "mask.tif" in tar_file.getnames():
+            mask = tifffile.imread(tar_to_buff(tar_file, "mask.tif"))
+            if np.max(mask) == 1:
+                mask = mask.astype(np.bool)
+        else:
+            mask = None
+    return image, segmentation, mask
+
+
+def _load_project_arrays_v2(tar_file: tarfile.TarFile, file_path: str):
+    index = json.loads(tar_file.extractfile("index.json").read())
+    arrays = index["arrays"]
+    image_info = index["image"]
+    image = Image(
+        load_chunked_array(tar_file, arrays["image"]),
+        tuple(image_info["spacing"]),
+        file_path=file_path,
+        default_coloring=image_info["coloring"],
+        ranges=[tuple(x) for x in image_info["ranges"]],
+        labels=image_info["labels"],
+        axes_order=image_info["axes_order"],
+    )
+    segmentation = load_chunked_array(tar_file, arrays["roi"])
+    mask = load_chunked_array(tar_file, arrays["mask"]) if "mask" in arrays else None
+    return image, segmentation, mask
+
+
 def load_project(
     file: typing.Union[str, Path, tarfile.TarFile, TextIOBase, BufferedIOBase, RawIOBase, IOBase]
 ) -> ProjectTuple:
-    """Load project from archive"""
+    """
+    Load project from archive. If project is saved in format version 2 in uncompressed file,
+    then history arrays are read on first usage (see :py:class:`.TarMemberBuffer`).
+    """
     tar_file, file_path = open_tar_file(file)
     try:
         if check_segmentation_type(tar_file) != SegmentationType.analysis:
             raise WrongFileTypeException()
-        image_buffer = BytesIO()
-        image_tar = tar_file.extractfile(tar_file.getmember("image.tif"))
-        image_buffer.write(image_tar.read())
-        image_buffer.seek(0)
-        reader = GenericImageReader()
-        image = reader.read(image_buffer, ext=".tif")
-        image.file_path = file_path
-
         algorithm_str = tar_file.extractfile("algorithm.json").read()
         algorithm_dict = load_metadata(algorithm_str)
         algorithm_dict = update_algorithm_dict(algorithm_dict)
@@ -74,27 +112,25 @@ def load_project(
             version = parse_version(json.loads(tar_file.extractfile("metadata.json").read())["project_version_info"])
         except KeyError:
             version = Version("1.0")
-        if version == Version("1.0"):
-            seg_dict = np.load(tar_to_buff(tar_file, "segmentation.npz"))
-            mask = seg_dict["mask"] if "mask" in seg_dict else None
-            segmentation = seg_dict["segmentation"]
+        if version >= Version("2.0"):
+            image, segmentation, mask = _load_project_arrays_v2(tar_file, file_path)
         else:
-            segmentation = tifffile.imread(tar_to_buff(tar_file, "segmentation.tif"))
-            if "mask.tif" in tar_file.getnames():
-                mask = tifffile.imread(tar_to_buff(tar_file, "mask.tif"))
-                if np.max(mask) == 1:
-                    mask = mask.astype(np.bool)
-            else:
-                mask = None
+            image, segmentation, mask = _load_project_arrays_v1(tar_file, file_path, version)
+        # members of uncompressed tar could be read later directly from file
+        lazy_history = isinstance(file, (str, Path)) and isinstance(tar_file.fileobj, BufferedReader)
 
         history = []
         try:
             history_buff = tar_file.extractfile(tar_file.getmember("history/history.json")).read()
             history_json = load_metadata(history_buff)
             for el in history_json:
-                history_buffer = BytesIO()
-                history_buffer.write(tar_file.extractfile(f"history/arrays_{el['index']}.npz").read())
-                history_buffer.seek(0)
+                member = tar_file.getmember(f"history/arrays_{el['index']}.npz")
+                if lazy_history:
+                    history_buffer = TarMemberBuffer(file_path, member)
+                else:
+                    history_buffer = BytesIO()
+                    history_buffer.write(tar_file.extractfile(member).read())
+                    history_buffer.seek(0)
                 el = update_algorithm_dict(el)
                 segmentation_parameters = {"algorithm_name": el["algorithm_name"], "values": el["values"]}
                 history.append(
@@ -136,7 +172,7 @@ def load_project(
 class LoadProject(LoadBase):
     @classmethod
     def get_name(cls):
-        return "Project (*.tgz *.tbz2 *.gz *.bz2)"
+        return "Project (*.tgz *.tbz2 *.gz *.bz2 *.partseg)"
 
     @classmethod
     def get_short_name(cls):
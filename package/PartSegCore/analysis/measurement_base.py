@@ -2,6 +2,7 @@ from abc import ABC
 from enum import Enum
 from typing import Dict, Optional, Set, Union
 
+import numpy as np
 from sympy import symbols
 
 from ..algorithm_describe_base import AlgorithmDescribeBase, AlgorithmDescribeNotFound
@@ -234,6 +235,8 @@ class MeasurementMethodBase(AlgorithmDescribeBase, ABC):
         "get_starting_leaf",
         "get_units",
         "need_channel",
+        "support_crop",
+        "calculate_components",
     ]
 
     @classmethod
@@ -260,6 +263,22 @@ class MeasurementMethodBase(AlgorithmDescribeBase, ABC):
         """Main function for calculating measurement"""
         raise NotImplementedError()
 
+    @classmethod
+    def calculate_components(cls, area_array: np.ndarray, components: np.ndarray, **kwargs) -> Optional[np.ndarray]:
+        """
+        Calculate measurement for all ``components`` of labeled ``area_array`` in single pass.
+        Return None if measurement do not provide such implementation.
+        """
+        return None
+
+    @classmethod
+    def support_crop(cls) -> bool:
+        """
+        If value of measurement for single component depends only on its neighbourhood
+        so it could be calculated on component bounding box.
+        """
+        return False
+
     @classmethod
     def get_starting_leaf(cls) -> Leaf:
         """This leaf is putted on default list"""
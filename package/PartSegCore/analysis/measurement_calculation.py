@@ -1,12 +1,15 @@
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
 from functools import reduce
 from math import pi
-from typing import Any, Callable, Dict, Iterator, List, MutableMapping, NamedTuple, Optional, Set, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, List, Mapping, MutableMapping, NamedTuple, Optional, Set, Tuple, Union
 
 import numpy as np
 import SimpleITK
+from scipy import ndimage
 from scipy.spatial.distance import cdist
+from scipy.spatial.qhull import ConvexHull, QhullError
 from sympy import symbols
 
 from PartSegImage import Image
@@ -15,6 +18,7 @@ from .. import autofit as af
 from ..algorithm_describe_base import AlgorithmProperty, Register
 from ..channel_class import Channel
 from ..class_generator import enum_register
+from ..image_operations import from_sitk_image, to_sitk_image
 from ..mask_partition_utils import BorderRim, MaskDistanceSplit
 from ..roi_info import ROIInfo
 from ..universal_const import UNIT_SCALE, Units
@@ -102,6 +106,32 @@ class MeasurementResult(MutableMapping[str, MeasurementResultType]):
     def __iter__(self) -> Iterator[str]:
         return iter(self._data_dict)
 
+    def __getstate__(self):
+        """
+        Per component values are stored as lists of numbers.
+        For pickling they are packed into numpy arrays to reduce size and time of transfer between processes.
+        """
+        state = self.__dict__.copy()
+        data_dict = OrderedDict()
+        packed = []
+        for key, val in self._data_dict.items():
+            if isinstance(val, list) and val:
+                array = np.asarray(val)
+                if array.ndim == 1 and array.dtype.kind in "iuf":
+                    data_dict[key] = array
+                    packed.append(key)
+                    continue
+            data_dict[key] = val
+        state["_data_dict"] = data_dict
+        state["_packed"] = packed
+        return state
+
+    def __setstate__(self, state):
+        packed = state.pop("_packed", [])
+        for key in packed:
+            state["_data_dict"][key] = list(state["_data_dict"][key])
+        self.__dict__.update(state)
+
     def set_filename(self, path_fo_file: str):
         """
         Set name of file to be presented as first position.
@@ -211,6 +241,149 @@ class MeasurementResult(MutableMapping[str, MeasurementResultType]):
         return res
 
 
+TIME_STR = "Time"
+
+
+class TimeSeriesMeasurementResult(Mapping[int, MeasurementResult]):
+    """
+    Measurements calculated for each time point of image.
+    Indexing with time returns :py:class:`MeasurementResult` for this time point.
+    Indexing with pair ``(time, component)`` returns values for single component
+    (segmentation component if profile contains per component measurements of ROI, mask component otherwise)
+    as dict from labels (see :py:meth:`MeasurementResult.get_labels`) to values.
+    """
+
+    def __init__(self, results: Dict[int, MeasurementResult]):
+        self._results = OrderedDict(sorted(results.items()))
+
+    def __getitem__(self, k: Union[int, Tuple[int, int]]):
+        if isinstance(k, tuple):
+            return self.get_component(*k)
+        return self._results[k]
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._results)
+
+    def get_component(self, time: int, component: int) -> Dict[str, MeasurementValueType]:
+        """
+        Get measurements of given component in given time point.
+
+        :raise KeyError: if there is no such time point or component
+        """
+        result = self._results[time]
+        labels = result.get_labels()
+        has_mask_components, has_segmentation_components = result.get_component_info()
+        if not (has_mask_components or has_segmentation_components):
+            return OrderedDict(zip(labels, result.get_separated()[0]))
+        index = labels.index("Segmentation component" if has_segmentation_components else "Mask component")
+        for row in result.get_separated():
+            if row[index] == component:
+                return OrderedDict(zip(labels, row))
+        raise KeyError((time, component))
+
+    def get_labels(self) -> List[str]:
+        """Labels of :py:meth:`get_separated` rows"""
+        if not self._results:
+            return [TIME_STR]
+        labels = next(iter(self._results.values())).get_labels()
+        labels.insert(1 if labels and labels[0] == FILE_NAME_STR else 0, TIME_STR)
+        return labels
+
+    def get_separated(self) -> List[List[MeasurementValueType]]:
+        """Get measurements separated for each time point and component"""
+        res = []
+        for time, result in self._results.items():
+            index = 1 if FILE_NAME_STR in result else 0
+            for row in result.get_separated():
+                row.insert(index, time)
+                res.append(row)
+        return res
+
+
+def _estimate_nbytes(obj) -> int:
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(_estimate_nbytes(x) for x in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_estimate_nbytes(x) for x in obj)
+    return 0
+
+
+class MeasurementContext:
+    """
+    Storage of intermediate results of measurements calculated for one roi and mask.
+    Data which do not depend on channel (component masks, borders, component bounds)
+    are stored per time point. Leaf values and channel dependent data (like main axes)
+    are stored per time point, channel and units.
+    """
+
+    def __init__(self):
+        self._data: Dict[tuple, dict] = {}
+
+    def get(self, *key) -> dict:
+        """Get dict for storing data identified by ``key``"""
+        return self._data.setdefault(key, {})
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated size of stored arrays"""
+        return _estimate_nbytes(self._data)
+
+
+class MeasurementCache:
+    """
+    Cache of :py:class:`MeasurementContext` which allows to share intermediate results between calls of
+    :py:meth:`MeasurementProfile.calculate` on the same roi and mask (for example few measurement steps
+    in calculation plan or one profile calculated on few channels). Context is identified by identity
+    of roi and mask objects. If estimated size of stored data exceeds ``memory_limit``
+    then least recently used contexts are removed.
+
+    :param memory_limit: limit of memory (in bytes) used by stored arrays
+    """
+
+    def __init__(self, memory_limit: int = 2 ** 30):
+        self.memory_limit = memory_limit
+        self._contexts: Dict[Tuple[int, int], Tuple[Any, Any, MeasurementContext]] = OrderedDict()
+
+    def get_context(self, roi, mask) -> MeasurementContext:
+        """
+        Get context for given roi and mask. References to both objects are kept
+        until context is removed, so identity of them cannot be reused.
+        """
+        key = (id(roi), id(mask))
+        if key in self._contexts:
+            self._contexts.move_to_end(key)
+        else:
+            self._contexts[key] = roi, mask, MeasurementContext()
+        self.prune()
+        return self._contexts[key][2]
+
+    def prune(self):
+        """Remove least recently used contexts (except the last one) until memory limit is kept"""
+        sizes = [(key, val[2].nbytes) for key, val in self._contexts.items()]
+        total = sum(x[1] for x in sizes)
+        for key, size in sizes[:-1]:
+            if total <= self.memory_limit:
+                break
+            del self._contexts[key]
+            total -= size
+
+    def invalidate(self, obj):
+        """Remove contexts which use ``obj`` as roi or mask"""
+        for key in [k for k, (roi, mask, _) in self._contexts.items() if roi is obj or mask is obj]:
+            del self._contexts[key]
+
+    def clear(self):
+        self._contexts.clear()
+
+    def __len__(self):
+        return len(self._contexts)
+
+
 class MeasurementProfile:
     PARAMETERS = ["name", "chosen_fields", "reversed_brightness", "use_gauss_image", "name_prefix"]
 
@@ -327,20 +500,56 @@ class MeasurementProfile:
             val = method.calculate_property(**kw)
         else:
             kw["_cache"] = False
-            val = []
-            area_array = kw["area_array"]
             if area_type == AreaType.ROI:
                 components = segmentation_mask_map.roi_components
             else:
                 components = segmentation_mask_map.mask_components
-            for i in components:
-                kw["area_array"] = area_array == i
-                val.append(method.calculate_property(**kw))
-            val = np.array(val)
+            val = method.calculate_components(components=components, **kw)
+            if val is None:
+                val = np.array(MeasurementProfile._calculate_components_values(method, area_type, components, kw))
             if node.per_component == PerComponent.Mean:
                 val = np.mean(val) if val.size else 0
         return val
 
+    @staticmethod
+    def _calculate_components_values(
+        method: MeasurementMethodBase, area_type: AreaType, components: np.ndarray, kwargs: dict
+    ) -> List[Any]:
+        """
+        Calculate measurement separately for each component. If measurement support it, then
+        calculation is performed only on component bounding box (extended by one voxel).
+        """
+        kw = dict(kwargs)
+        area_array = kwargs["area_array"]
+        channel = kwargs.get("channel", None)
+        res = []
+        if not method.support_crop() or (channel is not None and channel.shape != area_array.shape):
+            for i in components:
+                kw["area_array"] = area_array == i
+                res.append(method.calculate_property(**kw))
+            return res
+        area_cache = kwargs.get("area_cache", kwargs["help_dict"])
+        hash_str = hash_fun_call_name(get_components_bounds, {}, area_type, PerComponent.Yes, Channel(-1))
+        if hash_str not in area_cache:
+            area_cache[hash_str] = get_components_bounds(area_array)
+        bounds = area_cache[hash_str]
+        component_masks = area_cache.setdefault(("component masks", area_type), {})
+        to_cut = [k for k, v in kwargs.items() if isinstance(v, np.ndarray) and v.shape == area_array.shape]
+        for i in components:
+            if 0 < i <= len(bounds) and bounds[i - 1] is not None:
+                slices = extend_slices(bounds[i - 1], area_array.shape)
+                for name in to_cut:
+                    kw[name] = kwargs[name][slices]
+                if i not in component_masks:
+                    component_masks[i] = area_array[slices] == i
+                kw["area_array"] = component_masks[i]
+            else:
+                for name in to_cut:
+                    kw[name] = kwargs[name]
+                kw["area_array"] = area_array == i
+            res.append(method.calculate_property(**kw))
+        return res
+
     def _calculate_leaf(
         self, node: Leaf, segmentation_mask_map: ComponentsInfo, help_dict: dict, kwargs: dict
     ) -> Tuple[Union[float, np.ndarray], symbols, AreaType]:
@@ -455,6 +664,7 @@ class MeasurementProfile:
         range_changed: Callable[[int, int], Any] = empty_fun,
         step_changed: Callable[[int], Any] = empty_fun,
         time: int = 0,
+        measurement_context: Optional[MeasurementContext] = None,
     ) -> MeasurementResult:
         """
         Calculate measurements on given set of parameters
@@ -465,6 +675,8 @@ class MeasurementProfile:
         :param range_changed: callback function to set information about steps range
         :param step_changed: callback function fo set information about steps done
         :param time: which data point should be measured
+        :param measurement_context: storage of intermediate results shared between calls on the same
+            ``roi`` and image mask (see :py:class:`MeasurementCache`). If not provided then new one is used.
         :return: measurements
         """
 
@@ -473,10 +685,25 @@ class MeasurementProfile:
                 return array.take(time, axis=image.time_pos)
             return array
 
+        def get_channel(num: int) -> np.ndarray:
+            # read only view, measurements accumulate in wide types, so channel copy is not needed
+            channel_array = image.get_channel(num)
+            if channel_array.ndim == 4:
+                channel_array = channel_array[(slice(None),) * image.time_pos + (time,)]
+            channel_array = channel_array.view()
+            channel_array.flags.writeable = False
+            return channel_array
+
         if self._need_mask and image.mask is None:
             raise ValueError("measurement need mask")
-        channel = image.get_channel(channel_num).astype(np.float)
-        cache_dict = {}
+        channel = get_channel(channel_num)
+        if measurement_context is None:
+            measurement_context = MeasurementContext()
+        area_cache = measurement_context.get(time)
+        cache_dict = measurement_context.get(time, channel_num, result_units)
+        if "segmentation" not in area_cache:
+            area_cache["segmentation"] = get_time(roi if isinstance(roi, np.ndarray) else roi.roi)
+            area_cache["mask"] = get_time(image.mask)
         result_scalar = UNIT_SCALE[result_units.value]
         roi_alternative = {}
         if isinstance(roi, ROIInfo):
@@ -484,22 +711,29 @@ class MeasurementProfile:
                 roi_alternative[name] = get_time(array)
         kw = {
             "image": image,
-            "channel": get_time(channel),
-            "segmentation": get_time(roi if isinstance(roi, np.ndarray) else roi.roi),
-            "mask": get_time(image.mask),
+            "channel": channel,
+            "segmentation": area_cache["segmentation"],
+            "mask": area_cache["mask"],
             "voxel_size": image.spacing,
             "result_scalar": result_scalar,
             "roi_alternative": roi_alternative,
             "roi_annotation": roi.annotations if isinstance(roi, ROIInfo) else {},
+            "area_cache": area_cache,
         }
-        segmentation_mask_map = self.get_segmentation_to_mask_component(kw["segmentation"], kw["mask"])
+        if "segmentation_mask_map" not in area_cache:
+            area_cache["segmentation_mask_map"] = self.get_segmentation_to_mask_component(
+                kw["segmentation"], kw["mask"]
+            )
+        segmentation_mask_map = area_cache["segmentation_mask_map"]
         result = MeasurementResult(segmentation_mask_map)
         for num in self.get_channels_num():
-            kw["channel_{num}"] = get_time(image.get_channel(num))
+            kw[f"channel_{num}"] = get_channel(num)
         if any(self._need_mask_without_segmentation(el.calculation_tree) for el in self.chosen_fields):
-            mm = kw["mask"].copy()
-            mm[kw["segmentation"] > 0] = 0
-            kw["mask_without_segmentation"] = mm
+            if "mask_without_segmentation" not in area_cache:
+                mm = kw["mask"].copy()
+                mm[kw["segmentation"] > 0] = 0
+                area_cache["mask_without_segmentation"] = mm
+            kw["mask_without_segmentation"] = area_cache["mask_without_segmentation"]
 
         range_changed(0, len(self.chosen_fields))
         for i, entry in enumerate(self.chosen_fields):
@@ -510,6 +744,54 @@ class MeasurementProfile:
 
         return result
 
+    def calculate_time_series(
+        self,
+        image: Image,
+        channel_num: int,
+        roi: Union[np.ndarray, ROIInfo],
+        result_units: Units,
+        range_changed: Callable[[int, int], Any] = empty_fun,
+        step_changed: Callable[[int], Any] = empty_fun,
+        measurement_context: Optional[MeasurementContext] = None,
+        workers: int = 1,
+    ) -> TimeSeriesMeasurementResult:
+        """
+        Calculate measurements for each time point of image.
+        Progress is reported as number of finished time points.
+
+        :param image: image on which measurements should be calculated
+        :param roi: array with segmentation labeled as positive integers
+        :param result_units: units which should be used to present results.
+        :param range_changed: callback function to set information about steps range
+        :param step_changed: callback function fo set information about steps done
+        :param measurement_context: storage of intermediate results shared between calls on the same
+            ``roi`` and image mask. If not provided then separated one is used for each time point
+            and released just after its calculation.
+        :param workers: number of threads used to calculate time points in parallel
+        :return: measurements for each time point
+        """
+        if self._need_mask and image.mask is None:
+            raise ValueError("measurement need mask")
+
+        def calculate_time(time: int) -> MeasurementResult:
+            context = MeasurementContext() if measurement_context is None else measurement_context
+            return self.calculate(image, channel_num, roi, result_units, time=time, measurement_context=context)
+
+        times = image.times
+        range_changed(0, times)
+        results = {}
+        if workers > 1 and times > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(calculate_time, time): time for time in range(times)}
+                for i, future in enumerate(as_completed(futures), start=1):
+                    results[futures[future]] = future.result()
+                    step_changed(i)
+        else:
+            for time in range(times):
+                results[time] = calculate_time(time)
+                step_changed(time + 1)
+        return TimeSeriesMeasurementResult(results)
+
     def _calc_single_field(
         self,
         entry: MeasurementEntry,
@@ -541,19 +823,19 @@ def calculate_main_axis(area_array: np.ndarray, channel: np.ndarray, voxel_size)
         if channel.shape[0] != 1:
             raise ValueError("This measurements do not support time data")
         channel = channel[0]
-    cut_img = np.copy(channel)
-    cut_img[area_array == 0] = 0
-    if np.all(cut_img == 0):
+    bbox = af.bounding_box(area_array)
+    if bbox is None:
+        return (0,) * len(voxel_size)
+    cut_img = np.where(area_array[bbox] != 0, channel[bbox], 0)
+    if not np.any(cut_img):
         return (0,) * len(voxel_size)
     orientation_matrix, _ = af.find_density_orientation(cut_img, voxel_size, 1)
-    center_of_mass = af.density_mass_center(cut_img, voxel_size)
-    positions = np.array(np.nonzero(cut_img), dtype=np.float64)
+    # extremes of projection are reached in vertices of convex hull
+    positions = line_extreme_points(cut_img != 0)
     for i, v in enumerate(reversed(voxel_size), start=1):
-        positions[-i] *= v
-        positions[-i] -= center_of_mass[i - 1]
-    centered = np.dot(orientation_matrix.T, positions)
-    size = np.max(centered, axis=1) - np.min(centered, axis=1)
-    return size
+        positions[:, -i] *= v
+    projected = np.dot(positions, orientation_matrix)
+    return np.max(projected, axis=0) - np.min(projected, axis=0)
 
 
 def get_main_axis_length(
@@ -603,6 +885,14 @@ class Volume(MeasurementMethodBase):
     def calculate_property(cls, area_array, voxel_size, result_scalar, **_):  # pylint: disable=W0221
         return np.count_nonzero(area_array) * pixel_volume(voxel_size, result_scalar)
 
+    @classmethod
+    def calculate_components(cls, area_array, components, voxel_size, result_scalar, **_):  # pylint: disable=W0221
+        return components_bincount(area_array, components) * pixel_volume(voxel_size, result_scalar)
+
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}") ** ndim
@@ -615,6 +905,14 @@ class Voxels(MeasurementMethodBase):
     def calculate_property(cls, area_array, **_):  # pylint: disable=W0221
         return np.count_nonzero(area_array)
 
+    @classmethod
+    def calculate_components(cls, area_array, components, **_):  # pylint: disable=W0221
+        return components_bincount(area_array, components)
+
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("1")
@@ -674,26 +972,103 @@ def iterative_double_normal(points_positions: np.ndarray):
     return delta, dn
 
 
+def line_extreme_points(area_array: np.ndarray) -> np.ndarray:
+    """
+    Positions of voxels of ``area_array`` which are first or last nonzero voxel
+    in lines along each axis. Each vertex of convex hull of nonzero voxels is one of these points.
+
+    :param area_array: array with marked area
+    :return: points array of size (points_num, number of dimensions)
+    """
+    mask = area_array if area_array.dtype == np.bool else area_array > 0
+    axis_order = np.argsort(mask.shape)[::-1]
+    positions = None
+    for axis in axis_order:
+        first = np.argmax(mask, axis=axis)
+        last = mask.shape[axis] - 1 - np.argmax(np.flip(mask, axis=axis), axis=axis)
+        if positions is None:
+            lines = np.nonzero(mask.any(axis=axis))
+            positions = np.empty((2 * lines[0].size, mask.ndim), dtype=np.intp)
+            for i, coord in zip((x for x in range(mask.ndim) if x != axis), lines):
+                positions[:, i] = np.tile(coord, 2)
+            positions[:, axis] = np.concatenate([first[lines], last[lines]])
+            continue
+        lines = tuple(positions[:, i] for i in range(mask.ndim) if i != axis)
+        coord = positions[:, axis]
+        positions = positions[(coord == first[lines]) | (coord == last[lines])]
+    return positions.astype(np.float64)
+
+
+def farthest_pair_distance(points_positions: np.ndarray, chunk_size: int = 256) -> float:
+    """
+    Exact calculation of maximum distance between pair of points.
+    Points which are too close to centroid to be end of farthest pair are skipped.
+    Distances are calculated in chunks of ``chunk_size`` rows, so memory usage is bounded
+    by ``chunk_size * points_num``.
+
+    :param points_positions: points array of size (points_num, number of dimensions)
+    :param chunk_size: number of points for which distances are calculated at once
+    :return: square power of diameter
+    """
+    if points_positions.shape[0] < 2:
+        return 0
+    radius = np.sqrt(np.sum((points_positions - np.mean(points_positions, axis=0)) ** 2, axis=1))
+    farthest = points_positions[np.argmax(radius)]
+    delta = np.max(np.sum((points_positions - farthest) ** 2, axis=1))
+    # for farthest pair a, b: |ab| <= r_a + r_b, so each end has r >= |ab| - max(r)
+    points_positions = points_positions[radius >= np.sqrt(delta) - np.max(radius)]
+    for start in range(0, points_positions.shape[0] - 1, chunk_size):
+        dist_array = cdist(points_positions[start : start + chunk_size], points_positions[start:], "sqeuclidean")
+        delta = max(delta, np.max(dist_array))
+    return delta
+
+
+def convex_hull_vertices(points_positions: np.ndarray) -> np.ndarray:
+    """
+    Reduce points to vertices of its convex hull. Dimensions in which all points have same coordinate are ignored.
+    If points are degenerated (for example coplanar in 3d) then hull is calculated with joggled input.
+    If hull cannot be calculated (too few points) then all points are returned.
+
+    :param points_positions: points array of size (points_num, number of dimensions)
+    :return: array of size (vertices_num, number of not flat dimensions)
+    """
+    points_positions = points_positions[:, np.ptp(points_positions, axis=0) > 0]
+    if points_positions.shape[1] < 2 or points_positions.shape[0] <= points_positions.shape[1] + 1:
+        return points_positions
+    for options in ("", "QJ"):
+        try:
+            hull = ConvexHull(points_positions, qhull_options=options or None)
+        except QhullError:
+            continue
+        vertices = points_positions[hull.vertices]
+        hull.close()
+        return vertices
+    return points_positions  # pragma: no cover
+
+
 class Diameter(MeasurementMethodBase):
     """
     Class for calculate diameter of ROI in fast way.
-    From Malandain, G., & Boissonnat, J. (2002). Computing the diameter of a point set,
-    12(6), 489–509. https://doi.org/10.1142/S0218195902001006
-
+    Area is reduced to vertices of its convex hull (farthest pair of points is always on it)
+    and then distances between all pairs of vertices are checked.
     """
 
     text_info = "Diameter", "Diameter of area"
 
     @staticmethod
     def calculate_property(area_array, voxel_size, result_scalar, **_):  # pylint: disable=W0221
-        pos = np.transpose(np.nonzero(get_border(area_array))).astype(np.float)
+        pos = line_extreme_points(area_array)
         if pos.size == 0:
             return 0
         for i, val in enumerate((x * result_scalar for x in reversed(voxel_size)), start=1):
             pos[:, -i] *= val
-        diam_sq = iterative_double_normal(pos)[0]
+        diam_sq = farthest_pair_distance(convex_hull_vertices(pos))
         return np.sqrt(diam_sq)
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}")
@@ -710,6 +1085,10 @@ class DiameterOld(MeasurementMethodBase):  # pragma: no cover
     def calculate_property(area_array, voxel_size, result_scalar, **_):  # pylint: disable=W0221
         return calc_diam(get_border(area_array), [x * result_scalar for x in voxel_size])
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}")
@@ -731,9 +1110,20 @@ class PixelBrightnessSum(MeasurementMethodBase):
             else:  # pragma: no cover
                 raise ValueError("channel and mask do not fit each other")
         if np.any(area_array):
-            return np.sum(channel[area_array > 0])
+            return np.sum(channel[area_array > 0], dtype=np.float64)
         return 0
 
+    @classmethod
+    def calculate_components(cls, area_array, components, channel=None, **_):  # pylint: disable=W0221
+        channel = _fit_channel(area_array, channel)
+        if channel is None:
+            return None
+        return components_bincount(area_array, components, channel)
+
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("Pixel_brightness")
@@ -754,6 +1144,10 @@ class ComponentsNumber(MeasurementMethodBase):
     def get_starting_leaf(cls):
         return Leaf(cls.text_info[0], per_component=PerComponent.No)
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("count")
@@ -767,9 +1161,19 @@ class MaximumPixelBrightness(MeasurementMethodBase):
         if area_array.shape != channel.shape:  # pragma: no cover
             raise ValueError("channel and mask do not fit each other")
         if np.any(area_array):
-            return np.max(channel[area_array > 0])
+            return float(np.max(channel[area_array > 0]))
         return 0
 
+    @classmethod
+    def calculate_components(cls, area_array, components, channel=None, **_):  # pylint: disable=W0221
+        if channel is None or channel.shape != area_array.shape:
+            return None
+        return np.asarray(ndimage.maximum(channel, labels=area_array, index=components), dtype=np.float64)
+
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("Pixel_brightness")
@@ -787,9 +1191,19 @@ class MinimumPixelBrightness(MeasurementMethodBase):
         if area_array.shape != channel.shape:  # pragma: no cover
             raise ValueError("channel and mask do not fit each other")
         if np.any(area_array):
-            return np.min(channel[area_array > 0])
+            return float(np.min(channel[area_array > 0]))
         return 0
 
+    @classmethod
+    def calculate_components(cls, area_array, components, channel=None, **_):  # pylint: disable=W0221
+        if channel is None or channel.shape != area_array.shape:
+            return None
+        return np.asarray(ndimage.minimum(channel, labels=area_array, index=components), dtype=np.float64)
+
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("Pixel_brightness")
@@ -807,9 +1221,21 @@ class MeanPixelBrightness(MeasurementMethodBase):
         if area_array.shape != channel.shape:  # pragma: no cover
             raise ValueError("channel and mask do not fit each other")
         if np.any(area_array):
-            return np.mean(channel[area_array > 0])
+            return np.mean(channel[area_array > 0], dtype=np.float64)
         return 0
 
+    @classmethod
+    def calculate_components(cls, area_array, components, channel=None, **_):  # pylint: disable=W0221
+        if channel is None or channel.shape != area_array.shape:
+            return None
+        counts = components_bincount(area_array, components)
+        sums = components_bincount(area_array, components, channel)
+        return np.divide(sums, counts, out=np.zeros(sums.shape, dtype=np.float64), where=counts > 0)
+
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("Pixel_brightness")
@@ -827,9 +1253,13 @@ class MedianPixelBrightness(MeasurementMethodBase):
         if area_array.shape != channel.shape:  # pragma: no cover
             raise ValueError("channel and mask do not fit each other")
         if np.any(area_array):
-            return np.median(channel[area_array > 0])
+            return float(np.median(channel[area_array > 0]))
         return 0
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("Pixel_brightness")
@@ -850,9 +1280,33 @@ class StandardDeviationOfPixelBrightness(MeasurementMethodBase):
         if area_array.shape != channel.shape:  # pragma: no cover
             raise ValueError("channel and mask do not fit each other")
         if np.any(area_array):
-            return np.std(channel[area_array > 0])
+            return np.std(channel[area_array > 0], dtype=np.float64)
         return 0
 
+    @classmethod
+    def calculate_components(cls, area_array, components, channel=None, **_):  # pylint: disable=W0221
+        if channel is None or channel.shape != area_array.shape:
+            return None
+        # only voxels of components are converted to float
+        foreground = area_array > 0
+        labels = area_array[foreground].astype(np.intp)
+        values = channel[foreground].astype(np.float64)
+        all_components = np.arange(max(np.max(labels, initial=0), np.max(components, initial=0)) + 1)
+        counts = components_bincount(labels, all_components)
+        sums = components_bincount(labels, all_components, values)
+        mean = np.divide(sums, counts, out=np.zeros(sums.shape, dtype=np.float64), where=counts > 0)
+        variance = np.divide(
+            components_bincount(labels, all_components, (values - mean[labels]) ** 2),
+            counts,
+            out=np.zeros(sums.shape, dtype=np.float64),
+            where=counts > 0,
+        )
+        return np.sqrt(variance[np.asarray(components, dtype=np.intp)])
+
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("Pixel_brightness")
@@ -871,11 +1325,18 @@ class Moment(MeasurementMethodBase):
             if channel.shape[0] != 1:  # pragma: no cover
                 raise ValueError("This measurements do not support time data")
             channel = channel[0]
-        img = np.copy(channel)
-        img[area_array == 0] = 0
-        if np.all(img == 0):
+        bbox = af.bounding_box(area_array)
+        if bbox is None:
+            return 0
+        img = np.where(area_array[bbox] != 0, channel[bbox], 0)
+        if not np.any(img):
             return 0
-        return af.calculate_density_momentum(img, voxel_size)
+        # crop could have singleton axes so squeeze from calculate_density_momentum could not be used
+        return float(np.trace(af.density_moments(img, voxel_size)[2]))
+
+    @classmethod
+    def support_crop(cls):
+        return True
 
     @classmethod
     def get_units(cls, ndim):
@@ -893,6 +1354,10 @@ class FirstPrincipalAxisLength(MeasurementMethodBase):
     def calculate_property(**kwargs):
         return get_main_axis_length(0, **kwargs)
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}")
@@ -909,6 +1374,10 @@ class SecondPrincipalAxisLength(MeasurementMethodBase):
     def calculate_property(**kwargs):
         return get_main_axis_length(1, **kwargs)
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}")
@@ -925,6 +1394,10 @@ class ThirdPrincipalAxisLength(MeasurementMethodBase):
     def calculate_property(**kwargs):
         return get_main_axis_length(2, **kwargs)
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}")
@@ -964,6 +1437,10 @@ class Compactness(MeasurementMethodBase):
             volume = Volume.calculate_property(**kwargs)
         return border_surface ** 1.5 / volume
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return Surface.get_units(ndim) / Volume.get_units(ndim)
@@ -999,6 +1476,10 @@ class Sphericity(MeasurementMethodBase):
             return volume / (4 / 3 * pi * (radius ** 3))
         return volume / (pi * (radius ** 2))
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return Volume.get_units(ndim) / Diameter.get_units(ndim) ** ndim
@@ -1011,11 +1492,43 @@ class Surface(MeasurementMethodBase):
     def calculate_property(area_array, voxel_size, result_scalar, **_):  # pylint: disable=W0221
         return calculate_volume_surface(area_array, [x * result_scalar for x in voxel_size])
 
+    @classmethod
+    def support_crop(cls):
+        return True
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}") ** 2
 
 
+def _border_rim(voxel_size, area_cache: Optional[dict] = None, **kwargs) -> Optional[np.ndarray]:
+    """
+    Calculate :py:meth:`BorderRim.border_mask`. If ``area_cache`` is provided then result is
+    stored in it, so it is calculated once per mask, distance, units and voxel size.
+    """
+    mask = kwargs.get("mask")
+    if area_cache is None or mask is None:
+        return BorderRim.border_mask(voxel_size=voxel_size, **kwargs)
+    key = ("border rim", id(mask), kwargs["distance"], kwargs["units"], tuple(voxel_size))
+    if key not in area_cache or area_cache[key][0] is not mask:
+        area_cache[key] = mask, BorderRim.border_mask(voxel_size=voxel_size, **kwargs)
+    return area_cache[key][1]
+
+
+def _mask_distance_split(voxel_size, area_cache: Optional[dict] = None, **kwargs) -> np.ndarray:
+    """
+    Calculate :py:meth:`MaskDistanceSplit.split`. If ``area_cache`` is provided then result is
+    stored in it, so it is calculated once per mask, split parameters and voxel size.
+    """
+    mask = kwargs["mask"]
+    if area_cache is None:
+        return MaskDistanceSplit.split(voxel_size=voxel_size, **kwargs)
+    key = ("mask distance split", id(mask), kwargs["num_of_parts"], kwargs["equal_volume"], tuple(voxel_size))
+    if key not in area_cache or area_cache[key][0] is not mask:
+        area_cache[key] = mask, MaskDistanceSplit.split(voxel_size=voxel_size, **kwargs)
+    return area_cache[key][1]
+
+
 class RimVolume(MeasurementMethodBase):
     text_info = "rim volume", "Calculate volumes for elements in radius (in physical units) from mask"
 
@@ -1029,12 +1542,20 @@ class RimVolume(MeasurementMethodBase):
 
     @staticmethod
     def calculate_property(area_array, voxel_size, result_scalar, **kwargs):  # pylint: disable=W0221
-        border_mask_array = BorderRim.border_mask(voxel_size=voxel_size, result_scalar=result_scalar, **kwargs)
+        border_mask_array = _border_rim(voxel_size=voxel_size, **kwargs)
         if border_mask_array is None:
             return None
         final_mask = np.array((border_mask_array > 0) * (area_array > 0))
         return np.count_nonzero(final_mask) * pixel_volume(voxel_size, result_scalar)
 
+    @classmethod
+    def calculate_components(cls, area_array, components, voxel_size, result_scalar, **kwargs):  # pylint: disable=W0221
+        border_mask_array = _border_rim(voxel_size=voxel_size, **kwargs)
+        if border_mask_array is None or border_mask_array.shape != area_array.shape:
+            return None
+        labels = np.where(border_mask_array > 0, area_array, 0)
+        return components_bincount(labels, components) * pixel_volume(voxel_size, result_scalar)
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}") ** ndim
@@ -1064,14 +1585,25 @@ class RimPixelBrightnessSum(MeasurementMethodBase):
             if channel.shape[0] != 1:  # pragma: no cover
                 raise ValueError("This measurements do not support time data")
             channel = channel[0]
-        border_mask_array = BorderRim.border_mask(**kwargs)
+        border_mask_array = _border_rim(**kwargs)
         if border_mask_array is None:
             return None
         final_mask = np.array((border_mask_array > 0) * (area_array > 0))
         if np.any(final_mask):
-            return np.sum(channel[final_mask])
+            return np.sum(channel[final_mask], dtype=np.float64)
         return 0
 
+    @classmethod
+    def calculate_components(cls, area_array, components, channel=None, **kwargs):  # pylint: disable=W0221
+        channel = _fit_channel(area_array, channel)
+        if channel is None:
+            return None
+        border_mask_array = _border_rim(**kwargs)
+        if border_mask_array is None or border_mask_array.shape != area_array.shape:
+            return None
+        labels = np.where(border_mask_array > 0, area_array, 0)
+        return components_bincount(labels, components, channel)
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("Pixel_brightness")
@@ -1113,15 +1645,16 @@ class DistanceMaskSegmentation(MeasurementMethodBase):
         ]
 
     @staticmethod
-    def calculate_points(channel, area_array, voxel_size, result_scalar, point_type: DistancePoint) -> np.ndarray:
+    def calculate_points(
+        channel, area_array, voxel_size, result_scalar, point_type: DistancePoint, border_cache: Optional[dict] = None
+    ) -> np.ndarray:
         if point_type == DistancePoint.Border:
-            area_pos = np.transpose(np.nonzero(get_border(area_array))).astype(np.float)
+            area_pos = np.transpose(np.nonzero(get_border(area_array, border_cache))).astype(np.float)
             area_pos += 0.5
             for i, val in enumerate((x * result_scalar for x in reversed(voxel_size)), start=1):
                 area_pos[:, -i] *= val
         elif point_type == DistancePoint.Mass_center:
-            im = np.copy(channel)
-            im[area_array == 0] = 0
+            im = np.where(area_array != 0, channel, 0)
             area_pos = np.array([af.density_mass_center(im, voxel_size) * result_scalar])
         else:
             area_pos = np.array([af.density_mass_center(area_array > 0, voxel_size) * result_scalar])
@@ -1146,8 +1679,11 @@ class DistanceMaskSegmentation(MeasurementMethodBase):
             channel = channel[0]
         if not (np.any(mask) and np.any(area_array)):
             return 0
-        mask_pos = cls.calculate_points(channel, mask, voxel_size, result_scalar, distance_from_mask)
-        seg_pos = cls.calculate_points(channel, area_array, voxel_size, result_scalar, distance_to_segmentation)
+        border_cache = kwargs.get("area_cache")
+        mask_pos = cls.calculate_points(channel, mask, voxel_size, result_scalar, distance_from_mask, border_cache)
+        seg_pos = cls.calculate_points(
+            channel, area_array, voxel_size, result_scalar, distance_to_segmentation, border_cache
+        )
         if mask_pos.shape[0] == 1 or seg_pos.shape[0] == 1:
             return np.min(cdist(mask_pos, seg_pos))
 
@@ -1187,10 +1723,20 @@ class SplitOnPartVolume(MeasurementMethodBase):
 
     @staticmethod
     def calculate_property(part_selection, area_array, voxel_size, result_scalar, **kwargs):  # pylint: disable=W0221
-        masked = MaskDistanceSplit.split(voxel_size=voxel_size, **kwargs)
+        masked = _mask_distance_split(voxel_size=voxel_size, **kwargs)
         mask = masked == part_selection
         return np.count_nonzero(mask * area_array) * pixel_volume(voxel_size, result_scalar)
 
+    @classmethod
+    def calculate_components(
+        cls, part_selection, area_array, components, voxel_size, result_scalar, **kwargs
+    ):  # pylint: disable=W0221
+        masked = _mask_distance_split(voxel_size=voxel_size, **kwargs)
+        if masked.shape != area_array.shape:
+            return None
+        labels = np.where(masked == part_selection, area_array, 0)
+        return components_bincount(labels, components) * pixel_volume(voxel_size, result_scalar)
+
     @classmethod
     def get_units(cls, ndim):
         return symbols("{}") ** ndim
@@ -1218,11 +1764,24 @@ class SplitOnPartPixelBrightnessSum(MeasurementMethodBase):
 
     @staticmethod
     def calculate_property(part_selection, channel, area_array, **kwargs):  # pylint: disable=W0221
-        masked = MaskDistanceSplit.split(**kwargs)
+        masked = _mask_distance_split(**kwargs)
         mask = np.array(masked == part_selection)
         if channel.ndim - mask.ndim == 1:
             channel = channel[0]
-        return np.sum(channel[mask * area_array > 0])
+        return np.sum(channel[mask * area_array > 0], dtype=np.float64)
+
+    @classmethod
+    def calculate_components(
+        cls, part_selection, area_array, components, channel=None, **kwargs
+    ):  # pylint: disable=W0221
+        channel = _fit_channel(area_array, channel)
+        if channel is None:
+            return None
+        masked = _mask_distance_split(**kwargs)
+        if masked.shape != area_array.shape:
+            return None
+        labels = np.where(masked == part_selection, area_array, 0)
+        return components_bincount(labels, components, channel)
 
     @classmethod
     def get_units(cls, ndim):
@@ -1261,10 +1820,69 @@ def calculate_volume_surface(volume_mask, voxel_size):
     return border_surface
 
 
-def get_border(array):
-    if array.dtype == np.bool:
-        array = array.astype(np.uint8)
-    return SimpleITK.GetArrayFromImage(SimpleITK.LabelContour(SimpleITK.GetImageFromArray(array)))
+def get_components_bounds(labels: np.ndarray) -> List[Optional[Tuple[slice, ...]]]:
+    """
+    Calculate bounding boxes of all components of labeled array in single pass.
+
+    :param labels: array labeled with non negative integers
+    :return: list of slices tuples. Bounding box of component ``i`` is on position ``i - 1``.
+        If component is absent then ``None`` is on its position.
+    """
+    if labels.dtype == np.bool_:
+        labels = labels.view(np.uint8)
+    return ndimage.find_objects(labels)
+
+
+def extend_slices(slices: Tuple[slice, ...], shape: Tuple[int, ...], margin: int = 1) -> Tuple[slice, ...]:
+    """Extend bounding box by ``margin`` in each direction with respect to array ``shape``"""
+    return tuple(slice(max(sl.start - margin, 0), min(sl.stop + margin, size)) for sl, size in zip(slices, shape))
+
+
+def components_bincount(labels: np.ndarray, components: np.ndarray, weights: Optional[np.ndarray] = None):
+    """
+    Count voxels (or sum ``weights``) for each of ``components`` of labeled array in single pass.
+
+    :param labels: array labeled with non negative integers
+    :param components: components for which values should be returned
+    :param weights: optional array of same shape like ``labels``
+    :return: array with value for each component
+    """
+    components = np.asarray(components, dtype=np.intp)
+    size = int(components.max()) + 1 if components.size else 1
+    if weights is not None:
+        weights = weights.ravel()
+    res = np.bincount(labels.ravel(), weights=weights, minlength=size)
+    return res[components]
+
+
+def _fit_channel(area_array: np.ndarray, channel: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    if channel is None:
+        return None
+    if area_array.shape != channel.shape:
+        if area_array.size == channel.size:
+            return channel.reshape(area_array.shape)
+        return None
+    return channel
+
+
+def get_border(array: np.ndarray, cache: Optional[dict] = None) -> np.ndarray:
+    """
+    Calculate border of labeled array.
+
+    :param array: labeled array
+    :param cache: area cache of measurement context. Border is stored only if ``array`` is one of areas
+        kept in this cache (``segmentation``, ``mask``, ``mask_without_segmentation``).
+        Temporary arrays (like single component) are not cached as they are never reused.
+    """
+    name = None
+    if cache is not None:
+        name = next((x for x in ("segmentation", "mask", "mask_without_segmentation") if cache.get(x) is array), None)
+    if name is None:
+        return from_sitk_image(SimpleITK.LabelContour(to_sitk_image(array)))
+    key = ("border", name)
+    if key not in cache or cache[key][0] is not array:
+        cache[key] = array, from_sitk_image(SimpleITK.LabelContour(to_sitk_image(array)))
+    return cache[key][1]
 
 
 def calc_diam(array, voxel_size):  # pragma: no cover
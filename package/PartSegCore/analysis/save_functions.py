@@ -20,38 +20,75 @@ from ..io_utils import (
     SaveMaskAsTiff,
     SaveROIAsNumpy,
     SaveROIAsTIFF,
+    TarMemberBuffer,
     get_tarinfo,
+    history_arrays_content,
+    save_chunked_array,
 )
 from ..universal_const import UNIT_SCALE, Units
-from .io_utils import ProjectTuple, project_version_info
+from .io_utils import ProjectTuple, project_version_info, project_version_info_v1
 from .save_hooks import PartEncoder
 
 __all__ = [
     "SaveProject",
+    "SaveProjectV2",
     "SaveCmap",
     "SaveXYZ",
+    "SavePointCloud",
     "SaveAsTiff",
     "SaveAsNumpy",
     "save_dict",
 ]
 
 
+def _add_json(tar_file: tarfile.TarFile, name: str, data):
+    buff = BytesIO(json.dumps(data, cls=PartEncoder).encode("utf-8"))
+    tar_file.addfile(get_tarinfo(name, buff), buff)
+
+
+def _add_history(tar_file: tarfile.TarFile, history: typing.List[HistoryElement]):
+    el_info = []
+    for i, el in enumerate(history):
+        el_info.append(
+            {
+                "index": i,
+                "algorithm_name": el.segmentation_parameters["algorithm_name"],
+                "values": el.segmentation_parameters["values"],
+                "mask_property": el.mask_property,
+            }
+        )
+        hist_buff = history_arrays_content(el.arrays)
+        tar_file.addfile(get_tarinfo(f"history/arrays_{i}.npz", hist_buff), hist_buff)
+    if len(el_info) > 0:
+        _add_json(tar_file, "history/history.json", el_info)
+
+
+def _open_project_tar(file_path: typing.Union[str, Path, BytesIO], mode: str, history: typing.List[HistoryElement]):
+    # history arrays could be lazy loaded from file which will be overwritten
+    for el in history:
+        if isinstance(el.arrays, TarMemberBuffer):
+            el.arrays.load()
+    if isinstance(file_path, (str, Path)):
+        return tarfile.open(file_path, mode)
+    return tarfile.open(fileobj=file_path, mode=mode)
+
+
 # TODO add progress function to io
 def save_project(
-    file_path: str,
+    file_path: typing.Union[str, Path, BytesIO],
     image: Image,
     segmentation: np.ndarray,
     mask: typing.Optional[np.ndarray],
     history: typing.List[HistoryElement],
     algorithm_parameters: dict,
 ):
-    # TODO add support for binary objects
-    ext = os.path.splitext(file_path)[1]
-    if ext.lower() in [".bz2", ".tbz2"]:
-        tar_mod = "w:bz2"
-    else:
-        tar_mod = "w:gz"
-    with tarfile.open(file_path, tar_mod) as tar:
+    """
+    Save project in format version 1.1, which could be read also by older PartSeg versions.
+    It is tar file compressed with bz2 for ``.bz2`` and ``.tbz2`` extensions and with gzip otherwise.
+    """
+    ext = os.path.splitext(file_path)[1] if isinstance(file_path, (str, Path)) else ""
+    tar_mod = "w:bz2" if ext.lower() in [".bz2", ".tbz2"] else "w:gz"
+    with _open_project_tar(file_path, tar_mod, history) as tar:
         segmentation_buff = BytesIO()
         # noinspection PyTypeChecker
         tifffile.imwrite(segmentation_buff, segmentation, compress=9)
@@ -69,33 +106,44 @@ def save_project(
         ImageWriter.save(image, image_buff)
         tar_image = get_tarinfo("image.tif", image_buff)
         tar.addfile(tarinfo=tar_image, fileobj=image_buff)
-        para_str = json.dumps(algorithm_parameters, cls=PartEncoder)
-        parameters_buff = BytesIO(para_str.encode("utf-8"))
-        tar_algorithm = get_tarinfo("algorithm.json", parameters_buff)
-        tar.addfile(tar_algorithm, parameters_buff)
-        meta_str = json.dumps({"project_version_info": str(project_version_info)}, cls=PartEncoder)
-        meta_buff = BytesIO(meta_str.encode("utf-8"))
-        tar_meta = get_tarinfo("metadata.json", meta_buff)
-        tar.addfile(tar_meta, meta_buff)
-        el_info = []
-        for i, el in enumerate(history):
-            el_info.append(
-                {
-                    "index": i,
-                    "algorithm_name": el.segmentation_parameters["algorithm_name"],
-                    "values": el.segmentation_parameters["values"],
-                    "mask_property": el.mask_property,
-                }
-            )
-            el.arrays.seek(0)
-            hist_info = get_tarinfo(f"history/arrays_{i}.npz", el.arrays)
-            el.arrays.seek(0)
-            tar.addfile(hist_info, el.arrays)
-        if len(el_info) > 0:
-            hist_str = json.dumps(el_info, cls=PartEncoder)
-            hist_buff = BytesIO(hist_str.encode("utf-8"))
-            tar_algorithm = get_tarinfo("history/history.json", hist_buff)
-            tar.addfile(tar_algorithm, hist_buff)
+        _add_json(tar, "algorithm.json", algorithm_parameters)
+        _add_json(tar, "metadata.json", {"project_version_info": str(project_version_info_v1)})
+        _add_history(tar, history)
+
+
+def save_project_v2(
+    file_path: typing.Union[str, Path, BytesIO],
+    image: Image,
+    segmentation: np.ndarray,
+    mask: typing.Optional[np.ndarray],
+    history: typing.List[HistoryElement],
+    algorithm_parameters: dict,
+):
+    """
+    Save project in format version 2. It is uncompressed tar file with ``index.json`` which describe
+    content. Arrays are stored in chunks compressed with fast codec (see :py:func:`.save_chunked_array`).
+    History arrays are stored as separated members, so they could be read on demand.
+    This format cannot be read by PartSeg versions older than format itself.
+    """
+    with _open_project_tar(file_path, "w", history) as tar:
+        _add_json(tar, "metadata.json", {"project_version_info": str(project_version_info)})
+        _add_json(tar, "algorithm.json", algorithm_parameters)
+        arrays = {
+            "image": save_chunked_array(tar, "arrays/image.bin", image.get_data()),
+            "roi": save_chunked_array(tar, "arrays/roi.bin", segmentation),
+        }
+        if mask is not None:
+            arrays["mask"] = save_chunked_array(tar, "arrays/mask.bin", mask)
+        coloring = image.default_coloring
+        image_info = {
+            "spacing": list(image.spacing),
+            "axes_order": image.axis_order,
+            "ranges": np.array(image.get_ranges(exact=True)).tolist(),
+            "labels": image.labels,
+            "coloring": None if coloring is None else [np.asarray(x).tolist() for x in coloring],
+        }
+        _add_json(tar, "index.json", {"arrays": arrays, "image": image_info})
+        _add_history(tar, history)
 
 
 def save_cmap(
@@ -148,6 +196,8 @@ def save_cmap(
 
 
 class SaveProject(SaveBase):
+    """Save project in format compatible with older PartSeg versions, see :py:func:`save_project`"""
+
     @classmethod
     def get_name(cls):
         return "Project (*.tgz *.tbz2 *.gz *.bz2)"
@@ -179,6 +229,39 @@ class SaveProject(SaveBase):
         )
 
 
+class SaveProjectV2(SaveProject):
+    """
+    Save project in faster format version 2, see :py:func:`save_project_v2`.
+    It is not compressed as whole, so it use own extension.
+    """
+
+    @classmethod
+    def get_name(cls):
+        return "Project v2, not readable by older PartSeg (*.partseg)"
+
+    @classmethod
+    def get_short_name(cls):
+        return "project_v2"
+
+    @classmethod
+    def save(
+        cls,
+        save_location: typing.Union[str, BytesIO, Path],
+        project_info: ProjectTuple,
+        parameters: dict = None,
+        range_changed=None,
+        step_changed=None,
+    ):
+        save_project_v2(
+            save_location,
+            project_info.image,
+            project_info.roi,
+            project_info.mask,
+            project_info.history,
+            project_info.algorithm_parameters,
+        )
+
+
 class SaveCmap(SaveBase):
     @classmethod
     def get_name(cls):
@@ -236,6 +319,50 @@ class SaveCmap(SaveBase):
             save_cmap(save_location, data, spacing, segmentation, reverse_base, parameters)
 
 
+POINT_CLOUD_CHUNK_SIZE = 2 ** 20
+
+_PLY_TYPES = {
+    "i1": "char",
+    "u1": "uchar",
+    "i2": "short",
+    "u2": "ushort",
+    "i4": "int",
+    "u4": "uint",
+    "f4": "float",
+    "f8": "double",
+}
+
+
+def _iter_point_cloud(
+    indices: np.ndarray,
+    labels: np.ndarray,
+    shape: typing.Tuple[int, ...],
+    channel_image: np.ndarray,
+    shift: np.ndarray,
+    dtype: np.dtype,
+) -> typing.Iterator[np.ndarray]:
+    """
+    Yield records of points (coordinates in ``xyz`` order, value and optional component number)
+    in chunks of :py:data:`POINT_CLOUD_CHUNK_SIZE` points.
+
+    :param indices: flat indices of points in array of shape ``shape``
+    :param labels: component number of each point
+    :param shape: shape of segmentation array
+    :param channel_image: array with values
+    :param shift: value subtracted from coordinates (in array axes order)
+    :param dtype: dtype of records
+    """
+    for start in range(0, indices.size, POINT_CLOUD_CHUNK_SIZE):
+        coordinates = np.unravel_index(indices[start : start + POINT_CLOUD_CHUNK_SIZE], shape)
+        chunk = np.empty(coordinates[0].size, dtype=dtype)
+        for name, coordinate, shift_value in zip("xyz", reversed(coordinates), reversed(shift)):
+            chunk[name] = coordinate - shift_value
+        chunk["value"] = channel_image[coordinates]
+        if "component" in dtype.names:
+            chunk["component"] = labels[start : start + POINT_CLOUD_CHUNK_SIZE]
+        yield chunk
+
+
 class SaveXYZ(SaveBase):
     @classmethod
     def get_name(cls):
@@ -254,19 +381,35 @@ class SaveXYZ(SaveBase):
         ]
 
     @classmethod
-    def _save(cls, save_location, channel_image, segmentation_mask, shift):
-        positions = np.transpose(np.nonzero(segmentation_mask))
-        positions = np.flip(positions, 1)
-        positions -= shift
-        values = channel_image[segmentation_mask]
-        values = values.reshape(values.size, 1)
-        data = np.append(positions, values, axis=1)
-        if np.issubdtype(channel_image.dtype, np.integer):
-            fm = "%d"
+    def _point_dtype(cls, ndim: int, value_dtype: np.dtype, component: bool, ext: str) -> np.dtype:
+        fields = [(name, np.int32) for name in "xyz"[:ndim]]
+        fields.append(("value", value_dtype))
+        if component:
+            fields.append(("component", np.uint32))
+        return np.dtype(fields)
+
+    @classmethod
+    def _write_points(cls, file, chunks: typing.Iterable[np.ndarray], dtype: np.dtype, points_num: int, ext: str):
+        fm = "%d" if np.issubdtype(dtype["value"], np.integer) else "%f"
+        fmt = ["%d"] * (len(dtype.names) - 1)
+        fmt.insert(dtype.names.index("value"), fm)
+        array_dtype = np.result_type(*[dtype[name] for name in dtype.names])
+        for chunk in chunks:
+            # formatting of plain array is much faster than of structured one
+            data = np.stack([chunk[name].astype(array_dtype, copy=False) for name in dtype.names], axis=1)
+            # noinspection PyTypeChecker
+            np.savetxt(file, data, fmt=fmt, delimiter=" ")
+
+    @classmethod
+    def _save(cls, save_location, indices, labels, shape, channel_image, shift, component=False):
+        ext = os.path.splitext(save_location)[1].lower() if isinstance(save_location, (str, Path)) else ""
+        dtype = cls._point_dtype(len(shape), channel_image.dtype, component, ext)
+        chunks = _iter_point_cloud(indices, labels, shape, channel_image, shift, dtype)
+        if isinstance(save_location, (str, Path)):
+            with open(save_location, "wb") as f_p:
+                cls._write_points(f_p, chunks, dtype, indices.size, ext)
         else:
-            fm = "%f"
-        # noinspection PyTypeChecker
-        np.savetxt(save_location, data, fmt=["%d"] * channel_image.ndim + [fm], delimiter=" ")
+            cls._write_points(save_location, chunks, dtype, indices.size, ext)
 
     @classmethod
     def save(
@@ -286,24 +429,74 @@ class SaveXYZ(SaveBase):
         if project_info.image.shape[project_info.image.time_pos] != 1 and "time" not in parameters:
             raise NotSupportedImage("This save method o not support time data")
         channel_image = project_info.image.get_data_by_axis(c=parameters["channel"], t=parameters.get("time", 0))
+        roi = project_info.image.clip_array(project_info.roi, t=parameters.get("time", 0))
+        # single pass over roi, points are in C order like in np.nonzero
+        indices = np.flatnonzero(roi)
+        labels = roi.reshape(-1)[indices]
+        shift = np.zeros(roi.ndim, dtype=np.intp)
+        if parameters.get("clip", False) and indices.size:
+            shift = np.min(
+                [
+                    np.min(np.unravel_index(indices[i : i + POINT_CLOUD_CHUNK_SIZE], roi.shape), axis=1)
+                    for i in range(0, indices.size, POINT_CLOUD_CHUNK_SIZE)
+                ],
+                axis=0,
+            )
+        component = parameters.get("component_column", False)
+        cls._save(save_location, indices, labels, roi.shape, channel_image, shift, component)
+        if parameters.get("separated_objects", False):
+            # stable sort keeps C order of points inside component
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels)
+            ends = np.cumsum(counts)
+            base_path, ext = os.path.splitext(save_location)
+            for i in np.nonzero(counts[1:])[0] + 1:
+                part = order[ends[i] - counts[i] : ends[i]]
+                new_save_location = base_path + f"_part{i}" + ext
+                cls._save(new_save_location, indices[part], labels[part], roi.shape, channel_image, shift, component)
+
+
+class SavePointCloud(SaveXYZ):
+    """
+    Save voxels of segmentation as binary point cloud. Each point contains coordinates (``x``, ``y``, ``z``),
+    value of voxel in chosen channel and optionally component number.
+    Points are stored as ``numpy`` structured array (``.npy``) or as ``vertex`` element of binary PLY file.
+    """
 
-        segmentation_mask = np.array(project_info.roi > 0)
-        segmentation_mask = project_info.image.clip_array(segmentation_mask, t=parameters.get("time", 0))
-        if parameters.get("clip", False):
-            positions = np.transpose(np.nonzero(segmentation_mask))
-            positions = np.flip(positions, 1)
-            shift = np.min(positions, 0)
+    @classmethod
+    def get_name(cls):
+        return "Point cloud (*.npy *.ply)"
+
+    @classmethod
+    def get_short_name(cls):
+        return "point_cloud"
+
+    @classmethod
+    def get_fields(cls):
+        return super().get_fields() + [AlgorithmProperty("component_column", "Component column", False)]
+
+    @classmethod
+    def _point_dtype(cls, ndim: int, value_dtype: np.dtype, component: bool, ext: str) -> np.dtype:
+        if ext == ".ply":
+            # PLY support only limited set of types
+            value_dtype = np.dtype(value_dtype).newbyteorder("<")
+            if value_dtype.str[1:] not in _PLY_TYPES:
+                value_dtype = np.dtype("<f8")
+            return super()._point_dtype(ndim, value_dtype, component, ext).newbyteorder("<")
+        return super()._point_dtype(ndim, value_dtype, component, ext)
+
+    @classmethod
+    def _write_points(cls, file, chunks: typing.Iterable[np.ndarray], dtype: np.dtype, points_num: int, ext: str):
+        if ext == ".ply":
+            header = ["ply", "format binary_little_endian 1.0", f"element vertex {points_num}"]
+            header.extend(f"property {_PLY_TYPES[dtype[name].str[1:]]} {name}" for name in dtype.names)
+            header.append("end_header\n")
+            file.write("\n".join(header).encode("ascii"))
         else:
-            shift = np.array([0] * segmentation_mask.ndim)
-        cls._save(save_location, channel_image, segmentation_mask, shift)
-        if parameters.get("separated_objects", False):
-            components_count = np.bincount(project_info.roi.flat)
-            for i, size in enumerate(components_count[1:], 1):
-                if size > 0:
-                    segmentation_mask = np.array(project_info.roi == i)[parameters.get("time", 0)]
-                    base_path, ext = os.path.splitext(save_location)
-                    new_save_location = base_path + f"_part{i}" + ext
-                    cls._save(new_save_location, channel_image, segmentation_mask, shift)
+            header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (points_num,)}
+            np.lib.format.write_array_header_1_0(file, header)
+        for chunk in chunks:
+            file.write(chunk.tobytes())
 
 
 class SaveAsTiff(SaveBase):
@@ -368,8 +561,10 @@ class SaveAsNumpy(SaveBase):
 
 save_dict = Register(
     SaveProject,
+    SaveProjectV2,
     SaveCmap,
     SaveXYZ,
+    SavePointCloud,
     SaveAsTiff,
     SaveMaskAsTiff,
     SaveAsNumpy,
@@ -3,6 +3,63 @@ from math import acos, pi, sqrt
 import numpy as np
 
 
+def _axis_scale(ndim: int, voxel_size) -> list:
+    """Fit voxel size to last ``ndim`` axes. Leading axes without voxel size get 1."""
+    voxel_size = list(voxel_size)
+    return [voxel_size[i] if i >= 0 else 1 for i in range(len(voxel_size) - ndim, len(voxel_size))]
+
+
+def bounding_box(array: np.ndarray):
+    """
+    Bounding box of nonzero elements of array calculated with per axis reductions.
+
+    :return: tuple of slices or None if array has no nonzero element
+    """
+    res = []
+    for axis in range(array.ndim):
+        other = tuple(i for i in range(array.ndim) if i != axis)
+        nonzero = np.nonzero(np.any(array, axis=other))[0]
+        if nonzero.size == 0:
+            return None
+        res.append(slice(nonzero[0], nonzero[-1] + 1))
+    return tuple(res)
+
+
+def density_moments(image: np.ndarray, voxel_size=(1.0, 1.0, 1.0)):
+    """
+    Calculate mass, mass center and second central moments of image.
+    Sums are accumulated from projections of image on each pair of axes,
+    so no per voxel coordinates array is created.
+
+    :param image: array with density
+    :param voxel_size: voxel size for last axes of image
+    :return: mass, mass center (in physical units) and matrix
+        of sums of ``density * (x_i - center_i) * (x_j - center_j)``
+    """
+    ndim = image.ndim
+    coords = [np.arange(size) * scale for size, scale in zip(image.shape, _axis_scale(ndim, voxel_size))]
+    if ndim == 1:
+        projections = {}
+        marginals = [image.astype(np.float64)]
+    else:
+        projections = {
+            (i, j): np.sum(image, axis=tuple(k for k in range(ndim) if k not in (i, j)), dtype=np.float64)
+            for i in range(ndim)
+            for j in range(i + 1, ndim)
+        }
+        marginals = [projections[(0, 1)].sum(axis=1), projections[(0, 1)].sum(axis=0)]
+        marginals.extend(projections[(0, i)].sum(axis=0) for i in range(2, ndim))
+    mass = float(np.sum(marginals[0]))
+    center = np.array([np.dot(marginal, coord) for marginal, coord in zip(marginals, coords)]) / mass
+    centered = [coord - val for coord, val in zip(coords, center)]
+    second = np.zeros((ndim, ndim), dtype=np.float64)
+    for i in range(ndim):
+        second[i, i] = np.dot(marginals[i], centered[i] ** 2)
+    for (i, j), projection in projections.items():
+        second[i, j] = second[j, i] = np.dot(centered[i], np.dot(projection, centered[j]))
+    return mass, center, second
+
+
 def find_density_orientation(img, voxel_size, cutoff=1):
     """
     Identify axis of point set.
@@ -15,24 +72,15 @@ def find_density_orientation(img, voxel_size, cutoff=1):
         3x3 numpy array of eigen vectors
     """
     # logging.info("\n============ Performing weighted PCA on image ============")
-
-    points_l = np.nonzero(np.array(img > cutoff))
-    weights = img[points_l]
-    points_l = np.transpose(points_l).astype(np.float64)
-    if len(voxel_size) >= 3:
-        points_l[:, 0] *= voxel_size[-3]
-    points_l[:, 1] *= voxel_size[-2]
-    points_l[:, 2] *= voxel_size[-1]
-    points = points_l.astype(np.float64)
-    punkty_wazone = np.empty(points.shape)
-    for i in range(3):
-        punkty_wazone[:, i] = points[:, i] * weights
-    mean = np.sum(punkty_wazone, axis=0) / np.sum(weights)
-    points_shifted = points - mean
-    wheighted_points_shifted = np.copy(points_shifted)
-    for i in range(3):
-        wheighted_points_shifted[:, i] *= weights
-    cov = np.dot(wheighted_points_shifted.transpose(), points_shifted) * 1 / (len(weights) - 1)
+    above_cutoff = img > cutoff
+    bbox = bounding_box(above_cutoff)
+    if bbox is None:
+        # no point to analyse, axes of image are returned
+        return np.identity(3), np.zeros(3)
+    weights = np.where(above_cutoff[bbox], img[bbox], 0)
+    count = np.count_nonzero(above_cutoff[bbox])
+    _mass, _center, second = density_moments(weights, voxel_size)
+    cov = second / (count - 1)
     # cov variable is weighted covariance matrix
     values, vectors = np.linalg.eig(cov)
     # logging.info("Eigen values0\n %s", str(values))
@@ -90,10 +138,10 @@ def density_mass_center(image, voxel_size=(1.0, 1.0, 1.0)):
     else:
         voxel_size_array = voxel_size
 
-    denominator = float(np.sum(image))
+    denominator = float(np.sum(image, dtype=np.float64))
     for i, item in enumerate(iter_dim):
         ax = single_dim + tuple(iter_dim[:i] + iter_dim[i + 1 :])
-        m = np.sum(np.sum(image, axis=ax) * np.arange(image.shape[item]))
+        m = np.sum(np.sum(image, axis=ax, dtype=np.float64) * np.arange(image.shape[item]))
         res[item] = m / denominator
 
     return np.array(res) * voxel_size_array
@@ -102,12 +150,15 @@ def density_mass_center(image, voxel_size=(1.0, 1.0, 1.0)):
 def calculate_density_momentum(image: np.ndarray, voxel_size=np.array([1.0, 1.0, 1.0]), mass_center=None):
     """Calculates image momentum."""
     image = image.squeeze()
-    if not mass_center:
-        mass_center = density_mass_center(image, voxel_size)
+    if mass_center is None:
+        bbox = bounding_box(image)
+        if bbox is None:
+            return 0.0
+        return float(np.trace(density_moments(image[bbox], voxel_size)[2]))
     mass_center = np.array(mass_center)
-    points = np.transpose(np.nonzero(np.ones(image.shape, dtype=np.uint8))).astype(np.float64)
-    for i, v in enumerate(reversed(voxel_size), start=1):
-        points[:, -i] *= v
-    weights = np.sum((points - mass_center) ** 2, axis=1)
-    momentum = float(np.sum(weights * image.flatten()))
+    momentum = 0.0
+    for axis, scale in enumerate(_axis_scale(image.ndim, voxel_size)):
+        other = tuple(i for i in range(image.ndim) if i != axis)
+        marginal = np.sum(image, axis=other, dtype=np.float64)
+        momentum += float(np.dot(marginal, (np.arange(image.shape[axis]) * scale - mass_center[axis]) ** 2))
     return momentum
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from typing import Iterable, List, Union
 
@@ -33,7 +34,58 @@ enum_register.register_class(RadiusType)
 enum_register.register_class(NoiseFilterType)
 
 
-def _generic_image_operation(image, radius, fun, layer):
+class _SitkImageBuffer:
+    """Exposes buffer of SimpleITK image to numpy (read only) and keeps image alive as long as array exists"""
+
+    def __init__(self, image: sitk.Image):
+        self.image = image
+        self.__array_interface__ = sitk.GetArrayViewFromImage(image).__array_interface__
+
+    def is_whole_view(self, array: np.ndarray) -> bool:
+        """Check if array is view on whole image buffer"""
+        interface = self.__array_interface__
+        return (
+            array.__array_interface__["data"][0] == interface["data"][0]
+            and array.shape == tuple(interface["shape"])
+            and array.dtype.str == interface["typestr"]
+            and array.flags.c_contiguous
+        )
+
+
+def to_sitk_image(array: np.ndarray) -> sitk.Image:
+    """
+    Convert numpy array to SimpleITK image. Boolean arrays are converted to uint8.
+    Array created by :py:func:`from_sitk_image` is not copied, source image,
+    which shares buffer with array, is returned.
+
+    :param array: array to convert
+    :return: SimpleITK image
+    """
+    if array.dtype == np.bool_:
+        array = array.view(np.uint8)
+    base = array.base
+    while isinstance(base, np.ndarray):
+        base = base.base
+    if isinstance(base, _SitkImageBuffer) and base.is_whole_view(array):
+        return base.image
+    return sitk.GetImageFromArray(array)
+
+
+def from_sitk_image(image: sitk.Image) -> np.ndarray:
+    """
+    Zero copy conversion of SimpleITK image to read only numpy array.
+    Returned array shares memory with ``image``. If result need to be modified
+    or is returned to caller which may modify it, use :py:func:`SimpleITK.GetArrayFromImage`.
+
+    :param image: SimpleITK image
+    :return: array view on image buffer
+    """
+    array = np.asarray(_SitkImageBuffer(image))
+    array.flags.writeable = False
+    return array
+
+
+def _generic_image_operation(image, radius, fun, layer, workers: int = 1):
     if image.ndim == 2:
         layer = False
     if image.dtype == np.bool:
@@ -41,55 +93,77 @@ def _generic_image_operation(image, radius, fun, layer):
     if isinstance(radius, (list, tuple)):
         radius = list(reversed(radius))
     if not layer and image.ndim <= 3:
-        return sitk.GetArrayFromImage(fun(sitk.GetImageFromArray(image), radius))
-    return _generic_image_operations_recurse(np.copy(image), radius, fun, layer)
-
+        return sitk.GetArrayFromImage(fun(to_sitk_image(image), radius))
+    return _generic_image_operations_recurse(image, radius, fun, layer, workers)
 
-def _generic_image_operations_recurse(image, radius, fun, layer):
-    if (not layer and image.ndim == 3) or image.ndim == 2:
-        return sitk.GetArrayFromImage(fun(sitk.GetImageFromArray(image), radius))
-
-    for layer_data in image:
-        layer_data[...] = _generic_image_operations_recurse(layer_data, radius, fun, layer)
-    return image
 
+def _generic_image_operations_recurse(image, radius, fun, layer, workers: int = 1):
+    """
+    Apply ``fun`` on each 2d layer (or 3d stack if ``layer`` is False) of image.
+    Layers are independent, so they are processed in thread pool and written to single result array
+    with same dtype like ``image``.
 
-def gaussian(image: np.ndarray, radius: float, layer=True):
+    :param workers: maximum number of threads, by default layers are processed sequentially
+    """
+    base_ndim = 3 if not layer and image.ndim >= 3 else 2
+    if image.ndim == base_ndim:
+        return sitk.GetArrayFromImage(fun(to_sitk_image(image), radius))
+    result = np.empty(image.shape, dtype=image.dtype)
+
+    def process_layer(index):
+        result[index] = from_sitk_image(fun(sitk.GetImageFromArray(np.ascontiguousarray(image[index])), radius))
+
+    indexes = list(np.ndindex(*image.shape[: image.ndim - base_ndim]))
+    workers = min(workers, len(indexes))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list is used to propagate exceptions from threads
+            list(executor.map(process_layer, indexes))
+    else:
+        for index in indexes:
+            process_layer(index)
+    return result
+
+
+def gaussian(image: np.ndarray, radius: float, layer=True, workers: int = 1):
     """
     Gaussian blur of image.
 
     :param np.ndarray image: image to apply gaussian filter
     :param float radius: radius for gaussian kernel
     :param bool layer: if operation should be run on each layer separately
+    :param workers: maximum number of threads used to process layers
     :return:
     """
-    return _generic_image_operation(image, radius, sitk.DiscreteGaussian, layer)
+    return _generic_image_operation(image, radius, sitk.DiscreteGaussian, layer, workers)
 
 
-def median(image: np.ndarray, radius: Union[int, List[int]], layer=True):
+def median(image: np.ndarray, radius: Union[int, List[int]], layer=True, workers: int = 1):
     """
     Median blur of image.
 
     :param np.ndarray image: image to apply median filter
     :param float radius: radius for median kernel
     :param bool layer: if operation should be run on each layer separately
+    :param workers: maximum number of threads used to process layers
     :return:
     """
     if not isinstance(radius, Iterable):
         radius = [radius] * min(image.ndim, 2 if layer else 3)
-    return _generic_image_operation(image, radius, sitk.Median, layer)
+    return _generic_image_operation(image, radius, sitk.Median, layer, workers)
 
 
-def dilate(image, radius, layer=True):
+def dilate(image, radius, layer=True, workers: int = 1):
     """
     Dilate of image.
 
     :param image: image to apply dilation
     :param radius: dilation radius
     :param layer: if operation should be run on each layer separately
+    :param workers: maximum number of threads used to process layers
     :return:
     """
-    return _generic_image_operation(image, radius, sitk.GrayscaleDilate, layer)
+    return _generic_image_operation(image, radius, sitk.GrayscaleDilate, layer, workers)
 
 
 def apply_filter(filter_type, image, radius, layer=True) -> np.ndarray:
@@ -110,16 +184,17 @@ def apply_filter(filter_type, image, radius, layer=True) -> np.ndarray:
     return image
 
 
-def erode(image, radius, layer=True):
+def erode(image, radius, layer=True, workers: int = 1):
     """
     Erosion of image
 
     :param image: image to apply erosion
     :param radius: erosion radius
     :param layer: if operation should be run on each layer separately
+    :param workers: maximum number of threads used to process layers
     :return:
     """
-    return _generic_image_operation(image, radius, sitk.GrayscaleErode, layer)
+    return _generic_image_operation(image, radius, sitk.GrayscaleErode, layer, workers)
 
 
 def to_binary_image(image):
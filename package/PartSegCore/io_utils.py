@@ -2,7 +2,9 @@ import json
 import os
 import re
 import typing
+import zlib
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
 from io import BufferedIOBase, BytesIO, IOBase, RawIOBase, StringIO, TextIOBase
@@ -289,6 +291,255 @@ def open_tar_file(
     return tar_file, file_path
 
 
+class LazyBuffer(BytesIO):
+    """
+    :py:class:`io.BytesIO` which content is created by :py:meth:`_read_content` on first access.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def _read_content(self) -> bytes:
+        raise NotImplementedError()
+
+    def load(self):
+        """Create content if it is not created yet"""
+        if self._loaded:
+            return
+        super().write(self._read_content())
+        super().seek(0)
+        self._loaded = True
+
+    def read(self, *args):
+        self.load()
+        return super().read(*args)
+
+    def read1(self, *args):
+        self.load()
+        return super().read1(*args)
+
+    def readinto(self, buffer):
+        self.load()
+        return super().readinto(buffer)
+
+    def readline(self, *args):
+        self.load()
+        return super().readline(*args)
+
+    def seek(self, *args):
+        self.load()
+        return super().seek(*args)
+
+    def tell(self):
+        self.load()
+        return super().tell()
+
+    def write(self, data):
+        self.load()
+        return super().write(data)
+
+    def getvalue(self):
+        self.load()
+        return super().getvalue()
+
+    def getbuffer(self):
+        self.load()
+        return super().getbuffer()
+
+
+HISTORY_KEYFRAME_INTERVAL = 10
+
+
+def _load_npz(buffer: BytesIO) -> typing.Dict[str, np.ndarray]:
+    buffer.seek(0)
+    with np.load(buffer) as data:
+        res = {name: data[name] for name in data.files}
+    buffer.seek(0)
+    return res
+
+
+def _history_arrays(buffer: BytesIO) -> typing.Dict[str, np.ndarray]:
+    if isinstance(buffer, (HistoryArraysBuffer, HistorySnapshotBuffer)):
+        return buffer.arrays_dict()
+    return _load_npz(buffer)
+
+
+def _history_depth(buffer: BytesIO) -> int:
+    return buffer.depth if isinstance(buffer, HistoryArraysBuffer) else 0
+
+
+def _drop_history_cache(buffer: BytesIO):
+    if isinstance(buffer, (HistoryArraysBuffer, HistorySnapshotBuffer)):
+        buffer.drop_cache()
+
+
+HISTORY_DIFF_BLOCK = 32
+
+
+def _changed_blocks(changed: np.ndarray) -> np.ndarray:
+    """Lower bounds of blocks of regular grid which contain changes"""
+    grid_shape = tuple((x + HISTORY_DIFF_BLOCK - 1) // HISTORY_DIFF_BLOCK for x in changed.shape)
+    # changes are sparse, so voxels are searched only in their bounding box
+    bounding_box = []
+    for axis in range(changed.ndim):
+        present = np.flatnonzero(changed.any(axis=tuple(x for x in range(changed.ndim) if x != axis)))
+        if present.size == 0:
+            return np.zeros((0, changed.ndim), dtype=np.intp)
+        bounding_box.append(slice(present[0], present[-1] + 1))
+    positions = np.nonzero(changed[tuple(bounding_box)])
+    blocks = np.unique(
+        np.ravel_multi_index(
+            tuple((x + sl.start) // HISTORY_DIFF_BLOCK for x, sl in zip(positions, bounding_box)), grid_shape
+        )
+    )
+    return np.transpose(np.unravel_index(blocks, grid_shape)).reshape((-1, changed.ndim)) * HISTORY_DIFF_BLOCK
+
+
+def _array_diff(base: np.ndarray, array: np.ndarray) -> typing.Dict[str, np.ndarray]:
+    """
+    Describe ``array`` as ``base`` with labels changed by ``remap``
+    and content of ``boxes`` (lower and upper bounds) replaced with ``values``.
+    Boxes are blocks of regular grid which contain changes.
+    """
+    changed = base != array
+    res = {}
+    if array.dtype.kind == "u" and array.dtype.itemsize <= 4 and np.any(changed):
+        # label is remapped if most of its voxels get the same new label
+        old_labels = base[changed]
+        new_labels = array[changed]
+        labels_num = int(base.max()) + 1
+        candidates = np.arange(labels_num).astype(array.dtype)
+        candidates[old_labels] = new_labels
+        confirmed = np.bincount(old_labels[candidates[old_labels] == new_labels], minlength=labels_num)
+        # size of label is needed only if any of its voxels get candidate label
+        possible = np.flatnonzero(confirmed)
+        if possible.size > 8:
+            base_sizes = np.bincount(base.reshape(-1), minlength=labels_num)
+        else:
+            base_sizes = np.zeros(labels_num, dtype=np.intp)
+            for label in possible:
+                base_sizes[label] = np.count_nonzero(base == label)
+        majority = confirmed * 2 > base_sizes
+        if np.any(majority):
+            remap = np.arange(labels_num).astype(array.dtype)
+            remap[majority] = candidates[majority]
+            res["remap"] = remap
+            changed = remap[base] != array
+    if np.count_nonzero(changed) * 2 > changed.size:
+        return {"full": array}
+    lower = _changed_blocks(changed)
+    upper = np.minimum(lower + HISTORY_DIFF_BLOCK, changed.shape)
+    res["boxes"] = np.stack([lower, upper], axis=1).astype(np.intp).reshape((lower.shape[0], 2, array.ndim))
+    values = [array[tuple(slice(x, y) for x, y in zip(low, up))].reshape(-1) for low, up in zip(lower, upper)]
+    res["values"] = np.concatenate(values) if values else np.zeros(0, dtype=array.dtype)
+    return res
+
+
+def _apply_array_diff(base: np.ndarray, diff: typing.Dict[str, np.ndarray]) -> np.ndarray:
+    if "full" in diff:
+        return diff["full"]
+    array = diff["remap"][base] if "remap" in diff else np.copy(base)
+    position = 0
+    for lower, upper in diff["boxes"]:
+        shape = upper - lower
+        size = int(np.prod(shape))
+        array[tuple(slice(x, y) for x, y in zip(lower, upper))] = diff["values"][position : position + size].reshape(
+            shape
+        )
+        position += size
+    return array
+
+
+class HistorySnapshotBuffer(BytesIO):
+    """
+    ``npz`` file with all arrays of history element.
+    Arrays of newest element are cached to create difference for next element without
+    decompression (see :py:meth:`HistoryElement.create`).
+
+    :param content: ``npz`` file content
+    :param arrays: arrays of this element to cache
+    """
+
+    def __init__(self, content: bytes = b"", arrays: typing.Optional[typing.Dict[str, np.ndarray]] = None):
+        super().__init__(content)
+        self._arrays = arrays
+
+    def drop_cache(self):
+        self._arrays = None
+
+    def arrays_dict(self) -> typing.Dict[str, np.ndarray]:
+        """Arrays of history element"""
+        if self._arrays is not None:
+            return self._arrays
+        return _load_npz(self)
+
+
+class HistoryArraysBuffer(LazyBuffer):
+    """
+    Arrays of history element stored as difference to arrays of previous element
+    (changed bounding boxes and labels remap). Content, ``npz`` file like for other history elements,
+    is created on first read as file.
+    Arrays of newest element are cached to create difference for next element, for older elements
+    only compressed data are kept and arrays are rebuilt from the last full snapshot when they are needed.
+
+    :param base: arrays of previous history element
+    :param diff: ``npz`` file with difference
+    :param arrays: arrays of this element to cache
+    """
+
+    def __init__(self, base: BytesIO, diff: BytesIO, arrays: typing.Optional[typing.Dict[str, np.ndarray]] = None):
+        super().__init__()
+        self.base = base
+        self.diff = diff
+        # number of differences to apply to get arrays from full snapshot
+        self.depth = _history_depth(base) + 1
+        self._arrays = arrays
+
+    def drop_cache(self):
+        self._arrays = None
+
+    def arrays_dict(
+        self, base_arrays: typing.Optional[typing.Dict[str, np.ndarray]] = None
+    ) -> typing.Dict[str, np.ndarray]:
+        """
+        Arrays of history element
+
+        :param base_arrays: arrays of :py:attr:`base` if they are already known
+        """
+        if self._arrays is not None:
+            return self._arrays
+        if self.loaded:
+            return _load_npz(self)
+        base = _history_arrays(self.base) if base_arrays is None else base_arrays
+        diff = _load_npz(self.diff)
+        res = {}
+        for name in sorted({x.rsplit("_", 1)[0] for x in diff}):
+            array_diff = {x.rsplit("_", 1)[1]: y for x, y in diff.items() if x.rsplit("_", 1)[0] == name}
+            res[name] = _apply_array_diff(base.get(name), array_diff)
+        return res
+
+    def _read_content(self) -> bytes:
+        buffer = BytesIO()
+        np.savez_compressed(buffer, **self.arrays_dict())
+        return buffer.getvalue()
+
+
+def history_arrays_content(buffer: BytesIO) -> BytesIO:
+    """
+    ``npz`` file with arrays of history element to write in project file.
+    Content of :py:class:`HistoryArraysBuffer` is created in temporary buffer, so it is not kept in history.
+    """
+    if isinstance(buffer, HistoryArraysBuffer) and not buffer.loaded:
+        return BytesIO(buffer._read_content())
+    buffer.seek(0)
+    return buffer
+
+
 class HistoryElement(BaseSerializableClass):
     segmentation_parameters: typing.Dict[str, typing.Any]
     mask_property: MaskProperty
@@ -301,21 +552,55 @@ class HistoryElement(BaseSerializableClass):
         mask: typing.Union[np.ndarray, None],
         segmentation_parameters: dict,
         mask_property: MaskProperty,
+        previous: typing.Optional["HistoryElement"] = None,
     ):
+        """
+        :param previous: previous history element. If provided then arrays are stored as difference
+            to its arrays (see :py:class:`HistoryArraysBuffer`). Every :py:data:`HISTORY_KEYFRAME_INTERVAL`
+            element is stored in full.
+        """
         if "name" in segmentation_parameters:
             raise ValueError("name")
-        arrays = BytesIO()
         arrays_dict = {"segmentation": segmentation}
         if mask is not None:
             arrays_dict["mask"] = mask
-        np.savez_compressed(arrays, **arrays_dict)
-        arrays.seek(0)
+        depth = 0 if previous is None else _history_depth(previous.arrays) + 1
+        # arrays are cached only for elements of history chain, to create next difference fast
+        cached_arrays = None if previous is None else {name: np.copy(array) for name, array in arrays_dict.items()}
+        if 0 < depth < HISTORY_KEYFRAME_INTERVAL:
+            base_arrays = _history_arrays(previous.arrays)
+            diff_dict = {}
+            for name, array in arrays_dict.items():
+                base = base_arrays.get(name)
+                if base is None or base.shape != array.shape or base.dtype != array.dtype:
+                    diff_dict[f"{name}_full"] = array
+                else:
+                    diff_dict.update({f"{name}_{x}": y for x, y in _array_diff(base, array).items()})
+            diff = BytesIO()
+            np.savez_compressed(diff, **diff_dict)
+            arrays = HistoryArraysBuffer(previous.arrays, diff, cached_arrays)
+        else:
+            buffer = BytesIO()
+            np.savez_compressed(buffer, **arrays_dict)
+            arrays = HistorySnapshotBuffer(buffer.getvalue(), cached_arrays)
+        if previous is not None:
+            # only newest element keeps uncompressed arrays
+            _drop_history_cache(previous.arrays)
         return cls(
             segmentation_parameters=segmentation_parameters,
             mask_property=mask_property,
             arrays=arrays,
         )
 
+    def get_arrays(self) -> typing.Dict[str, np.ndarray]:
+        """
+        Arrays of history element (``segmentation`` and optional ``mask``).
+        Prefer it over reading :py:attr:`arrays` when ``npz`` file is not needed.
+        Arrays of newest element are shared with its cache, so they should not be modified
+        as long as element stays in history.
+        """
+        return _history_arrays(self.arrays)
+
 
 class HistoryProblem(Exception):
     pass
@@ -360,6 +645,107 @@ def tar_to_buff(tar_file, member_name) -> BytesIO:
     return buffer
 
 
+ARRAY_CHUNK_SIZE = 2 ** 22
+
+
+def _chunk_workers(workers: typing.Optional[int], chunks_num: int) -> int:
+    return min(min(8, os.cpu_count() or 1) if workers is None else workers, chunks_num)
+
+
+def save_chunked_array(
+    tar_file: TarFile, name: str, array: np.ndarray, compression_level: int = 1, workers: typing.Optional[int] = None
+) -> dict:
+    """
+    Save array as single member of tar file. Raw data of array are split on chunks of
+    :py:data:`ARRAY_CHUNK_SIZE` bytes which are compressed independently with zlib in thread pool.
+
+    :param tar_file: tar file opened for write
+    :param name: name of member
+    :param array: array to save
+    :param compression_level: zlib compression level, fast one is default
+    :param workers: maximum number of threads, default is number of cpu (but no more than 8)
+    :return: description of array (json serializable) which is needed by :py:func:`load_chunked_array`
+    """
+    array = np.ascontiguousarray(array)
+    buffer = array.reshape(-1).view(np.uint8)
+    starts = range(0, buffer.size, ARRAY_CHUNK_SIZE)
+
+    def compress_chunk(start):
+        return zlib.compress(buffer[start : start + ARRAY_CHUNK_SIZE], compression_level)
+
+    workers = _chunk_workers(workers, len(starts))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(compress_chunk, starts))
+    else:
+        chunks = [compress_chunk(x) for x in starts]
+    data = BytesIO(b"".join(chunks))
+    tar_file.addfile(get_tarinfo(name, data), data)
+    return {
+        "member": name,
+        "shape": list(array.shape),
+        "dtype": array.dtype.str,
+        "codec": "zlib",
+        "chunk_size": ARRAY_CHUNK_SIZE,
+        "chunks": [len(x) for x in chunks],
+    }
+
+
+def load_chunked_array(tar_file: TarFile, description: dict, workers: typing.Optional[int] = None) -> np.ndarray:
+    """
+    Load array saved with :py:func:`save_chunked_array`. Chunks are decompressed in thread pool.
+
+    :param tar_file: tar file
+    :param description: description of array returned by :py:func:`save_chunked_array`
+    :param workers: maximum number of threads, default is number of cpu (but no more than 8)
+    """
+    if description["codec"] != "zlib":
+        raise ValueError(f"Unsupported array codec {description['codec']}")
+    result = np.empty(description["shape"], dtype=np.dtype(description["dtype"]))
+    buffer = result.reshape(-1).view(np.uint8)
+    chunk_size = description["chunk_size"]
+    file_obj = tar_file.extractfile(tar_file.getmember(description["member"]))
+
+    def decompress_chunk(args):
+        start, data = args
+        buffer[start : start + chunk_size] = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+
+    chunks = ((i * chunk_size, file_obj.read(size)) for i, size in enumerate(description["chunks"]))
+    workers = _chunk_workers(workers, len(description["chunks"]))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list is used to propagate exceptions from threads
+            list(executor.map(decompress_chunk, chunks))
+    else:
+        for chunk in chunks:
+            decompress_chunk(chunk)
+    return result
+
+
+class TarMemberBuffer(LazyBuffer):
+    """
+    :py:class:`io.BytesIO` with content of member of uncompressed tar file which is read on first access.
+    Used to postpone reading of data which may be never used (like arrays of project history).
+
+    :param file_path: path to uncompressed tar file
+    :param member: member of this tar file
+    """
+
+    def __init__(self, file_path: typing.Union[str, Path], member: TarInfo):
+        super().__init__()
+        stat = os.stat(file_path)
+        self._source = (str(file_path), member.offset_data, member.size, stat.st_mtime_ns, stat.st_size)
+
+    def _read_content(self) -> bytes:
+        file_path, offset, size, mtime, file_size = self._source
+        stat = os.stat(file_path)
+        if (stat.st_mtime_ns, stat.st_size) != (mtime, file_size):
+            raise OSError(f"File {file_path} was modified, cannot read {size} bytes from position {offset}")
+        with open(file_path, "rb") as f_p:
+            f_p.seek(offset)
+            return f_p.read(size)
+
+
 class SaveScreenshot(SaveBase):
     @classmethod
     def get_short_name(cls):
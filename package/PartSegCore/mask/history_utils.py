@@ -1,9 +1,16 @@
+import typing
+
 from PartSegCore.io_utils import HistoryElement
 from PartSegCore.mask.io_functions import MaskProjectTuple
 from PartSegCore.mask_create import MaskProperty
 
 
-def create_history_element_from_segmentation_tuple(project_info: MaskProjectTuple, mask_property: MaskProperty):
+def create_history_element_from_segmentation_tuple(
+    project_info: MaskProjectTuple, mask_property: MaskProperty, previous: typing.Optional[HistoryElement] = None
+):
+    """
+    :param previous: previous history element, if provided then only difference to it is stored
+    """
     return HistoryElement.create(
         segmentation=project_info.roi,
         mask=project_info.mask,
@@ -12,4 +19,5 @@ def create_history_element_from_segmentation_tuple(project_info: MaskProjectTupl
             "parameters": project_info.roi_extraction_parameters,
         },
         mask_property=mask_property,
+        previous=previous,
     )
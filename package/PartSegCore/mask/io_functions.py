@@ -4,6 +4,7 @@ import os
 import tarfile
 import typing
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import partial
 from io import BufferedIOBase, BytesIO, IOBase, RawIOBase, TextIOBase
 from pathlib import Path
@@ -16,6 +17,7 @@ from PartSegImage.image import reduce_array
 
 from ..algorithm_describe_base import AlgorithmProperty, Register, ROIExtractionProfile
 from ..io_utils import (
+    HistoryArraysBuffer,
     HistoryElement,
     LoadBase,
     SaveBase,
@@ -25,8 +27,10 @@ from ..io_utils import (
     SegmentationType,
     UpdateLoadedMetadataBase,
     WrongFileTypeException,
+    _chunk_workers,
     check_segmentation_type,
     get_tarinfo,
+    history_arrays_content,
     open_tar_file,
     proxy_callback,
     tar_to_buff,
@@ -142,6 +146,8 @@ def save_stack_segmentation(
             tar_file.addfile(mask_tar, fileobj=mask_buff)
         step_changed(5)
         el_info = []
+        arrays_index = {}
+        previous_arrays = {}
         for i, hist in enumerate(segmentation_info.history):
             el_info.append(
                 {
@@ -150,10 +156,23 @@ def save_stack_segmentation(
                     "segmentation_parameters": hist.segmentation_parameters,
                 }
             )
-            hist.arrays.seek(0)
-            hist_info = get_tarinfo(f"history/arrays_{i}.npz", hist.arrays)
-            hist.arrays.seek(0)
-            tar_file.addfile(hist_info, hist.arrays)
+            if isinstance(hist.arrays, HistoryArraysBuffer):
+                # full arrays are saved for older PartSeg versions, which do not read differences.
+                # Arrays of previous element are reused, so whole chain is not rebuilt for each element
+                arrays = hist.arrays.arrays_dict(previous_arrays.get(id(hist.arrays.base)))
+                previous_arrays = {id(hist.arrays): arrays}
+                hist_buff = BytesIO()
+                np.savez_compressed(hist_buff, **arrays)
+                hist_buff.seek(0)
+            else:
+                previous_arrays = {}
+                hist_buff = history_arrays_content(hist.arrays)
+            tar_file.addfile(get_tarinfo(f"history/arrays_{i}.npz", hist_buff), hist_buff)
+            # difference to earlier element is saved as is, base is referenced by its index
+            if isinstance(hist.arrays, HistoryArraysBuffer) and id(hist.arrays.base) in arrays_index:
+                el_info[-1]["base"] = arrays_index[id(hist.arrays.base)]
+                tar_file.addfile(get_tarinfo(f"history/diff_{i}.npz", hist.arrays.diff), hist.arrays.diff)
+            arrays_index[id(hist.arrays)] = i
         if len(el_info) > 0:
             hist_str = json.dumps(el_info, cls=ProfileEncoder)
             hist_buff = BytesIO(hist_str.encode("utf-8"))
@@ -212,9 +231,12 @@ def load_stack_segmentation(file_data: typing.Union[str, Path], range_changed=No
             history_buff = tar_file.extractfile(tar_file.getmember("history/history.json")).read()
             history_json = load_metadata(history_buff)
             for el in history_json:
-                history_buffer = BytesIO()
-                history_buffer.write(tar_file.extractfile(f"history/arrays_{el['index']}.npz").read())
-                history_buffer.seek(0)
+                if "base" in el:
+                    history_buffer = HistoryArraysBuffer(
+                        history[el["base"]].arrays, tar_to_buff(tar_file, f"history/diff_{el['index']}.npz")
+                    )
+                else:
+                    history_buffer = tar_to_buff(tar_file, f"history/arrays_{el['index']}.npz")
                 history.append(
                     HistoryElement(
                         segmentation_parameters=el["segmentation_parameters"],
@@ -510,7 +532,21 @@ def save_components(
     segmentation_info: typing.Optional[ROIInfo] = None,
     range_changed=None,
     step_changed=None,
+    workers: typing.Optional[int] = None,
 ):
+    """
+    Save each component as separated image with mask. Components are cropped to its bounding boxes
+    (calculated in single pass over ``segmentation``) and written in thread pool.
+
+    :param image: image to cut components from
+    :param components: numbers of components to save
+    :param segmentation: array with components
+    :param dir_path: directory to save files
+    :param segmentation_info: information about ``segmentation``, bounding boxes are reused if fit to image
+    :param range_changed: report function for inform about steps num
+    :param step_changed: report function for progress
+    :param workers: maximum number of threads, default is number of cpu (but no more than 8)
+    """
     if range_changed is None:
         range_changed = empty_fun
     if step_changed is None:
@@ -518,19 +554,35 @@ def save_components(
 
     segmentation = image.fit_array_to_image(segmentation)
 
-    if segmentation_info is None:
-        segmentation_info = ROIInfo(segmentation)
+    if segmentation_info is None or segmentation_info.bound_arrays.lower.shape[1] != segmentation.ndim:
+        bound_arrays = ROIInfo.calc_bounds_arrays(segmentation)
+    else:
+        bound_arrays = segmentation_info.bound_arrays
     os.makedirs(dir_path, exist_ok=True)
 
     file_name = os.path.splitext(os.path.basename(image.file_path))[0]
-    range_changed(0, 2 * len(components))
-    for i in components:
-        im = image.cut_image(segmentation == i, replace_mask=True)
-        # print(f"[run] {im}")
-        ImageWriter.save(im, os.path.join(dir_path, f"{file_name}_component{i}.tif"))
-        step_changed(2 * i + 1)
-        ImageWriter.save_mask(im, os.path.join(dir_path, f"{file_name}_component{i}_mask.tif"))
-        step_changed(2 * i + 2)
+    range_changed(0, len(components))
+
+    def save_component(num):
+        if num >= bound_arrays.upper.shape[0] or bound_arrays.upper[num, 0] < 0:
+            return
+        bounding_box = tuple(bound_arrays.get_bound_info(num).get_slices())
+        im = image.cut_image(segmentation[bounding_box] == num, replace_mask=True, bounding_box=bounding_box)
+        ImageWriter.save(im, os.path.join(dir_path, f"{file_name}_component{num}.tif"))
+        ImageWriter.save_mask(im, os.path.join(dir_path, f"{file_name}_component{num}_mask.tif"))
+
+    workers = _chunk_workers(workers, len(components))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(save_component, num) for num in components]
+            # progress is reported from calling thread
+            for i, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                step_changed(i)
+    else:
+        for i, num in enumerate(components, start=1):
+            save_component(num)
+            step_changed(i)
 
 
 class SaveComponents(SaveBase):
@@ -1,12 +1,14 @@
 import typing
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import SimpleITK as sitk
+from scipy import ndimage
 
 from PartSegImage.image import minimal_dtype
 
 from .class_generator import BaseSerializableClass
-from .image_operations import RadiusType, dilate, erode
+from .image_operations import RadiusType, dilate, erode, from_sitk_image, to_sitk_image
 from .project_info import ProjectInfoBase
 
 
@@ -78,7 +80,10 @@ MaskProperty.__eq__ = mp_eq
 
 
 def calculate_mask_from_project(
-    mask_description: MaskProperty, project: ProjectInfoBase, components: typing.Optional[typing.List[int]] = None
+    mask_description: MaskProperty,
+    project: ProjectInfoBase,
+    components: typing.Optional[typing.List[int]] = None,
+    workers: int = 1,
 ) -> np.ndarray:
     """
     Function for calculate mask base on MaskProperty.
@@ -88,6 +93,7 @@ def calculate_mask_from_project(
     :param ProjectInfoBase project: project with information about segmentation
     :param typing.Optional[typing.List[int]] components: If present inform which components
         should be used when calculation mask, otherwise use all.
+    :param int workers: number of threads used for calculation (see :py:func:`calculate_mask`)
     :return: new mask
     :rtype: np.ndarray
     """
@@ -95,7 +101,9 @@ def calculate_mask_from_project(
         time_axis = project.image.time_pos
     except AttributeError:
         time_axis = None
-    return calculate_mask(mask_description, project.roi, project.mask, project.image.spacing, components, time_axis)
+    return calculate_mask(
+        mask_description, project.roi, project.mask, project.image.spacing, components, time_axis, workers
+    )
 
 
 def calculate_mask(
@@ -105,6 +113,7 @@ def calculate_mask(
     spacing: typing.Iterable[typing.Union[float, int]],
     components: typing.Optional[typing.List[int]] = None,
     time_axis: typing.Optional[int] = 0,
+    workers: int = 1,
 ) -> np.ndarray:
     """
     Function for calculate mask base on MaskProperty.
@@ -119,6 +128,8 @@ def calculate_mask(
     :param typing.Optional[typing.List[int]] components: If present inform which components
         should be used when calculation mask, otherwise use all.
     :param typing.Optional[int] time_axis: which axis of array should be treated as time. IF none then none.
+    :param int workers: number of threads. If array has more than one time frame then they are used
+        to process frames concurrently, otherwise for layers of dilation and to fill holes of components
     :return: new mask
     :rtype: np.ndarray
     """
@@ -139,18 +150,31 @@ def calculate_mask(
     else:
         mask = np.array(segmentation > 0)
     if time_axis is None:
-        return _calculate_mask(mask_description, dilate_radius, mask, old_mask)
-    slices: typing.List[typing.Union[slice, int]] = [slice(None) for _ in range(mask.ndim)]
-    final_shape = list(mask.shape)
-    final_shape[time_axis] = 1
-    final_shape = tuple(final_shape)
-    res = []
-    for i in range(mask.shape[time_axis]):
-        slices[time_axis] = i
-        t_slices = tuple(slices)
+        return _calculate_mask(mask_description, dilate_radius, mask, old_mask, workers)
+    frames_num = mask.shape[time_axis]
+    # threads are used for frames if there is more than one, otherwise for components of single frame
+    frame_workers = min(workers, frames_num)
+    component_workers = 1 if frame_workers > 1 else workers
+
+    def frame_slices(frame: int) -> typing.Tuple[typing.Union[slice, int], ...]:
+        return tuple(frame if i == time_axis else slice(None) for i in range(mask.ndim))
+
+    def calculate_frame(frame: int) -> np.ndarray:
+        t_slices = frame_slices(frame)
         _old_mask = old_mask[t_slices] if old_mask is not None else None
-        res.append(_calculate_mask(mask_description, dilate_radius, mask[t_slices], _old_mask).reshape(final_shape))
-    return np.concatenate(res, axis=time_axis)
+        return _calculate_mask(mask_description, dilate_radius, mask[t_slices], _old_mask, component_workers)
+
+    first_frame = calculate_frame(0)
+    res = np.empty(mask.shape, dtype=first_frame.dtype)
+    res[frame_slices(0)] = first_frame
+    if frame_workers > 1:
+        with ThreadPoolExecutor(max_workers=frame_workers) as executor:
+            for i, frame_mask in enumerate(executor.map(calculate_frame, range(1, frames_num)), start=1):
+                res[frame_slices(i)] = frame_mask
+    else:
+        for i in range(1, frames_num):
+            res[frame_slices(i)] = calculate_frame(i)
+    return res
 
 
 def _calculate_mask(
@@ -158,16 +182,17 @@ def _calculate_mask(
     dilate_radius: typing.List[int],
     mask: np.ndarray,
     old_mask: typing.Union[None, np.ndarray],
+    workers: int = 1,
 ) -> np.ndarray:
     if mask_description.dilate != RadiusType.NO and mask_description.dilate_radius != 0:
         if mask_description.dilate_radius > 0:
-            mask = dilate(mask, dilate_radius, mask_description.dilate == RadiusType.R2D)
-            mask = _fill_holes(mask_description, mask)
+            mask = dilate(mask, dilate_radius, mask_description.dilate == RadiusType.R2D, workers)
+            mask = _fill_holes(mask_description, mask, workers)
         elif mask_description.dilate_radius < 0:
-            mask = _fill_holes(mask_description, mask)
-            mask = erode(mask, dilate_radius, mask_description.dilate == RadiusType.R2D)
+            mask = _fill_holes(mask_description, mask, workers)
+            mask = erode(mask, dilate_radius, mask_description.dilate == RadiusType.R2D, workers)
     elif mask_description.fill_holes != RadiusType.NO:
-        mask = _fill_holes(mask_description, mask)
+        mask = _fill_holes(mask_description, mask, workers)
     if mask_description.reversed_mask:
         mask = np.array(mask == 0).astype(np.uint8)
     if mask_description.clip_to_mask and old_mask is not None:
@@ -178,27 +203,27 @@ def _calculate_mask(
 def _cut_components(
     mask: np.ndarray, image: np.ndarray, borders: int = 0
 ) -> typing.Iterator[typing.Tuple[np.ndarray, typing.List[slice], int]]:
-    sizes = np.bincount(mask.flat)
-    for i, size in enumerate(sizes[1:], 1):
-        if size > 0:
-            points = np.nonzero(mask == i)
-            lower_bound = np.min(points, axis=1)
-            upper_bound = np.max(points, axis=1)
-            new_cut = tuple([slice(x, y + 1) for x, y in zip(lower_bound, upper_bound)])
-            new_size = [y - x + 1 + 2 * borders for x, y in zip(lower_bound, upper_bound)]
-            if borders > 0:
-                res = np.zeros(new_size, dtype=image.dtype)
-                res_cut = tuple([slice(borders, x - borders) for x in res.shape])
-                tmp_res = np.copy(image[new_cut])
-                tmp_res[mask[new_cut] != i] = 0
-                res[res_cut] = tmp_res
-            else:
-                res = image[new_cut]
-                res[mask[new_cut] != i] = 0
-            yield res, tuple(new_cut), i
-
-
-def _fill_holes(mask_description: MaskProperty, mask: np.ndarray) -> np.ndarray:
+    """
+    Yield each component of ``mask`` cut to its bounding box (extended by ``borders``).
+    Bounding boxes of all components are calculated in one pass.
+    """
+    for i, new_cut in enumerate(ndimage.find_objects(mask), 1):
+        if new_cut is None:
+            continue
+        new_size = [x.stop - x.start + 2 * borders for x in new_cut]
+        if borders > 0:
+            res = np.zeros(new_size, dtype=image.dtype)
+            res_cut = tuple([slice(borders, x - borders) for x in res.shape])
+            tmp_res = np.copy(image[new_cut])
+            tmp_res[mask[new_cut] != i] = 0
+            res[res_cut] = tmp_res
+        else:
+            res = image[new_cut]
+            res[mask[new_cut] != i] = 0
+        yield res, tuple(new_cut), i
+
+
+def _fill_holes(mask_description: MaskProperty, mask: np.ndarray, workers: int = 1) -> np.ndarray:
     if mask_description.fill_holes == RadiusType.NO:
         return mask
     if mask_description.save_components:
@@ -206,12 +231,21 @@ def _fill_holes(mask_description: MaskProperty, mask: np.ndarray) -> np.ndarray:
         res_slice = tuple([slice(border, -border) for _ in range(mask.ndim)])
         mask_description_copy = mask_description.replace_(save_components=False)
         mask_prohibited = mask > 0
-        for component, slice_arr, cmp_num in _cut_components(mask, mask, border):
-            mask_prohibited_component = mask_prohibited[slice_arr]
-            new_component = _fill_holes(mask_description_copy, component)
-            new_component = new_component[res_slice]
-            new_component[mask_prohibited_component > 0] = 0
-            mask[slice_arr][new_component > 0] = cmp_num
+
+        def fill_component(component_info):
+            component, slice_arr, cmp_num = component_info
+            new_component = _fill_holes(mask_description_copy, component)[res_slice]
+            return new_component > mask_prohibited[slice_arr], slice_arr, cmp_num
+
+        components = _cut_components(mask, mask, border)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # results are applied in components order to get same result as in sequential calculation
+                for new_component, slice_arr, cmp_num in executor.map(fill_component, components):
+                    mask[slice_arr][new_component] = cmp_num
+        else:
+            for new_component, slice_arr, cmp_num in map(fill_component, components):
+                mask[slice_arr][new_component] = cmp_num
     else:
         if mask_description.fill_holes == RadiusType.R2D:
             mask = fill_2d_holes_in_mask(mask, mask_description.max_holes_size)
@@ -230,27 +264,17 @@ def fill_holes_in_mask(mask: np.ndarray, volume: int) -> np.ndarray:
     :return: modified mask
     """
     holes_mask = (mask == 0).astype(np.uint8)
-    component_mask = sitk.GetArrayFromImage(
-        sitk.RelabelComponent(sitk.ConnectedComponent(sitk.GetImageFromArray(holes_mask)))
-    )
-    border_set: typing.Set[int] = set()
+    component_mask = from_sitk_image(sitk.ConnectedComponent(to_sitk_image(holes_mask)))
+    components_num = int(component_mask.max())
+    # lookup table: True for label which should be part of result mask
+    to_fill = np.ones(components_num + 1, dtype=np.bool_)
     for dim_num in range(component_mask.ndim):
-        border_set.update(list(np.unique(np.take(component_mask, [0, -1], axis=dim_num))))
-    if 0 in border_set:
-        border_set.remove(0)
-    components_num = component_mask.max()
-    if component_mask.dtype.type(components_num) >= component_mask.dtype.type(components_num + 1):
-        raise ValueError("overflow error")
-    for num in border_set:
-        component_mask[component_mask == num] = components_num + 1
+        to_fill[np.take(component_mask, [0, -1], axis=dim_num)] = False
+    to_fill[0] = True
     if volume > 0:
-        sizes = np.bincount(component_mask.flat)
-        for i, v in enumerate(sizes[1:], 1):
-            if v <= volume and i < components_num + 1:
-                component_mask[component_mask == i] = 0
-    else:
-        component_mask[component_mask <= components_num] = 0
-    return component_mask == 0
+        to_fill[np.bincount(component_mask.ravel(), minlength=components_num + 1) > volume] = False
+        to_fill[0] = True
+    return to_fill[component_mask]
 
 
 def fill_2d_holes_in_mask(mask: np.ndarray, volume: int) -> np.ndarray:
@@ -16,6 +16,7 @@ from scipy.ndimage import distance_transform_edt
 
 from PartSegCore.algorithm_describe_base import AlgorithmDescribeBase, AlgorithmProperty
 
+from .image_operations import from_sitk_image, to_sitk_image
 from .universal_const import UNIT_SCALE, Units
 
 
@@ -61,9 +62,7 @@ class BorderRim(AlgorithmDescribeBase):
         final_radius = [int((distance / units_scalar) / x) for x in reversed(voxel_size)]
         mask = np.array(mask > 0)
         mask = mask.astype(np.uint8)
-        eroded = SimpleITK.GetArrayFromImage(
-            SimpleITK.BinaryErode(SimpleITK.GetImageFromArray(mask.squeeze()), final_radius)
-        )
+        eroded = from_sitk_image(SimpleITK.BinaryErode(to_sitk_image(mask.squeeze()), final_radius))
         eroded = eroded.reshape(mask.shape)
         mask[eroded > 0] = 0
         return mask
@@ -1,6 +1,7 @@
 from typing import Any, Dict, List, NamedTuple, Optional
 
 import numpy as np
+from scipy import ndimage
 
 from PartSegCore.utils import numpy_repr
 from PartSegImage.image import Image, minimal_dtype
@@ -22,12 +23,35 @@ class BoundInfo(NamedTuple):
         return [slice(x, y + 1) for x, y in zip(self.lower, self.upper)]
 
 
+class BoundArrays(NamedTuple):
+    """
+    Bounding boxes of all components stored in two arrays of shape ``(components_num + 1, ndim)``.
+    Row ``i`` contains bounds of component ``i``.
+    For absent components (and background) ``lower`` is filled with 0 and ``upper`` with -1.
+    """
+
+    lower: np.ndarray
+    upper: np.ndarray
+
+    def box_size(self) -> np.ndarray:
+        """Sizes of bounding boxes"""
+        return self.upper - self.lower + 1
+
+    def present(self) -> np.ndarray:
+        """Numbers of components which are present in array"""
+        return np.nonzero(self.upper[:, 0] >= 0)[0]
+
+    def get_bound_info(self, num: int) -> BoundInfo:
+        return BoundInfo(lower=self.lower[num], upper=self.upper[num])
+
+
 class ROIInfo:
     """
     Object to storage meta information about given segmentation.
     Segmentation array is only referenced, not copied.
 
     :ivar numpy.ndarray ~.segmentation: reference to segmentation
+    :ivar BoundArrays bound_arrays: bounding boxes of components
     :ivar Dict[int,BoundInfo] bound_info: mapping from component number to bounding box
     :ivar numpy.ndarray sizes: array with sizes of components
     """
@@ -40,17 +64,25 @@ class ROIInfo:
     ):
         self.annotations = {} if annotation is None else annotation
         self.alternative = {} if alternative is None else alternative
+        self._bound_info = None
         if roi is None:
             self.roi = None
-            self.bound_info = {}
+            self.bound_arrays = BoundArrays(np.zeros((1, 0), dtype=np.intp), np.zeros((1, 0), dtype=np.intp))
+            self._bound_info = {}
             self.sizes = []
             return
         max_val = np.max(roi)
         dtype = minimal_dtype(max_val)
         roi = roi.astype(dtype)
         self.roi = roi
-        self.bound_info = self.calc_bounds(roi)
-        self.sizes = np.bincount(roi.flat)
+        self.bound_arrays = self.calc_bounds_arrays(roi)
+        self.sizes = np.bincount(roi.ravel())
+
+    @property
+    def bound_info(self) -> Dict[int, BoundInfo]:
+        if self._bound_info is None:
+            self._bound_info = {int(i): self.bound_arrays.get_bound_info(i) for i in self.bound_arrays.present()}
+        return self._bound_info
 
     def fit_to_image(self, image: Image) -> "ROIInfo":
         roi = image.fit_array_to_image(self.roi)
@@ -68,7 +100,27 @@ class ROIInfo:
         )
 
     @staticmethod
-    def calc_bounds(roi: np.ndarray) -> Dict[int, BoundInfo]:
+    def calc_bounds_arrays(roi: np.ndarray) -> BoundArrays:
+        """
+        Calculate bounding boxes of components in single pass over array.
+
+        :param np.ndarray roi: array for which bounds boxes should be calculated
+        :return: bounding boxes of all components
+        :rtype: BoundArrays
+        """
+        if roi.dtype == np.bool_:
+            roi = roi.view(np.uint8)
+        objects = ndimage.find_objects(roi) if roi.size else []
+        lower = np.zeros((len(objects) + 1, roi.ndim), dtype=np.intp)
+        upper = np.full((len(objects) + 1, roi.ndim), -1, dtype=np.intp)
+        for i, slices in enumerate(objects, start=1):
+            if slices is not None:
+                lower[i] = [x.start for x in slices]
+                upper[i] = [x.stop - 1 for x in slices]
+        return BoundArrays(lower=lower, upper=upper)
+
+    @classmethod
+    def calc_bounds(cls, roi: np.ndarray) -> Dict[int, BoundInfo]:
         """
         Calculate bounding boxes components
 
@@ -76,13 +128,5 @@ class ROIInfo:
         :return: mapping component number to bounding box
         :rtype: Dict[int, BoundInfo]
         """
-        bound_info = {}
-        count = np.max(roi)
-        for i in range(1, count + 1):
-            component = np.array(roi == i)
-            if np.any(component):
-                points = np.nonzero(component)
-                lower = np.min(points, 1)
-                upper = np.max(points, 1)
-                bound_info[i] = BoundInfo(lower=lower, upper=upper)
-        return bound_info
+        bound_arrays = cls.calc_bounds_arrays(roi)
+        return {int(i): bound_arrays.get_bound_info(i) for i in bound_arrays.present()}
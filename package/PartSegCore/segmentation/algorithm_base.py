@@ -105,6 +105,7 @@ class SegmentationAlgorithm(AlgorithmDescribeBase, ABC):
     :ivar numpy.ndarray ~.channel: selected channel
     :ivar numpy.ndarray ~.segmentation: final segmentation
     :ivar numpy.ndarray ~.mask: mask limiting segmentation area
+    :ivar int ~.workers: maximum number of threads used by per layer operations (like noise filtering)
     """
 
     def __init__(self):
@@ -114,6 +115,7 @@ class SegmentationAlgorithm(AlgorithmDescribeBase, ABC):
         self.segmentation = None
         self._mask: Optional[np.ndarray] = None
         self.new_parameters: Dict[str, Any] = {}
+        self.workers = 1
 
     def __repr__(self):  # pragma: no cover
         if self.mask is None:
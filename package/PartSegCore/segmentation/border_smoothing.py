@@ -1,11 +1,66 @@
+import typing
 from abc import ABC
 
 import numpy as np
 import SimpleITK as sitk
 
 from PartSegCore.algorithm_describe_base import AlgorithmDescribeBase, AlgorithmProperty, Register
+from PartSegCore.image_operations import from_sitk_image, to_sitk_image
 from PartSegCore.segmentation.watershed import NeighType, get_neighbourhood
 
+# Neighbourhoods as sums of separable terms. Each term is sign and, for each axis, shifts which are summed
+# (0, 1, 2 means whole 3 voxel window, 0, 2 only outer voxels and 1 only central voxel).
+_BOX = (0, 1, 2)
+_OUTER = (0, 2)
+_CENTER = (1,)
+_NEIGHBOURHOOD_TERMS = {
+    (NeighType.sides, 3): [
+        (1, (_OUTER, _CENTER, _CENTER)),
+        (1, (_CENTER, _OUTER, _CENTER)),
+        (1, (_CENTER, _CENTER, _OUTER)),
+    ],
+    (NeighType.edges, 3): [(1, (_BOX, _BOX, _BOX)), (-1, (_OUTER, _OUTER, _OUTER)), (-1, (_CENTER, _CENTER, _CENTER))],
+    (NeighType.vertex, 3): [(1, (_BOX, _BOX, _BOX)), (-1, (_CENTER, _CENTER, _CENTER))],
+    (NeighType.sides, 2): [(1, (_CENTER, _OUTER, _CENTER)), (1, (_CENTER, _CENTER, _OUTER))],
+    (NeighType.edges, 2): [(1, (_CENTER, _BOX, _BOX)), (-1, (_CENTER, _CENTER, _CENTER))],
+    (NeighType.vertex, 2): [(1, (_CENTER, _BOX, _BOX)), (-1, (_CENTER, _CENTER, _CENTER))],
+}
+
+
+def _shifted_sum(array: np.ndarray, shifts_list: typing.Sequence[typing.Sequence[int]]) -> np.ndarray:
+    for axis, shifts in enumerate(shifts_list):
+        parts = [array[(slice(None),) * axis + (slice(shift, array.shape[axis] - 2 + shift),)] for shift in shifts]
+        if len(parts) == 1:
+            array = parts[0]
+            continue
+        array = parts[0] + parts[1]
+        for part in parts[2:]:
+            array += part
+    return array
+
+
+def neighbour_count(segmentation_bin: np.ndarray, neighbourhood_type: NeighType) -> np.ndarray:
+    """
+    Count labeled voxels in neighbourhood of each voxel. Voxels outside array are treated as not labeled.
+
+    :param segmentation_bin: binary 3d array (uint8)
+    :param neighbourhood_type: type of neighbourhood, for 2d data (first axis of size 1)
+        edges and vertex neighbourhood are the same
+    :return: array of counts (uint8) of shape of ``segmentation_bin``
+    """
+    padded = np.pad(segmentation_bin, 1)
+    terms = _NEIGHBOURHOOD_TERMS[(neighbourhood_type, 2 if len(segmentation_bin.squeeze().shape) == 2 else 3)]
+    count_array = None
+    for sign, shifts_list in terms:
+        term = _shifted_sum(padded, shifts_list)
+        if count_array is None:
+            count_array = np.array(term, dtype=np.uint8)
+        elif sign > 0:
+            count_array += term
+        else:
+            count_array -= term
+    return count_array
+
 
 class BaseSmoothing(AlgorithmDescribeBase, ABC):
     @classmethod
@@ -41,7 +96,7 @@ class OpeningSmoothing(BaseSmoothing):
         radius = arguments["smooth_border_radius"]
         if isinstance(radius, (int, float)):
             radius = [radius] * segmentation.ndim
-        return sitk.GetArrayFromImage(sitk.BinaryMorphologicalOpening(sitk.GetImageFromArray(segmentation), radius))
+        return from_sitk_image(sitk.BinaryMorphologicalOpening(to_sitk_image(segmentation), radius))
 
 
 class VoteSmoothing(BaseSmoothing):
@@ -70,14 +125,8 @@ class VoteSmoothing(BaseSmoothing):
 
     @classmethod
     def smooth(cls, segmentation: np.ndarray, arguments: dict) -> np.ndarray:
-        segmentation_bin = (segmentation > 0).astype(np.uint8)
-        count_array = np.zeros(segmentation_bin.shape, dtype=segmentation.dtype)
-        neighbourhood = get_neighbourhood(segmentation_bin.squeeze().shape, arguments["neighbourhood_type"])
-        axis = tuple(range(len(segmentation_bin.shape)))
-        for shift in neighbourhood:
-            count_array += np.roll(segmentation_bin, shift, axis)
+        count_array = neighbour_count((segmentation > 0).astype(np.uint8), arguments["neighbourhood_type"])
         segmentation = segmentation.copy()
-        count_array = count_array.reshape(segmentation.shape)
         segmentation[count_array < arguments["support_level"]] = 0
         return segmentation
 
@@ -113,22 +162,35 @@ class IterativeVoteSmoothing(BaseSmoothing):
 
     @classmethod
     def smooth(cls, segmentation: np.ndarray, arguments: dict) -> np.ndarray:
-        segmentation_bin = (segmentation > 0).astype(np.uint8)
-        count_array = np.zeros(segmentation_bin.shape, dtype=segmentation.dtype)
-        neighbourhood = get_neighbourhood(segmentation_bin.squeeze().shape, arguments["neighbourhood_type"])
-        segmentation = segmentation.copy()
-        count_point = np.count_nonzero(segmentation)
-        axis = tuple(range(len(segmentation_bin.shape)))
-        for _ in range(arguments["max_steps"]):
-            for shift in neighbourhood:
-                count_array += np.roll(segmentation_bin, shift, axis)
-            segmentation_bin[count_array < arguments["support_level"]] = 0
-            count_point2 = np.count_nonzero(segmentation_bin)
-            if count_point2 == count_point:
+        """
+        Neighbour counts are calculated for whole array only once. In next steps only counts of neighbours
+        of removed voxels are updated and only these voxels are checked for removal.
+        Arrays are padded by one voxel to use flat indices without checking array bounds.
+        """
+        support_level = arguments["support_level"]
+        inner = (slice(1, -1),) * segmentation.ndim
+        segmentation_bin = np.zeros(tuple(x + 2 for x in segmentation.shape), dtype=np.uint8)
+        segmentation_bin[inner] = segmentation > 0
+        count_array = np.zeros(segmentation_bin.shape, dtype=np.uint8)
+        count_array[inner] = neighbour_count(segmentation_bin[inner], arguments["neighbourhood_type"])
+        neighbourhood = get_neighbourhood(segmentation.squeeze().shape, arguments["neighbourhood_type"])
+        offsets = np.dot(neighbourhood, np.array(segmentation_bin.strides) // segmentation_bin.itemsize)
+        bin_flat = segmentation_bin.ravel()
+        count_flat = count_array.ravel()
+        removed = np.flatnonzero(bin_flat & (count_flat < support_level))
+        for step in range(arguments["max_steps"]):
+            if removed.size == 0:
                 break
-            count_point = count_point2
-            count_array[:] = 0
-        segmentation[segmentation_bin.reshape(segmentation.shape) == 0] = 0
+            bin_flat[removed] = 0
+            if step == arguments["max_steps"] - 1:
+                break
+            neighbours, counts = np.unique((removed[:, np.newaxis] + offsets).ravel(), return_counts=True)
+            still_labeled = bin_flat[neighbours] > 0
+            neighbours = neighbours[still_labeled]
+            count_flat[neighbours] -= counts[still_labeled].astype(np.uint8)
+            removed = neighbours[count_flat[neighbours] < support_level]
+        segmentation = segmentation.copy()
+        segmentation[segmentation_bin[inner] == 0] = 0
         return segmentation
 
 
@@ -1,3 +1,4 @@
+import inspect
 import typing
 from abc import ABC
 from enum import Enum
@@ -30,13 +31,17 @@ class NoiseFilteringBase(AlgorithmDescribeBase, ABC):
     """Base class for noise filtering operations"""
 
     @classmethod
-    def noise_filter(cls, channel: np.ndarray, spacing: typing.Iterable[float], arguments: dict) -> np.ndarray:
+    def noise_filter(
+        cls, channel: np.ndarray, spacing: typing.Iterable[float], arguments: dict, *, workers: int = 1
+    ) -> np.ndarray:
         """
-        This function need be overloaded in implementation
+        This function need be overloaded in implementation.
+        Implementations are not required to accept ``workers``, see :py:func:`noise_filter`.
 
         :param channel: single channel ad 2d or 3d array
         :param spacing: image spacing
         :param arguments: additional arguments defined by :py:meth:`get_fields`
+        :param workers: maximum number of threads used to process layers
         :return: channel array with removed noise
         """
         raise NotImplementedError()
@@ -52,7 +57,7 @@ class NoneNoiseFiltering(NoiseFilteringBase):
         return []
 
     @classmethod
-    def noise_filter(cls, channel: np.ndarray, spacing: typing.Iterable[float], arguments: dict):
+    def noise_filter(cls, channel: np.ndarray, spacing: typing.Iterable[float], arguments: dict, *, workers: int = 1):
         return channel
 
 
@@ -69,10 +74,10 @@ class GaussNoiseFiltering(NoiseFilteringBase):
         ]
 
     @classmethod
-    def noise_filter(cls, channel: np.ndarray, spacing: typing.Iterable[float], arguments: dict):
+    def noise_filter(cls, channel: np.ndarray, spacing: typing.Iterable[float], arguments: dict, *, workers: int = 1):
         gauss_radius = calculate_operation_radius(arguments["radius"], spacing, arguments["dimension_type"])
         layer = arguments["dimension_type"] == DimensionType.Layer
-        return gaussian(channel, gauss_radius, layer=layer)
+        return gaussian(channel, gauss_radius, layer=layer, workers=workers)
 
 
 def calculate_operation_radius(radius, spacing, gauss_type):
@@ -95,13 +100,30 @@ class MedianNoiseFiltering(NoiseFilteringBase):
         ]
 
     @classmethod
-    def noise_filter(cls, channel: np.ndarray, spacing: typing.Iterable[float], arguments: dict):
+    def noise_filter(cls, channel: np.ndarray, spacing: typing.Iterable[float], arguments: dict, *, workers: int = 1):
         gauss_radius = calculate_operation_radius(arguments["radius"], spacing, arguments["dimension_type"])
         layer = arguments["dimension_type"] == DimensionType.Layer
         gauss_radius = [int(x) for x in gauss_radius]
-        return median(channel, gauss_radius, layer=layer)
+        return median(channel, gauss_radius, layer=layer, workers=workers)
 
 
 noise_filtering_dict = Register(
     NoneNoiseFiltering, GaussNoiseFiltering, MedianNoiseFiltering, class_methods=["noise_filter"]
 )
+
+
+def noise_filter(
+    filter_class: typing.Type[NoiseFilteringBase],
+    channel: np.ndarray,
+    spacing: typing.Iterable[float],
+    arguments: dict,
+    workers: int = 1,
+) -> np.ndarray:
+    """
+    Call :py:meth:`NoiseFilteringBase.noise_filter` of ``filter_class``.
+    ``workers`` is passed only if filter accept it, so filters from plugins
+    written for older versions still work.
+    """
+    if "workers" in inspect.signature(filter_class.noise_filter).parameters:
+        return filter_class.noise_filter(channel, spacing, arguments, workers=workers)
+    return filter_class.noise_filter(channel, spacing, arguments)
@@ -2,7 +2,7 @@ import dataclasses
 import operator
 import typing
 from abc import ABC
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from copy import deepcopy
 
 import numpy as np
@@ -12,6 +12,7 @@ from PartSegCore_compiled_backend.multiscale_opening import PyMSO, calculate_mu_
 
 from ..algorithm_describe_base import AlgorithmDescribeBase, AlgorithmProperty, ROIExtractionProfile
 from ..channel_class import Channel
+from ..image_operations import from_sitk_image, to_sitk_image
 from ..mask_partition_utils import BorderRim as BorderRimBase
 from ..mask_partition_utils import MaskDistanceSplit as MaskDistanceSplitBase
 from ..universal_const import Units
@@ -23,7 +24,7 @@ from .algorithm_base import (
     SegmentationResult,
 )
 from .mu_mid_point import BaseMuMid, mu_mid_dict
-from .noise_filtering import noise_filtering_dict
+from .noise_filtering import noise_filter, noise_filtering_dict
 from .threshold import BaseThreshold, double_threshold_dict, threshold_dict
 from .watershed import BaseWatershed, calculate_distances_array, get_neigh, sprawl_dict
 
@@ -32,6 +33,15 @@ def blank_operator(_x, _y):
     raise NotImplementedError()
 
 
+def _hashable(value):
+    """Convert nested parameters (dicts and lists) to hashable form"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(val)) for key, val in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(x) for x in value)
+    return value
+
+
 class RestartableAlgorithm(SegmentationAlgorithm, ABC):
     """
     Base class for restartable segmentation algorithm. The idea is to store two copies
@@ -128,9 +138,18 @@ class ThresholdBaseAlgorithm(RestartableAlgorithm, ABC):
     """
     Base class for most threshold Algorithm implemented in PartSeg analysis.
     Created for reduce code repetition.
+
+    Results of threshold and connected components steps are stored in LRU cache
+    keyed by channel, noise filtering, threshold and side connection parameters,
+    so switching back to recently used parameters does not repeat calculation.
+
+    :cvar int ~.cache_memory_limit: limit of memory (in bytes) used by cached arrays,
+        0 disables cache
     """
 
     threshold_operator = staticmethod(blank_operator)
+    cache_memory_limit = 2 ** 28
+    _cached_attributes = ("threshold_image", "threshold_info", "segmentation", "_sizes_array")
 
     @classmethod
     def get_fields(cls):
@@ -156,11 +175,13 @@ class ThresholdBaseAlgorithm(RestartableAlgorithm, ABC):
     def __init__(self, **kwargs):
         super().__init__()
         self.cleaned_image = None
+        self.cleaned_image_sitk = None
         self.threshold_image = None
         self._sizes_array = []
         self.components_num = 0
         self.threshold_info = None
         self.old_threshold_info = None
+        self._threshold_cache: typing.Dict[typing.Any, typing.Dict[str, typing.Any]] = OrderedDict()
 
     def get_additional_layers(
         self, full_segmentation: typing.Optional[np.ndarray] = None
@@ -198,12 +219,55 @@ class ThresholdBaseAlgorithm(RestartableAlgorithm, ABC):
     def set_image(self, image):
         super().set_image(image)
         self.threshold_info = None
+        self.cleaned_image = None
+        self.cleaned_image_sitk = None
+        self._threshold_cache.clear()
+
+    def set_mask(self, mask):
+        super().set_mask(mask)
+        self._threshold_cache.clear()
 
     def get_info_text(self):
         return f"Threshold: {self.threshold_info}\nSizes: " + ", ".join(
             map(str, self._sizes_array[1 : self.components_num + 1])
         )
 
+    def _cache_key(self):
+        return _hashable(
+            [self.new_parameters[name] for name in ("channel", "noise_filtering", "threshold", "side_connection")]
+        )
+
+    def _load_from_cache(self) -> bool:
+        """
+        Restore result of threshold and connected components steps for current parameters.
+
+        :return: if result was found in cache
+        """
+        key = self._cache_key()
+        if key not in self._threshold_cache:
+            return False
+        self._threshold_cache.move_to_end(key)
+        for name, value in self._threshold_cache[key].items():
+            setattr(self, name, value)
+        self.parameters["threshold"] = deepcopy(self.new_parameters["threshold"])
+        self.parameters["side_connection"] = self.new_parameters["side_connection"]
+        return True
+
+    @staticmethod
+    def _cache_entry_size(entry: typing.Dict[str, typing.Any]) -> int:
+        return sum(x.nbytes for x in entry.values() if isinstance(x, np.ndarray))
+
+    def _store_in_cache(self):
+        """Store result of threshold and connected components steps and remove least recently used entries"""
+        entry = {name: getattr(self, name) for name in self._cached_attributes}
+        if self._cache_entry_size(entry) > self.cache_memory_limit:
+            return
+        self._threshold_cache[self._cache_key()] = entry
+        total = sum(self._cache_entry_size(x) for x in self._threshold_cache.values())
+        while total > self.cache_memory_limit:
+            _key, removed = self._threshold_cache.popitem(last=False)
+            total -= self._cache_entry_size(removed)
+
     def calculation_run(self, report_fun: typing.Callable[[str, int], typing.Any]) -> SegmentationResult:
         """
         main calculation function
@@ -219,12 +283,27 @@ class ThresholdBaseAlgorithm(RestartableAlgorithm, ABC):
         if restarted or self.parameters["noise_filtering"] != self.new_parameters["noise_filtering"]:
             self.parameters["noise_filtering"] = deepcopy(self.new_parameters["noise_filtering"])
             noise_filtering_parameters = self.new_parameters["noise_filtering"]
-            self.cleaned_image = noise_filtering_dict[noise_filtering_parameters["name"]].noise_filter(
-                self.channel, self.image.spacing, noise_filtering_parameters["values"]
+            cleaned_image = noise_filter(
+                noise_filtering_dict[noise_filtering_parameters["name"]],
+                self.channel,
+                self.image.spacing,
+                noise_filtering_parameters["values"],
+                self.workers,
             )
+            # denoised image is kept as SimpleITK image and exposed as read only view on its buffer,
+            # so thresholds on next runs use it without copy
+            self.cleaned_image_sitk = to_sitk_image(cleaned_image)
+            self.cleaned_image = from_sitk_image(self.cleaned_image_sitk)
             restarted = True
-        print(restarted, self.parameters["threshold"], self.new_parameters["threshold"])
-        if restarted or self.new_parameters["threshold"] != self.parameters["threshold"]:
+        from_cache = (
+            restarted
+            or self.new_parameters["threshold"] != self.parameters["threshold"]
+            or self.new_parameters["side_connection"] != self.parameters["side_connection"]
+        ) and self._load_from_cache()
+        restarted = restarted or from_cache
+        calculated = False
+        if not from_cache and (restarted or self.new_parameters["threshold"] != self.parameters["threshold"]):
+            calculated = True
             if self.parameters["threshold"] is None:
                 restarted = True
             self.parameters["threshold"] = deepcopy(self.new_parameters["threshold"])
@@ -243,14 +322,19 @@ class ThresholdBaseAlgorithm(RestartableAlgorithm, ABC):
                     f"and chosen threshold is {self.threshold_info}"
                 )
                 return dataclasses.replace(res, info_text=info_text)
-        if restarted or self.new_parameters["side_connection"] != self.parameters["side_connection"]:
+        if not from_cache and (
+            restarted or self.new_parameters["side_connection"] != self.parameters["side_connection"]
+        ):
             self.parameters["side_connection"] = self.new_parameters["side_connection"]
             connect = SimpleITK.ConnectedComponent(
-                SimpleITK.GetImageFromArray(self.threshold_image), not self.new_parameters["side_connection"]
+                to_sitk_image(self.threshold_image), not self.new_parameters["side_connection"]
             )
             self.segmentation = SimpleITK.GetArrayFromImage(SimpleITK.RelabelComponent(connect))
             self._sizes_array = np.bincount(self.segmentation.flat)
+            calculated = True
             restarted = True
+        if calculated:
+            self._store_in_cache()
         if restarted or self.new_parameters["minimum_size"] != self.parameters["minimum_size"]:
             self.parameters["minimum_size"] = self.new_parameters["minimum_size"]
             minimum_size = self.new_parameters["minimum_size"]
@@ -271,7 +355,9 @@ class ThresholdBaseAlgorithm(RestartableAlgorithm, ABC):
         super().clean()
         self.parameters = defaultdict(lambda: None)
         self.cleaned_image = None
+        self.cleaned_image_sitk = None
         self.mask = None
+        self._threshold_cache.clear()
 
     def _threshold(self, image, thr=None):
         if thr is None:
@@ -371,6 +457,8 @@ class RangeThresholdAlgorithm(ThresholdBaseAlgorithm):
 
 
 class TwoLevelThresholdBaseAlgorithm(ThresholdBaseAlgorithm, ABC):
+    _cached_attributes = ThresholdBaseAlgorithm._cached_attributes + ("sprawl_area",)
+
     def __init__(self):
         super().__init__()
         self.sprawl_area = None
@@ -537,10 +625,14 @@ class OtsuSegment(RestartableAlgorithm):
     def calculation_run(self, report_fun):
         channel = self.get_channel(self.new_parameters["channel"])
         noise_filtering_parameters = self.new_parameters["noise_filtering"]
-        cleaned_image = noise_filtering_dict[noise_filtering_parameters["name"]].noise_filter(
-            channel, self.image.spacing, noise_filtering_parameters["values"]
+        cleaned_image = noise_filter(
+            noise_filtering_dict[noise_filtering_parameters["name"]],
+            channel,
+            self.image.spacing,
+            noise_filtering_parameters["values"],
+            self.workers,
         )
-        cleaned_image_sitk = SimpleITK.GetImageFromArray(cleaned_image)
+        cleaned_image_sitk = to_sitk_image(cleaned_image)
         res = SimpleITK.OtsuMultipleThresholds(
             cleaned_image_sitk,
             self.new_parameters["components"],
@@ -11,9 +11,10 @@ from PartSegCore.segmentation.watershed import BaseWatershed, sprawl_dict
 from ..algorithm_describe_base import AlgorithmDescribeBase, AlgorithmProperty, ROIExtractionProfile
 from ..channel_class import Channel
 from ..convex_fill import convex_fill
+from ..image_operations import from_sitk_image, to_sitk_image
 from ..segmentation.algorithm_base import AdditionalLayerDescription, SegmentationAlgorithm, SegmentationResult
 from ..utils import bisect
-from .noise_filtering import noise_filtering_dict
+from .noise_filtering import noise_filter, noise_filtering_dict
 from .threshold import BaseThreshold, double_threshold_dict, threshold_dict
 
 
@@ -57,8 +58,12 @@ class ThresholdPreview(StackAlgorithm):
 
     def calculation_run(self, report_fun) -> SegmentationResult:
         self.channel = self.get_channel(self.channel_num)
-        image = noise_filtering_dict[self.noise_filtering["name"]].noise_filter(
-            self.channel, self.image.spacing, self.noise_filtering["values"]
+        image = noise_filter(
+            noise_filtering_dict[self.noise_filtering["name"]],
+            self.channel,
+            self.image.spacing,
+            self.noise_filtering["values"],
+            self.workers,
         )
         res = (image > self.threshold).astype(np.uint8)
         if self.mask is not None:
@@ -154,8 +159,12 @@ class BaseSingleThresholdAlgorithm(BaseThresholdAlgorithm, ABC):
     def calculation_run(self, report_fun):
         report_fun("Noise removal", 0)
         self.channel = self.get_channel(self.channel_num)
-        image = noise_filtering_dict[self.noise_filtering["name"]].noise_filter(
-            self.channel, self.image.spacing, self.noise_filtering["values"]
+        image = noise_filter(
+            noise_filtering_dict[self.noise_filtering["name"]],
+            self.channel,
+            self.image.spacing,
+            self.noise_filtering["values"],
+            self.workers,
         )
         mask = self._threshold_and_exclude(image, report_fun)
         if self.close_holes:
@@ -166,9 +175,7 @@ class BaseSingleThresholdAlgorithm(BaseThresholdAlgorithm, ABC):
 
         report_fun("Components calculating", 5)
         self.segmentation = sitk.GetArrayFromImage(
-            sitk.RelabelComponent(
-                sitk.ConnectedComponent(sitk.GetImageFromArray(self.segmentation), self.edge_connection), 20
-            )
+            sitk.RelabelComponent(sitk.ConnectedComponent(to_sitk_image(self.segmentation), self.edge_connection), 20)
         )
 
         self.sizes = np.bincount(self.segmentation.flat)
@@ -308,8 +315,12 @@ class ThresholdFlowAlgorithm(BaseThresholdAlgorithm):
     def calculation_run(self, report_fun: Callable[[str, int], None]) -> SegmentationResult:
         report_fun("Noise removal", 0)
         self.channel = self.get_channel(self.channel_num)
-        noise_filtered = noise_filtering_dict[self.parameters["noise_filtering"]["name"]].noise_filter(
-            self.channel, self.image.spacing, self.parameters["noise_filtering"]["values"]
+        noise_filtered = noise_filter(
+            noise_filtering_dict[self.parameters["noise_filtering"]["name"]],
+            self.channel,
+            self.image.spacing,
+            self.parameters["noise_filtering"]["values"],
+            self.workers,
         )
 
         report_fun("Threshold apply", 1)
@@ -321,7 +332,7 @@ class ThresholdFlowAlgorithm(BaseThresholdAlgorithm):
         report_fun("Core components calculating", 2)
         core_objects = sitk.GetArrayFromImage(
             sitk.RelabelComponent(
-                sitk.ConnectedComponent(sitk.GetImageFromArray(core_objects), not self.parameters["side_connection"]),
+                sitk.ConnectedComponent(to_sitk_image(core_objects), not self.parameters["side_connection"]),
                 20,
             )
         )
@@ -400,7 +411,7 @@ class AutoThresholdAlgorithm(BaseSingleThresholdAlgorithm):
         self.suggested_size = 0
 
     def _threshold_image(self, image: np.ndarray) -> np.ndarray:
-        sitk_image = sitk.GetImageFromArray(image)
+        sitk_image = to_sitk_image(image)
         sitk_mask = sitk.ThresholdMaximumConnectedComponents(sitk_image, self.suggested_size)
         # TODO what exactly it returns. Maybe it is already segmented.
         mask = sitk.GetArrayFromImage(sitk_mask)
@@ -439,9 +450,9 @@ def close_small_holes(image, max_hole_size):
     if image.dtype == np.bool:
         image = image.astype(np.uint8)
     if len(image.shape) == 2:
-        rev_conn = sitk.ConnectedComponent(sitk.BinaryNot(sitk.GetImageFromArray(image)), True)
+        rev_conn = sitk.ConnectedComponent(sitk.BinaryNot(to_sitk_image(image)), True)
         return sitk.GetArrayFromImage(sitk.BinaryNot(sitk.RelabelComponent(rev_conn, max_hole_size)))
     for layer in image:
-        rev_conn = sitk.ConnectedComponent(sitk.BinaryNot(sitk.GetImageFromArray(layer)), True)
-        layer[...] = sitk.GetArrayFromImage(sitk.BinaryNot(sitk.RelabelComponent(rev_conn, max_hole_size)))
+        rev_conn = sitk.ConnectedComponent(sitk.BinaryNot(to_sitk_image(layer)), True)
+        layer[...] = from_sitk_image(sitk.BinaryNot(sitk.RelabelComponent(rev_conn, max_hole_size)))
     return image
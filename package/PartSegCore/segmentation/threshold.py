@@ -5,6 +5,7 @@ import numpy as np
 import SimpleITK as sitk
 
 from ..algorithm_describe_base import AlgorithmDescribeBase, AlgorithmProperty, Register
+from ..image_operations import to_sitk_image
 
 
 class BaseThreshold(AlgorithmDescribeBase, ABC):
@@ -54,9 +55,9 @@ class SitkThreshold(BaseThreshold, ABC):
             ob, bg, th_op = 0, 1, np.min
         else:
             ob, bg, th_op = 1, 0, np.max
-        image_sitk = sitk.GetImageFromArray(data)
+        image_sitk = to_sitk_image(data)
         if arguments["masked"] and mask is not None:
-            mask_sitk = sitk.GetImageFromArray(mask)
+            mask_sitk = to_sitk_image(mask)
             calculated = cls.calculate_threshold(image_sitk, mask_sitk, ob, bg, arguments["bins"], True, 1)
         else:
             calculated = cls.calculate_threshold(image_sitk, ob, bg, arguments["bins"])
@@ -289,7 +290,7 @@ class DoubleOtsu(BaseThreshold):
         arguments: dict,
         operator: typing.Callable[[object, object], bool],
     ):
-        cleaned_image_sitk = sitk.GetImageFromArray(data)
+        cleaned_image_sitk = to_sitk_image(data)
         res = sitk.OtsuMultipleThresholds(cleaned_image_sitk, 2, 0, arguments["hist_num"], arguments["valley"])
         res = sitk.GetArrayFromImage(res)
         thr1 = data[res == 2].min()
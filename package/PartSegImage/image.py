@@ -3,6 +3,8 @@ import warnings
 
 import numpy as np
 
+from .lazy_array import LazyArray
+
 Spacing = typing.Tuple[typing.Union[float, int], ...]
 
 _DEF = object()
@@ -59,7 +61,8 @@ class Image:
     """
     Base class for Images used in PartSeg
 
-    :param data: 5-dim array with order: time, z, y, x, channel
+    :param data: 5-dim array with order: time, z, y, x, channel. It may be :py:class:`.LazyArray`,
+        then only requested parts of data are read
     :param image_spacing: spacing for z, y, x
     :param file_path: path to image on disc
     :param mask: mask array in shape z,y,x
@@ -69,6 +72,9 @@ class Image:
     :param axes_order: allow to create Image object form data with different axes order, or missed axes
 
     :cvar str ~.axis_order: internal order of axes
+    :cvar int ~.ranges_sample_layers: maximum number of layers used to estimate ranges
+        if data are read lazily. Estimated ranges are recalculated when data are read into memory
+        or when exact ranges are requested with :py:meth:`get_ranges`
 
     It is prepared for subclassing with changed internal order. Eg:
 
@@ -79,6 +85,7 @@ class Image:
 
     _image_spacing: Spacing
     axis_order = "TZYXC"
+    ranges_sample_layers = 16
 
     def __new__(cls, *args, **kwargs):
         if hasattr(cls, "return_order"):  # pragma: no cover
@@ -88,7 +95,7 @@ class Image:
 
     def __init__(
         self,
-        data: np.ndarray,
+        data: typing.Union[np.ndarray, LazyArray],
         image_spacing: Spacing,
         file_path=None,
         mask: typing.Union[None, np.ndarray] = None,
@@ -116,13 +123,9 @@ class Image:
         self.labels = labels
         if isinstance(self.labels, (tuple, list)):
             self.labels = self.labels[: self.channels]
-        if ranges is None:
-            axis = list(range(len(self.axis_order)))
-            axis.remove(self.axis_order.index("C"))
-            axis = tuple(axis)
-            self.ranges = list(zip(np.min(self._image_array, axis=axis), np.max(self._image_array, axis=axis)))
-        else:
-            self.ranges = ranges
+        # calculated on first use, to not read whole file on image creation
+        self._ranges = ranges
+        self._ranges_approximate = False
         if mask is not None:
             data_shape = list(data.shape)
             try:
@@ -135,6 +138,43 @@ class Image:
         else:
             self._mask_array = None
 
+    @property
+    def ranges(self) -> typing.List[typing.Tuple[float, float]]:
+        if self._ranges is None or (self._ranges_approximate and not isinstance(self._image_array, LazyArray)):
+            self._ranges_approximate = isinstance(self._image_array, LazyArray)
+            self._ranges = self._calc_ranges(exact=not self._ranges_approximate)
+        return self._ranges
+
+    @ranges.setter
+    def ranges(self, value: typing.List[typing.Tuple[float, float]]):
+        self._ranges = value
+        self._ranges_approximate = False
+
+    def _calc_ranges(self, exact: bool = True) -> typing.List[typing.Tuple[float, float]]:
+        axis = list(range(len(self.axis_order)))
+        axis.remove(self.channel_pos)
+        axis = tuple(axis)
+        if isinstance(self._image_array, np.ndarray) and not isinstance(self._image_array, np.memmap):
+            return list(zip(np.min(self._image_array, axis=axis), np.max(self._image_array, axis=axis)))
+        # data not stored in memory are reduced layer by layer,
+        # if not exact then only from evenly distributed sample of layers
+        layer_axes = self.axis_order.replace("T", "").replace("Z", "")
+        axis = tuple(i for i, letter in enumerate(layer_axes) if letter != "C")
+        layers_num = self.times * self.layers
+        if exact:
+            sample = np.arange(layers_num)
+        else:
+            sample = np.unique(np.round(np.linspace(0, layers_num - 1, num=min(layers_num, self.ranges_sample_layers))))
+        min_val, max_val = None, None
+        for index in sample.astype(int):
+            layer = self.get_layer(*divmod(int(index), self.layers))
+            layer_min, layer_max = np.min(layer, axis=axis), np.max(layer, axis=axis)
+            if min_val is None:
+                min_val, max_val = layer_min, layer_max
+            else:
+                min_val, max_val = np.minimum(min_val, layer_min), np.maximum(max_val, layer_max)
+        return list(zip(min_val, max_val))
+
     def merge(self, image: "Image", axis: typing.Union[str, int]) -> "Image":
         """
         Produce new image merging image data along given axis. All metadata
@@ -149,7 +189,9 @@ class Image:
             axis = self.axis_order.index(axis)
         data = self.reorder_axes(image.get_data(), image.axis_order)
         data = np.concatenate((self.get_data(), data), axis=axis)
-        return self.substitute(data=data, ranges=self.ranges + image.ranges)
+        res = self.substitute(data=data, ranges=self.ranges + image.ranges)
+        res._ranges_approximate = self._ranges_approximate or image._ranges_approximate
+        return res
 
     @property
     def channel_pos(self) -> int:
@@ -207,7 +249,7 @@ class Image:
 
     def get_dimension_number(self) -> int:
         """return number of nontrivial dimensions"""
-        return np.squeeze(self._image_array).ndim
+        return sum(x > 1 for x in self._image_array.shape)
 
     def get_dimension_letters(self) -> str:
         """
@@ -231,9 +273,12 @@ class Image:
         file_path = self.file_path if file_path is None else file_path
         mask = self._mask_array if mask is _DEF else mask
         default_coloring = self.default_coloring if default_coloring is None else default_coloring
-        ranges = self.ranges if ranges is None else ranges
+        ranges_approximate = False
+        if ranges is None:
+            ranges = self._ranges if data is self._image_array else self.ranges
+            ranges_approximate = self._ranges_approximate
         labels = self.labels if labels is None else labels
-        return self.__class__(
+        res = self.__class__(
             data=data,
             image_spacing=image_spacing,
             file_path=file_path,
@@ -242,6 +287,8 @@ class Image:
             ranges=ranges,
             labels=labels,
         )
+        res._ranges_approximate = ranges_approximate
+        return res
 
     def set_mask(self, mask: typing.Optional[np.ndarray], axes: typing.Optional[str] = None):
         """
@@ -259,6 +306,12 @@ class Image:
             self._mask_array = self.fit_mask_to_image(mask)
 
     def get_data(self) -> np.ndarray:
+        """
+        Whole image data. If data are read lazily (:py:class:`.LazyArray`)
+        then they are read into memory and kept there.
+        """
+        if isinstance(self._image_array, LazyArray):
+            self._image_array = np.asarray(self._image_array)
         return self._image_array[:]
 
     @property
@@ -306,7 +359,7 @@ class Image:
         """
         :return: numpy array in imagej tiff order axes
         """
-        return self._reorder_axes(self._image_array, self.axis_order, "TZCYX")
+        return np.asarray(self._reorder_axes(self._image_array, self.axis_order, "TZCYX"))
 
     def get_mask_for_save(self) -> typing.Optional[np.ndarray]:
         """
@@ -395,7 +448,7 @@ class Image:
         for name in kwargs:
             if name.upper() in axis_pos:
                 slices[axis_pos[name.upper()]] = kwargs[name]
-        return self._image_array[tuple(slices)]
+        return np.asarray(self._image_array[tuple(slices)])
 
     def clip_array(self, array, **kwargs):
         array = self.fit_array_to_image(array)
@@ -433,7 +486,7 @@ class Image:
                 indices[i] = stack
             else:
                 indices[i] = slice(None)
-        return self._image_array[tuple(indices)]
+        return np.asarray(self._image_array[tuple(indices)])
 
     @property
     def is_2d(self) -> bool:
@@ -491,32 +544,41 @@ class Image:
         return [array_axis.index(letter) for letter in important_axis]
 
     def cut_image(
-        self, cut_area: typing.Union[np.ndarray, typing.List[slice], typing.Tuple[slice]], replace_mask=False
+        self,
+        cut_area: typing.Union[np.ndarray, typing.List[slice], typing.Tuple[slice]],
+        replace_mask=False,
+        bounding_box: typing.Optional[typing.Sequence[slice]] = None,
     ) -> "Image":
         """
         Create new image base on mask or list of slices
         :param replace_mask: if cut area is represented by mask array,
         then in result image the mask is set base on cut_area
         :param cut_area: area to cut. Defined with slices or mask
+        :param bounding_box: bounding box of mask (for example from :py:func:`scipy.ndimage.find_objects`).
+            If provided then ``cut_area`` mask contains only this box, so whole image is not scanned.
         :return: Image
         """
         new_mask = None
         if isinstance(cut_area, (list, tuple)):
             cut_area2 = cut_area[:]
             cut_area2.insert(self.channel_pos, slice(None))
-            new_image = self._image_array[tuple(cut_area2)]
+            new_image = np.asarray(self._image_array[tuple(cut_area2)])
             if self._mask_array is not None:
                 new_mask = self._mask_array[tuple(cut_area)]
         else:
-            cut_area = self.fit_array_to_image(cut_area)
-            points = np.nonzero(cut_area)
-            lower_bound = np.min(points, axis=1)
-            upper_bound = np.max(points, axis=1)
-            new_cut = [slice(x, y + 1) for x, y in zip(lower_bound, upper_bound)]
-            catted_cut_area = cut_area[tuple(new_cut)]
+            if bounding_box is not None:
+                new_cut = list(bounding_box)
+                catted_cut_area = cut_area
+            else:
+                cut_area = self.fit_array_to_image(cut_area)
+                points = np.nonzero(cut_area)
+                lower_bound = np.min(points, axis=1)
+                upper_bound = np.max(points, axis=1)
+                new_cut = [slice(x, y + 1) for x, y in zip(lower_bound, upper_bound)]
+                catted_cut_area = cut_area[tuple(new_cut)]
             image_cut = new_cut[:]
             image_cut.insert(self.channel_pos, slice(None))
-            new_image = np.copy(self._image_array[tuple(image_cut)])
+            new_image = np.array(self._image_array[tuple(image_cut)])
             if self.channel_pos == len(self.axis_order) - 1:
                 new_image[catted_cut_area == 0] = 0
             else:
@@ -529,7 +591,7 @@ class Image:
                 new_mask[catted_cut_area == 0] = 0
         important_axis = "XY" if self.is_2d else "XYZ"
 
-        return self.__class__(
+        res = self.__class__(
             self._frame_array(new_image, self._calc_index_to_frame(self.axis_order, important_axis)),
             self._image_spacing,
             None,
@@ -538,6 +600,8 @@ class Image:
             self.ranges,
             self.labels,
         )
+        res._ranges_approximate = self._ranges_approximate
+        return res
 
     def get_imagej_colors(self):
         # TODO review
@@ -581,8 +645,16 @@ class Image:
         """image spacing in micrometers"""
         return tuple([float(x * 10 ** 6) for x in self.spacing])
 
-    def get_ranges(self) -> typing.List[typing.Tuple[float, float]]:
-        """image brightness ranges for each channel"""
+    def get_ranges(self, exact: bool = False) -> typing.List[typing.Tuple[float, float]]:
+        """
+        image brightness ranges for each channel
+
+        :param exact: if data are read lazily, ranges are estimated from sample of layers.
+            Set it to calculate them from all layers (for example before storing them in file).
+        """
+        if exact and (self._ranges is None or self._ranges_approximate):
+            self._ranges = self._calc_ranges(exact=True)
+            self._ranges_approximate = False
         return self.ranges[:]
 
     def __str__(self):
@@ -1,6 +1,8 @@
+import functools
 import os.path
 import typing
 import warnings
+import weakref
 from abc import abstractmethod
 from io import BytesIO
 from pathlib import Path
@@ -13,6 +15,7 @@ from oiffile import OifFile
 from tifffile import TiffFile
 
 from .image import Image
+from .lazy_array import LazyArray
 
 
 class TiffFileException(Exception):
@@ -125,7 +128,7 @@ class BaseImageReader:
             while i < len(axes):
                 name = axes[i]
                 if name not in final_mapping_dict and array.shape[i] == 1:
-                    array = array.take(0, i)
+                    array = array[(slice(None),) * i + (0,)]
                     axes.pop(i)
                 else:
                     i += 1
@@ -242,17 +245,54 @@ class TiffImageReader(BaseImageReader):
     """
     TIFF/LSM files reader. Base reading with :py:meth:`BaseImageReader.read_image`
 
+    Image data could be read lazily. Then uncompressed, contiguous data are memory mapped
+    (in copy on write mode, so file is never modified) and other are read page by page
+    when requested (:py:class:`.LazyArray`). Mask is always read into memory.
+
     image_file: TiffFile
     mask_file: TiffFile
+
+    :param lazy: if read image data lazily, if None then data bigger than :py:attr:`lazy_size_limit` are read lazily
+    :cvar int ~.lazy_size_limit: size in bytes above which data are read lazily by default
+    :cvar int ~.page_cache_size: memory limit (in bytes) of cache of decoded pages for lazy reading
     """
 
-    def __init__(self, callback_function=None):
+    lazy_size_limit = 2 ** 31
+    page_cache_size = 2 ** 28
+
+    def __init__(self, callback_function=None, lazy: typing.Optional[bool] = None):
         super().__init__(callback_function)
         self.image_file = None
         self.mask_file: typing.Optional[TiffFile] = None
         self.colors = None
         self.labels = None
         self.ranges = None
+        self.lazy = lazy
+
+    @classmethod
+    def read_image(
+        cls,
+        image_path: typing.Union[str, BytesIO, Path],
+        mask_path=None,
+        callback_function: typing.Optional[typing.Callable] = None,
+        default_spacing: typing.Tuple[float, float, float] = None,
+        lazy: typing.Optional[bool] = None,
+    ) -> Image:
+        """
+        read image file with optional mask file
+
+        :param image_path: path or opened file contains image
+        :param mask_path:
+        :param callback_function: function for provide information about progress in reading file (for progressbar)
+        :param default_spacing: used if file do not contains information about spacing
+            (or metadata format is not supported)
+        :param lazy: if read image data lazily, if None then it is decided base on data size
+        :return: image
+        """
+        instance = cls(callback_function, lazy=lazy)
+        if default_spacing is not None:
+            instance.set_default_spacing(default_spacing)
+        return instance.read(image_path, mask_path)
 
     def read(self, image_path: typing.Union[str, BytesIO, Path], mask_path=None, ext=None) -> Image:
         """
@@ -291,10 +331,12 @@ class TiffImageReader(BaseImageReader):
             mutex.release()
 
         self.image_file.report_func = report_func
-        try:
-            image_data = self.image_file.asarray()
-        except ValueError as e:  # pragma: no cover
-            raise TiffFileException(*e.args)
+        image_data = self.read_image_data(image_path)
+        is_lazy = isinstance(image_data, (LazyArray, np.memmap))
+        if is_lazy:
+            self.image_file.report_func = lambda: 0
+            count_pages[0] += len(self.image_file.series[0])
+            self.callback_function("step", count_pages[0])
         image_data = self.update_array_shape(image_data, axes)
         if self.mask_file is not None:
             self.mask_file.report_func = report_func
@@ -302,7 +344,8 @@ class TiffImageReader(BaseImageReader):
             mask_data = self.update_array_shape(mask_data, self.mask_file.series[0].axes)[..., 0]
         else:
             mask_data = None
-        self.image_file.close()
+        if not isinstance(image_data, LazyArray):
+            self.image_file.close()
         if self.mask_file is not None:
             self.mask_file.close()
         if not isinstance(image_path, str):
@@ -318,6 +361,54 @@ class TiffImageReader(BaseImageReader):
             axes_order=self.return_order(),
         )
 
+    def read_image_data(self, image_path: typing.Union[str, BytesIO, Path]) -> typing.Union[np.ndarray, LazyArray]:
+        """
+        Read data of first series of :py:attr:`image_file`, lazily if requested (see :py:attr:`lazy`).
+
+        :param image_path: path to image, used for memory mapping
+        """
+        series = self.image_file.series[0]
+        lazy = self.lazy
+        if lazy is None:
+            lazy = series.size * series.dtype.itemsize > self.lazy_size_limit
+        if lazy:
+            if isinstance(image_path, (str, Path)):
+                try:
+                    return tifffile.memmap(image_path, series=0, mode="c")
+                except ValueError:
+                    pass
+            lazy_array = self._lazy_pages_array()
+            if lazy_array is not None:
+                return lazy_array
+        try:
+            return self.image_file.asarray()
+        except ValueError as e:  # pragma: no cover
+            raise TiffFileException(*e.args)
+
+    def _lazy_pages_array(self) -> typing.Optional[LazyArray]:
+        """Create array which reads pages on demand. Return None if series is not simple stack of pages."""
+        series = self.image_file.series[0]
+        page_shape = series.keyframe.shape
+        leading_shape = series.shape[: len(series.shape) - len(page_shape)]
+        if series.shape[len(leading_shape) :] != page_shape or np.prod(leading_shape) != len(series.pages):
+            return None
+        image_file = self.image_file
+        lock = Lock()
+        page_size = int(np.prod(page_shape)) * series.dtype.itemsize
+
+        @functools.lru_cache(maxsize=max(1, self.page_cache_size // max(page_size, 1)))
+        def read_cached_page(index: typing.Tuple[int, ...]) -> np.ndarray:
+            key = int(np.ravel_multi_index(index, leading_shape)) if index else 0
+            with lock:
+                return image_file.asarray(key=key, series=0)
+
+        def read_page(index: typing.Tuple[int, ...]) -> np.ndarray:
+            return read_cached_page(index)
+
+        # file need to be open as long as any view of data exists
+        weakref.finalize(read_page, image_file.close)
+        return LazyArray(read_page, series.shape, series.dtype, len(page_shape))
+
     def verify_mask(self):
         """
         verify if mask fit to image. Raise ValueError exception on error
@@ -30,7 +30,7 @@ class ImageWriter:
         coloring = image.get_imagej_colors()
         if coloring is not None:
             metadata["LUTs"] = coloring
-        ranges = image.get_ranges()
+        ranges = image.get_ranges(exact=True)
         ranges = np.array(ranges).reshape(len(ranges) * 2)
         # print(ranges)
         metadata["Ranges"] = ranges
@@ -0,0 +1,165 @@
+import itertools
+import operator
+import typing
+
+import numpy as np
+
+IndexType = typing.Union[int, range]
+
+
+def _range_to_slice(value: range) -> slice:
+    if not value:
+        return slice(0, 0)
+    return slice(value.start, value.stop if value.stop >= 0 else None, value.step)
+
+
+class LazyArray:
+    """
+    Read only array like object which reads data on demand. Data are split on chunks
+    for each index of leading axes. Chunk contains all trailing ``chunk_ndim`` axes
+    (for example single page of TIFF file).
+
+    Supports basic indexing (integers, slices, ``None`` and ``Ellipsis``), :py:meth:`transpose`,
+    :py:meth:`swapaxes` and :py:meth:`reshape` which only add or remove axes of size 1, so it may be used
+    with :py:func:`numpy.moveaxis`. These operations return new :py:class:`LazyArray` without reading data.
+    Data are read when object is converted to numpy array (:py:func:`numpy.asarray`)
+    and only chunks covered by current selection are read.
+
+    :param read_chunk: function which returns chunk for given index of leading axes
+    :param shape: shape of whole array
+    :param dtype: array dtype
+    :param chunk_ndim: number of trailing axes in single chunk
+    """
+
+    def __init__(
+        self,
+        read_chunk: typing.Callable[[typing.Tuple[int, ...]], np.ndarray],
+        shape: typing.Sequence[int],
+        dtype,
+        chunk_ndim: int,
+    ):
+        self._read_chunk = read_chunk
+        self._base_shape = tuple(shape)
+        self._chunk_ndim = chunk_ndim
+        self.dtype = np.dtype(dtype)
+        # selection for each axis of base array, int if axis is removed
+        self._index: typing.List[IndexType] = [range(x) for x in shape]
+        # base axis for each axis of array, None for inserted axis of size 1
+        self._axes: typing.List[typing.Optional[int]] = list(range(len(shape)))
+
+    def _view(self, index: typing.List[IndexType], axes: typing.List[typing.Optional[int]]) -> "LazyArray":
+        res = self.__class__.__new__(self.__class__)
+        res.__dict__.update(self.__dict__)
+        res._index = index
+        res._axes = axes
+        return res
+
+    @property
+    def shape(self) -> typing.Tuple[int, ...]:
+        return tuple(1 if axis is None else len(self._index[axis]) for axis in self._axes)
+
+    @property
+    def ndim(self) -> int:
+        return len(self._axes)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        if not self._axes:
+            raise TypeError("len() of unsized object")
+        return self.shape[0]
+
+    def __getitem__(self, key) -> "LazyArray":
+        if not isinstance(key, tuple):
+            key = (key,)
+        if Ellipsis in key:
+            pos = key.index(Ellipsis)
+            fill = self.ndim - (len(key) - 1 - key.count(None))
+            key = key[:pos] + (slice(None),) * fill + key[pos + 1 :]
+        used_axes = len(key) - key.count(None)
+        if used_axes > self.ndim:
+            raise IndexError(
+                f"too many indices for array: array is {self.ndim}-dimensional, but {used_axes} were indexed"
+            )
+        key = key + (slice(None),) * (self.ndim - used_axes)
+        index = list(self._index)
+        axes = []
+        axes_iter = iter(self._axes)
+        for el in key:
+            if el is None:
+                axes.append(None)
+                continue
+            axis = next(axes_iter)
+            selection = range(1) if axis is None else index[axis]
+            if isinstance(el, slice):
+                if axis is None and len(selection[el]) != 1:
+                    raise NotImplementedError("Empty selection of inserted axis is not supported")
+                if axis is not None:
+                    index[axis] = selection[el]
+                axes.append(axis)
+                continue
+            try:
+                el = operator.index(el)
+            except TypeError:
+                raise IndexError("Only basic indexing is supported by LazyArray")
+            value = selection[el]
+            if axis is not None:
+                index[axis] = value
+        return self._view(index, axes)
+
+    def transpose(self, *axes) -> "LazyArray":
+        if len(axes) == 1 and isinstance(axes[0], (tuple, list)):
+            axes = axes[0]
+        if not axes:
+            axes = range(self.ndim - 1, -1, -1)
+        axes = [operator.index(x) % self.ndim if self.ndim else 0 for x in axes]
+        if sorted(axes) != list(range(self.ndim)):
+            raise ValueError("axes don't match array")
+        return self._view(list(self._index), [self._axes[x] for x in axes])
+
+    def swapaxes(self, axis1: int, axis2: int) -> "LazyArray":
+        axes = list(range(self.ndim))
+        axes[axis1], axes[axis2] = axes[axis2], axes[axis1]
+        return self.transpose(axes)
+
+    def reshape(self, *shape) -> "LazyArray":
+        """Change shape of array. Only adding or removing axes of size 1 is supported"""
+        if len(shape) == 1 and isinstance(shape[0], (tuple, list)):
+            shape = shape[0]
+        if [x for x in shape if x != 1] != [x for x in self.shape if x != 1]:
+            raise NotImplementedError("LazyArray reshape supports only adding or removing axes of size 1")
+        index = list(self._index)
+        rest = []
+        for axis, size in zip(self._axes, self.shape):
+            if size != 1:
+                rest.append(axis)
+            elif axis is not None:
+                index[axis] = index[axis][0]
+        rest_iter = iter(rest)
+        return self._view(index, [None if x == 1 else next(rest_iter) for x in shape])
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        leading = len(self._base_shape) - self._chunk_ndim
+        kept = [i for i, x in enumerate(self._index) if isinstance(x, range)]
+        result = np.empty([len(self._index[i]) for i in kept], dtype=self.dtype)
+        chunk_index = tuple(_range_to_slice(x) if isinstance(x, range) else x for x in self._index[leading:])
+        leading_kept = [i for i in kept if i < leading]
+        for position in itertools.product(*[x if isinstance(x, range) else [x] for x in self._index[:leading]]):
+            target = tuple(self._index[i].index(position[i]) for i in leading_kept)
+            result[target] = self._read_chunk(position)[chunk_index]
+        result = result.transpose([kept.index(x) for x in self._axes if x is not None]).reshape(self.shape)
+        if dtype is not None:
+            return result.astype(dtype, copy=False)
+        return result
+
+    def __reduce__(self):
+        return np.array, (np.asarray(self),)
+
+    def __repr__(self):
+        return f"LazyArray(shape={self.shape}, dtype={self.dtype})"
@@ -1,7 +1,11 @@
+import argparse
+import json
+import multiprocessing
 import os
 import shutil
 import sys
 import time
+import uuid
 from glob import glob
 
 import numpy as np
@@ -9,13 +13,17 @@ import pandas as pd
 import pytest
 
 from PartSegCore.algorithm_describe_base import ROIExtractionProfile
-from PartSegCore.analysis.batch_processing import batch_backend
+from PartSegCore.analysis import PartEncoder
+from PartSegCore.analysis.batch_processing import batch_backend, batch_cli
 from PartSegCore.analysis.batch_processing.batch_backend import (
+    CalculationJournal,
     CalculationManager,
     CalculationProcess,
+    DataWriter,
     ResponseData,
     do_calculation,
 )
+from PartSegCore.analysis.batch_processing.parallel_backend import BatchManager, BatchWorker
 from PartSegCore.analysis.calculation_plan import (
     Calculation,
     CalculationPlan,
@@ -31,12 +39,13 @@ from PartSegCore.analysis.calculation_plan import (
     Save,
 )
 from PartSegCore.analysis.measurement_base import AreaType, Leaf, MeasurementEntry, Node, PerComponent
-from PartSegCore.analysis.measurement_calculation import MeasurementProfile
+from PartSegCore.analysis.measurement_calculation import ComponentsInfo, MeasurementProfile, MeasurementResult
 from PartSegCore.analysis.save_functions import save_dict
 from PartSegCore.image_operations import RadiusType
 from PartSegCore.io_utils import SaveBase
 from PartSegCore.mask_create import MaskProperty
 from PartSegCore.segmentation.noise_filtering import DimensionType
+from PartSegCore.segmentation.restartable_segmentation_algorithms import ThresholdBaseAlgorithm
 from PartSegCore.universal_const import UNIT_SCALE, Units
 from PartSegImage import Image, ImageWriter, TiffImageReader
 
@@ -628,6 +637,283 @@ class TestCalculationProcess:
         )
         assert df4.shape == (df["Segmentation Components Number"]["count"].sum(), 8)
 
+    def test_segmentation_algorithm_reuse(self, create_test_data, monkeypatch):
+        set_image_calls = []
+        set_image = ThresholdBaseAlgorithm.set_image
+
+        def _set_image(self, image):
+            set_image_calls.append(image)
+            set_image(self, image)
+
+        monkeypatch.setattr(ThresholdBaseAlgorithm, "set_image", _set_image)
+        base_plan = self.create_calculation_plan()
+        mask_node = base_plan.execution_tree.children[0]
+        segmentation_node = mask_node.children[0]
+        segmentation = segmentation_node.operation
+        measurement_node = segmentation_node.children[0]
+
+        def create_segmentation_node(minimum_size, children):
+            values = dict(segmentation.values, minimum_size=minimum_size)
+            profile = ROIExtractionProfile(name="test", algorithm=segmentation.algorithm, values=values)
+            return CalculationTree(profile, children)
+
+        nested = create_segmentation_node(100, [measurement_node])
+        tree = CalculationTree(
+            RootType.Image,
+            [
+                CalculationTree(
+                    mask_node.operation,
+                    [
+                        create_segmentation_node(100, [measurement_node]),
+                        create_segmentation_node(1000, [measurement_node]),
+                        create_segmentation_node(100, [nested, measurement_node]),
+                    ],
+                )
+            ],
+        )
+        plan = CalculationPlan(tree=tree, name="test")
+        calc = Calculation(
+            create_test_data[:1],
+            base_prefix=os.path.dirname(create_test_data[0]),
+            result_prefix=os.path.dirname(create_test_data[0]),
+            measurement_file_path="",
+            sheet_name="Sheet1",
+            calculation_plan=plan,
+            voxel_size=(1, 1, 1),
+        )
+        calc_process = CalculationProcess()
+        res = calc_process.do_calculation(FileCalculation(create_test_data[0], calc))
+        components_num = [x["Segmentation Components Number"][0] for x in res[0].values]
+        assert components_num == [2, 0, 2, 2]
+        # siblings share one instance, nested segmentation need separate one
+        assert len(set_image_calls) == 2
+        assert calc_process.algorithm_dict == {}
+
+
+class TestDataWriter:
+    @staticmethod
+    def create_response(file_name: str, value: int) -> ResponseData:
+        measurement = MeasurementResult(ComponentsInfo(np.arange(1, 2), np.arange(1, 2), {1: [1]}))
+        measurement["Segmentation Volume"] = value, "µm**3", (PerComponent.No, AreaType.ROI)
+        measurement["Segmentation Volume/Mask Volume"] = value / 10, "", (PerComponent.No, AreaType.ROI)
+        measurement["Segmentation Components Number"] = 1, "count", (PerComponent.No, AreaType.ROI)
+        measurement.set_filename(file_name)
+        return ResponseData(file_name, [measurement])
+
+    @pytest.mark.parametrize("ext", [".xlsx", ".csv"])
+    def test_incremental_write(self, tmp_path, ext):
+        file_list = [f"file_{i}.tif" for i in range(7)]
+        calc = Calculation(
+            file_list,
+            base_prefix=str(tmp_path),
+            result_prefix=str(tmp_path),
+            measurement_file_path=str(tmp_path / f"test{ext}"),
+            sheet_name="Sheet1",
+            calculation_plan=TestCalculationProcess.create_calculation_plan(),
+            voxel_size=(1, 1, 1),
+        )
+        writer = DataWriter()
+        writer.add_data_part(calc)
+        file_data = writer.file_dict[calc.measurement_file_path]
+        file_data.write_threshold = 2
+        for i in [1, 0, 3, 2, 5, 4, 6]:
+            writer.add_result(self.create_response(file_list[i], i), calc, ind=i)
+        assert len(file_data.sheet_dict[calc.uuid][0].row_list) == 1
+        assert writer.calculation_finished(calc) == []
+        writer.finish()
+        file_data.write_thread.join()
+        assert not os.path.exists(file_data.parts_path)
+        if ext == ".xlsx":
+            df = pd.read_excel(tmp_path / "test.xlsx", index_col=0, header=[0, 1], engine="openpyxl")
+        else:
+            df = pd.read_csv(tmp_path / "test_Sheet1.csv", index_col=0, header=[0, 1])
+        assert df.shape == (7, 4)
+        assert list(df.index) == list(range(7))
+        assert list(df.iloc[:, 1]) == [0, 1, 2, 3, 4, 5, 6]
+
+
+def multiply_task(value, factor):
+    if value < 0:
+        raise ValueError("negative value")
+    return value * factor
+
+
+class TestBatchManager:
+    @staticmethod
+    def collect_results(manager: BatchManager, timeout=30):
+        res = []
+        start = time.time()
+        while manager.has_work:
+            assert time.time() - start < timeout
+            time.sleep(0.01)
+            res.extend(manager.get_result())
+        return res
+
+    def test_calculation(self):
+        manager = BatchManager()
+        manager.set_number_of_process(2)
+        task_uuid = manager.add_work(list(range(20)) + [-1], 3, multiply_task)
+        res = self.collect_results(manager)
+        assert len(res) == 21
+        assert all(x[0] == task_uuid for x in res)
+        assert sorted(x[1] for x in res if not isinstance(x[1], tuple)) == [x * 3 for x in range(20)]
+        errors = [x[1] for x in res if isinstance(x[1], tuple)]
+        assert len(errors) == 1
+        assert errors[0][0] == -1
+        assert isinstance(errors[0][1][0][0], ValueError)
+        start = time.time()
+        while not manager.finished:
+            assert time.time() - start < 10
+            time.sleep(0.01)
+
+    def test_change_number_of_process(self):
+        manager = BatchManager()
+        manager.set_number_of_process(3)
+        manager.add_work(list(range(100)), 1, multiply_task)
+        manager.set_number_of_process(1)
+        res = self.collect_results(manager)
+        assert sorted(x[1] for x in res) == list(range(100))
+        assert manager.number_off_process <= 1
+        manager.set_number_of_process(2)
+        manager.add_work(list(range(10)), 2, multiply_task)
+        res = self.collect_results(manager)
+        assert sorted(x[1] for x in res) == [x * 2 for x in range(10)]
+
+    def test_no_wakeup_when_idle(self, monkeypatch):
+        manager = BatchManager()
+        manager.set_number_of_process(2)
+        manager.add_work(list(range(10)), 1, multiply_task)
+        self.collect_results(manager)
+        wakeups = []
+        monkeypatch.setattr(manager._wakeup_writer, "send", wakeups.append)
+        for _ in range(10):
+            assert manager.get_result() == []
+        assert wakeups == []
+
+
+class TestBatchWorker:
+    def test_calculation_cache(self):
+        manager_end, worker_end = multiprocessing.Pipe()
+        worker = BatchWorker(worker_end)
+        task_uuid = uuid.uuid4()
+        worker.calculate_task((1, task_uuid, 3, multiply_task))
+        assert manager_end.recv() == (task_uuid, 3)
+        worker.calculate_task((2, task_uuid))
+        assert manager_end.recv() == (task_uuid, 6)
+        assert list(worker.calculation_dict) == [task_uuid]
+
+
+class TestCalculationJournal:
+    @staticmethod
+    def create_calculation(file_list, tmpdir, ext=".xlsx"):
+        return Calculation(
+            file_list,
+            base_prefix=str(tmpdir),
+            result_prefix=str(tmpdir),
+            measurement_file_path=os.path.join(str(tmpdir), "test" + ext),
+            sheet_name="Sheet1",
+            calculation_plan=TestCalculationProcess.create_calculation_plan(),
+            voxel_size=(1, 1, 1),
+        )
+
+    def test_load_store(self, tmp_path):
+        file_list = [f"file_{i}.tif" for i in range(4)]
+        calc = self.create_calculation(file_list, tmp_path)
+        journal = CalculationJournal(calc)
+        assert journal.load() == {}
+        journal.open()
+        journal.add(0, [TestDataWriter.create_response(file_list[0], 0)])
+        journal.add(2, [TestDataWriter.create_response(file_list[2], 2)])
+        journal.close()
+        with open(journal.path, "ab") as f_p:
+            f_p.write(b"\x80\x04\x95")
+        journal2 = CalculationJournal(self.create_calculation(file_list, tmp_path))
+        res = journal2.load()
+        assert set(res) == {0, 2}
+        assert res[2][0].path_to_file == file_list[2]
+        assert res[2][0].values[0]["Segmentation Volume"] == (2, "µm**3")
+        journal2.open()
+        journal2.add(1, [TestDataWriter.create_response(file_list[1], 1)])
+        journal2.close()
+        assert set(CalculationJournal(calc).load()) == {0, 1, 2}
+        assert CalculationJournal(self.create_calculation(file_list[:3], tmp_path)).load() == {}
+        journal2.remove()
+        assert not os.path.exists(journal.path)
+
+    @pytest.mark.parametrize("ext", [".xlsx", ".csv"])
+    def test_resume(self, create_test_data, tmpdir, ext):
+        calc = self.create_calculation(create_test_data, tmpdir, ext)
+        journal = CalculationJournal(calc)
+        journal.load()
+        journal.open()
+        for i in range(5):
+            journal.add(i, [TestDataWriter.create_response(os.path.basename(create_test_data[i]), 100 + i)])
+        journal.close()
+        manager = CalculationManager()
+        manager.set_number_of_workers(2)
+        manager.add_calculation(calc)
+        assert manager.calculation_done == 5
+        start = time.time()
+        while manager.has_work:
+            assert time.time() - start < 30
+            time.sleep(0.1)
+            res = manager.get_results()
+            assert res.errors == []
+        assert manager.calculation_done == 8
+        manager.writer.finish(wait=True)
+        assert not os.path.exists(journal.path)
+        if ext == ".xlsx":
+            df = pd.read_excel(calc.measurement_file_path, index_col=0, header=[0, 1], engine="openpyxl")
+        else:
+            df = pd.read_csv(os.path.join(tmpdir, "test_Sheet1.csv"), index_col=0, header=[0, 1])
+        assert df.shape == (8, 4)
+        assert list(df.iloc[:5, 1]) == [100, 101, 102, 103, 104]
+
+
+class TestBatchCli:
+    def test_load_plan(self, tmp_path):
+        plan = TestCalculationProcess.create_calculation_plan()
+        plan2 = TestCalculationProcess.create_calculation_plan2()
+        with open(tmp_path / "plan.json", "w") as f_p:
+            json.dump(plan, f_p, cls=PartEncoder)
+        with open(tmp_path / "plans.json", "w") as f_p:
+            json.dump({"test": plan, "test2": plan2}, f_p, cls=PartEncoder)
+        assert batch_cli.load_plan(str(tmp_path / "plan.json")).name == plan.name
+        assert batch_cli.load_plan(str(tmp_path / "plans.json"), "test2").name == plan2.name
+        with pytest.raises(ValueError, match="more than one plan"):
+            batch_cli.load_plan(str(tmp_path / "plans.json"))
+        with pytest.raises(ValueError, match="not found"):
+            batch_cli.load_plan(str(tmp_path / "plans.json"), "test3")
+
+    def test_collect_files(self, create_test_data, tmpdir):
+        with open(os.path.join(tmpdir, "list.txt"), "w") as f_p:
+            f_p.write(create_test_data[0] + "\n\n" + create_test_data[1] + "\n")
+        assert batch_cli.collect_files([], os.path.join(tmpdir, "list.txt")) == create_test_data[:2]
+        assert batch_cli.collect_files([os.path.join(tmpdir, "file_*[0-9].tif")]) == sorted(create_test_data)
+        assert batch_cli.collect_files([os.path.join(tmpdir, "**", "*_mask.tif"), create_test_data[0]]) == sorted(
+            [create_test_data[0]] + [x[:-4] + "_mask.tif" for x in create_test_data]
+        )
+
+    @pytest.mark.parametrize("ext", [".xlsx", ".csv"])
+    def test_main(self, create_test_data, tmpdir, ext, capsys):
+        with open(os.path.join(tmpdir, "plan.json"), "w") as f_p:
+            json.dump({"test": TestCalculationProcess.create_calculation_plan()}, f_p, cls=PartEncoder)
+        parser = argparse.ArgumentParser()
+        batch_cli.add_batch_arguments(parser)
+        output = os.path.join(tmpdir, "result", "test" + ext)
+        args = parser.parse_args(
+            [os.path.join(tmpdir, "plan.json"), os.path.join(tmpdir, "file_*[0-9].tif"), "-o", output, "-j", "2"]
+        )
+        assert batch_cli.main(args) == 0
+        captured = capsys.readouterr()
+        assert "[8/8]" in captured.out
+        assert "0 errors" in captured.out
+        if ext == ".xlsx":
+            df = pd.read_excel(output, index_col=0, header=[0, 1], engine="openpyxl")
+        else:
+            df = pd.read_csv(os.path.join(tmpdir, "result", "test_Sheet1.csv"), index_col=0, header=[0, 1])
+        assert df.shape == (8, 4)
+
 
 class MockCalculationProcess(CalculationProcess):
     def do_calculation(self, calculation: FileCalculation):
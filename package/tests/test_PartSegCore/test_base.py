@@ -1,7 +1,10 @@
+import gc
+
 import numpy as np
 import pytest
+import SimpleITK as sitk
 
-from PartSegCore.image_operations import gaussian, median
+from PartSegCore.image_operations import dilate, erode, from_sitk_image, gaussian, median, to_sitk_image
 
 
 class TestImageOperation:
@@ -22,3 +25,63 @@ class TestImageOperation:
         data[slices] = 1
         res = method(data, 2, per_layer)
         assert not np.all(res == data)
+
+    @pytest.mark.parametrize("dims", [3, 4])
+    @pytest.mark.parametrize("method", [gaussian, median, dilate, erode])
+    @pytest.mark.parametrize("per_layer", [True, False])
+    def test_filter_workers(self, dims, method, per_layer):
+        data = (np.random.default_rng(0).random((3,) * (dims - 2) + (10, 10)) * 100).astype(np.uint16)
+        if method in (dilate, erode) and not per_layer:
+            radius = [1, 1, 1]
+        elif method in (dilate, erode):
+            radius = [1, 1]
+        else:
+            radius = 1
+        res = method(data, radius, per_layer, workers=1)
+        assert np.all(method(data, radius, per_layer, workers=3) == res)
+        assert res.shape == data.shape
+        if per_layer:
+            assert res.dtype == data.dtype
+            assert np.all(res[(1,) * (dims - 2)] == method(data[(1,) * (dims - 2)], radius, per_layer))
+
+
+class TestSitkConversion:
+    def test_from_sitk_image(self):
+        data = np.arange(60, dtype=np.uint16).reshape((3, 4, 5))
+        image = sitk.GetImageFromArray(data)
+        array = from_sitk_image(image)
+        del image
+        gc.collect()
+        assert np.all(array == data)
+        assert not array.flags.writeable
+        with pytest.raises(ValueError):
+            array[0, 0, 0] = 7
+        assert np.all(np.copy(array) == data)
+
+    def test_to_sitk_image(self):
+        data = np.arange(60, dtype=np.uint16).reshape((3, 4, 5))
+        assert to_sitk_image(data) is not to_sitk_image(data)
+        image = to_sitk_image(data)
+        assert np.all(sitk.GetArrayViewFromImage(image) == data)
+        array = from_sitk_image(image)
+        assert to_sitk_image(array) is image
+        assert to_sitk_image(array.view()) is image
+        assert to_sitk_image(array[1:]) is not image
+        assert np.all(sitk.GetArrayFromImage(to_sitk_image(array[1:])) == data[1:])
+
+    @pytest.mark.parametrize("method", [dilate, erode, gaussian, median])
+    def test_operation_result_not_shared(self, method):
+        data = np.zeros((4, 10, 10), dtype=np.uint8)
+        data[1:3, 2:8, 2:8] = 5
+        res = method(data, 1, False)
+        assert res.flags.writeable
+        image = to_sitk_image(res)
+        res[...] = 0
+        assert np.any(sitk.GetArrayViewFromImage(image))
+
+    def test_bool_array(self):
+        data = np.zeros((10, 10), dtype=bool)
+        data[2:5, 3:7] = True
+        image = to_sitk_image(data)
+        assert image.GetPixelID() == sitk.sitkUInt8
+        assert np.all(from_sitk_image(image) == data)
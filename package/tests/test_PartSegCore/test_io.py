@@ -6,6 +6,7 @@ import tarfile
 from copy import deepcopy
 from enum import Enum
 from glob import glob
+from io import BytesIO
 
 import h5py
 import numpy as np
@@ -13,17 +14,36 @@ import pandas as pd
 import pytest
 import tifffile
 
-from PartSegCore import UNIT_SCALE, Units
+from PartSegCore import UNIT_SCALE, Units, io_utils
 from PartSegCore.algorithm_describe_base import ROIExtractionProfile
 from PartSegCore.analysis import ProjectTuple
 from PartSegCore.analysis.calculation_plan import CalculationPlan, MaskSuffix, MeasurementCalculate
+from PartSegCore.analysis.io_utils import create_history_element_from_project
 from PartSegCore.analysis.load_functions import LoadProject, UpdateLoadedMetadataAnalysis
 from PartSegCore.analysis.measurement_base import Leaf, MeasurementEntry
 from PartSegCore.analysis.measurement_calculation import MEASUREMENT_DICT, MeasurementProfile
-from PartSegCore.analysis.save_functions import SaveAsNumpy, SaveAsTiff, SaveCmap, SaveProject, SaveXYZ
+from PartSegCore.analysis.save_functions import (
+    SaveAsNumpy,
+    SaveAsTiff,
+    SaveCmap,
+    SavePointCloud,
+    SaveProject,
+    SaveProjectV2,
+    SaveXYZ,
+)
 from PartSegCore.analysis.save_hooks import PartEncoder, part_hook
 from PartSegCore.class_generator import enum_register
-from PartSegCore.io_utils import SaveROIAsNumpy, UpdateLoadedMetadataBase
+from PartSegCore.io_utils import (
+    HistoryArraysBuffer,
+    HistoryElement,
+    SaveROIAsNumpy,
+    TarMemberBuffer,
+    UpdateLoadedMetadataBase,
+    get_tarinfo,
+    load_chunked_array,
+    save_chunked_array,
+    tar_to_buff,
+)
 from PartSegCore.json_hooks import check_loaded_dict
 from PartSegCore.mask.history_utils import create_history_element_from_segmentation_tuple
 from PartSegCore.mask.io_functions import (
@@ -37,10 +57,11 @@ from PartSegCore.mask.io_functions import (
     SaveROI,
     save_components,
 )
+from PartSegCore.roi_info import ROIInfo
 from PartSegCore.segmentation.algorithm_base import AdditionalLayerDescription
 from PartSegCore.segmentation.noise_filtering import DimensionType
 from PartSegCore.segmentation.segmentation_algorithm import ThresholdAlgorithm
-from PartSegImage import Image
+from PartSegImage import Image, ImageWriter
 from PartSegImage.image import reduce_array
 
 
@@ -231,6 +252,43 @@ class TestSegmentationMask:
         seg2 = LoadSegmentation.load([os.path.join(tmpdir, "segmentation.seg")])
         assert seg2 is not None
 
+    @pytest.mark.parametrize("workers", [1, 4])
+    @pytest.mark.parametrize("roi_info_type", ["none", "3d", "4d"])
+    def test_save_components(self, tmp_path, monkeypatch, workers, roi_info_type):
+        data = np.zeros((1, 10, 40, 50, 2), dtype=np.uint16)
+        data[..., 0] = np.arange(50)
+        data[..., 1] = 7
+        image = Image(data, (1, 1, 1), os.path.join(str(tmp_path), "image.tif"), axes_order="TZYXC")
+        roi = np.zeros((10, 40, 50), dtype=np.uint8)
+        roi[2:5, 3:10, 4:20] = 1
+        roi[3:8, 20:30, 10:15] = 2
+        roi[5, 25, 12] = 0
+        roi[1:9, 12:35, 30:45] = 4
+        roi_info = {"none": None, "3d": ROIInfo(roi), "4d": ROIInfo(image.fit_array_to_image(roi))}[roi_info_type]
+        if roi_info_type == "4d":
+            # bounding boxes fit to image, so they are reused
+            monkeypatch.setattr(ROIInfo, "calc_bounds_arrays", lambda roi: pytest.fail("bounds recalculated"))
+        steps = []
+        save_components(
+            image,
+            [1, 2, 3, 4],
+            roi,
+            str(tmp_path / "components"),
+            roi_info,
+            range_changed=lambda x, y: steps.append((x, y)),
+            step_changed=steps.append,
+            workers=workers,
+        )
+        assert steps == [(0, 4), 1, 2, 3, 4]
+        assert len(os.listdir(tmp_path / "components")) == 6
+        roi = image.fit_array_to_image(roi)
+        for num in [1, 2, 4]:
+            expected = image.cut_image(roi == num, replace_mask=True)
+            res = tifffile.imread(str(tmp_path / "components" / f"image_component{num}.tif"))
+            assert np.all(res == np.squeeze(expected.get_image_for_save()))
+            mask = tifffile.imread(str(tmp_path / "components" / f"image_component{num}_mask.tif"))
+            assert np.all(mask == np.squeeze(expected.get_mask_for_save()))
+
     def test_save_segmentation_without_image(self, tmpdir, data_test_dir):
         seg = LoadROIImage.load(
             [os.path.join(data_test_dir, "test_nucleus_1_1.seg")], metadata={"default_spacing": (1, 1, 1)}
@@ -306,6 +364,46 @@ class TestSegmentationMask:
         cmp_dict = {str(k): v for k, v in stack_segmentation1.roi_extraction_parameters.items()}
         assert str(res.history[0].segmentation_parameters["parameters"]) == str(cmp_dict)
 
+    def test_save_project_with_diff_history(self, tmp_path, stack_segmentation1, mask_property):
+        roi = stack_segmentation1.roi
+        history = []
+        states = [(roi, None), (reduce_array(roi, [2, 1, 3], dtype=np.uint8), roi > 0), (roi[::-1].copy(), roi > 1)]
+        for segmentation, mask in states:
+            project = dataclasses.replace(stack_segmentation1, roi=segmentation, mask=mask)
+            history.append(
+                create_history_element_from_segmentation_tuple(
+                    project, mask_property, previous=history[-1] if history else None
+                )
+            )
+        assert isinstance(history[-1].arrays, HistoryArraysBuffer)
+        SaveROI.save(
+            tmp_path / "test1.seg", dataclasses.replace(stack_segmentation1, history=history), {"relative_path": False}
+        )
+        SaveROI.save(
+            tmp_path / "test2.seg",
+            dataclasses.replace(stack_segmentation1, history=history[1:]),
+            {"relative_path": False},
+        )
+        assert not any(el.arrays.loaded for el in history[1:])
+        with tarfile.open(tmp_path / "test1.seg", "r") as tf:
+            assert {"history/arrays_0.npz", "history/diff_1.npz", "history/diff_2.npz"} <= set(tf.getnames())
+            # full arrays are readable by versions which do not support differences
+            for i, (segmentation, mask) in enumerate(states):
+                arrays = np.load(tar_to_buff(tf, f"history/arrays_{i}.npz"))
+                assert np.all(arrays["segmentation"] == segmentation)
+                assert ("mask" in arrays) == (mask is not None)
+        res = LoadSegmentation.load([tmp_path / "test1.seg"])
+        assert len(res.history) == 3
+        assert isinstance(res.history[2].arrays, HistoryArraysBuffer)
+        res2 = LoadSegmentation.load([tmp_path / "test2.seg"])
+        assert len(res2.history) == 2
+        for element, (segmentation, mask) in zip(res.history + res2.history, states + states[1:]):
+            arrays = element.get_arrays()
+            assert np.all(arrays["segmentation"] == segmentation)
+            assert ("mask" in arrays) == (mask is not None)
+            if mask is not None:
+                assert np.all(arrays["mask"] == mask)
+
 
 class TestSaveFunctions:
     @staticmethod
@@ -407,6 +505,30 @@ class TestSaveFunctions:
             assert np.all(np.min(array, axis=0) == np.subtract((15, 55, 15, 60), shift))
             assert np.all(np.max(array, axis=0) == np.subtract((84, 84, 34, 60), shift))
 
+    @pytest.mark.parametrize("separated_objects", [True, False])
+    @pytest.mark.parametrize("clip", [True, False])
+    @pytest.mark.parametrize("ext", [".npy", ".ply"])
+    def test_save_point_cloud(self, tmp_path, analysis_project, separated_objects, clip, ext):
+        parameters = {"channel": 0, "separated_objects": separated_objects, "clip": clip, "component_column": True}
+        SaveXYZ.save(tmp_path / "test1.xyz", analysis_project, parameters)
+        SavePointCloud.save(tmp_path / f"test1{ext}", analysis_project, parameters)
+        names = ["test1"] + (["test1_part1", "test1_part2"] if separated_objects else [])
+        for name in names:
+            if ext == ".npy":
+                array = np.load(tmp_path / f"{name}{ext}")
+            else:
+                header, data = (tmp_path / f"{name}{ext}").read_bytes().split(b"end_header\n")
+                lines = header.decode().splitlines()
+                assert lines[1] == "format binary_little_endian 1.0"
+                types = {"int": "<i4", "ushort": "<u2", "uint": "<u4"}
+                dtype = [(x.split()[2], types[x.split()[1]]) for x in lines if x.startswith("property")]
+                array = np.frombuffer(data, dtype=dtype)
+                assert array.size == int(lines[2].split()[2])
+            assert array.dtype.names == ("x", "y", "z", "value", "component")
+            text = np.loadtxt(tmp_path / f"{name}.xyz", dtype=np.int64, ndmin=2)
+            assert np.all(np.stack([array[x] for x in ("x", "y", "z", "value", "component")], axis=1) == text)
+        assert set(np.unique(array["component"])) == ({2} if separated_objects else {1, 2})
+
     def test_load_old_project(self, data_test_dir):
         load_data = LoadProject.load([os.path.join(data_test_dir, "stack1_component1.tgz")])
         assert np.max(load_data.roi) == 2
@@ -423,6 +545,73 @@ class TestSaveFunctions:
         LoadProject.load([os.path.join(tmpdir, "test1.tgz")])
         # TODO add more
 
+    @pytest.mark.parametrize("ext,compression", [(".tgz", "gz"), (".tbz2", "bz2")])
+    def test_save_project_v1(self, tmp_path, analysis_project, mask_property, ext, compression):
+        history = [create_history_element_from_project(analysis_project, mask_property)]
+        SaveProject.save(tmp_path / f"test1{ext}", dataclasses.replace(analysis_project, history=history))
+        # older PartSeg versions read only compressed files in format 1.1
+        with tarfile.open(tmp_path / f"test1{ext}", f"r:{compression}") as tf:
+            assert json.loads(tf.extractfile("metadata.json").read()) == {"project_version_info": "1.1"}
+            assert "index.json" not in tf.getnames()
+            assert {"image.tif", "segmentation.tif", "mask.tif", "history/arrays_0.npz"}.issubset(tf.getnames())
+        load_data = LoadProject.load([tmp_path / f"test1{ext}"])
+        assert np.all(load_data.image.get_data() == analysis_project.image.get_data())
+        assert np.all(load_data.roi == analysis_project.roi)
+        assert np.all(np.load(load_data.history[0].arrays)["segmentation"] == analysis_project.roi)
+
+    def test_save_project_history(self, tmp_path, analysis_project, mask_property):
+        history = [create_history_element_from_project(analysis_project, mask_property)]
+        project = dataclasses.replace(analysis_project, history=history)
+        SaveProjectV2.save(tmp_path / "test1.partseg", project)
+        with tarfile.open(tmp_path / "test1.partseg", "r:") as tf:
+            index = json.loads(tf.extractfile("index.json").read())
+        assert set(index["arrays"]) == {"image", "roi", "mask"}
+        load_data = LoadProject.load([tmp_path / "test1.partseg"])
+        assert np.all(load_data.image.get_data() == project.image.get_data())
+        assert load_data.image.spacing == project.image.spacing
+        assert np.all(load_data.roi == project.roi)
+        assert load_data.mask.dtype == project.mask.dtype
+        assert np.all(load_data.mask == project.mask)
+        arrays = load_data.history[0].arrays
+        assert isinstance(arrays, TarMemberBuffer)
+        assert not arrays.loaded
+        # save to the same file need to read history before overwrite
+        SaveProjectV2.save(tmp_path / "test1.partseg", load_data)
+        assert arrays.loaded
+        load_data = LoadProject.load([tmp_path / "test1.partseg"])
+        assert np.all(np.load(load_data.history[0].arrays)["segmentation"] == project.roi)
+
+    def test_save_project_buffer(self, analysis_project, mask_property):
+        history = [create_history_element_from_project(analysis_project, mask_property)]
+        buffer = BytesIO()
+        SaveProjectV2.save(buffer, dataclasses.replace(analysis_project, history=history))
+        buffer.seek(0)
+        load_data = LoadProject.load([buffer])
+        assert np.all(load_data.roi == analysis_project.roi)
+        assert not isinstance(load_data.history[0].arrays, TarMemberBuffer)
+        assert np.all(np.load(load_data.history[0].arrays)["mask"] == analysis_project.mask)
+
+    def test_load_project_v1(self, tmp_path, analysis_project):
+        with tarfile.open(tmp_path / "test1.tgz", "w:gz") as tar:
+            for name, data in [
+                ("algorithm.json", json.dumps(analysis_project.algorithm_parameters).encode()),
+                ("metadata.json", json.dumps({"project_version_info": "1.1"}).encode()),
+            ]:
+                buff = BytesIO(data)
+                tar.addfile(get_tarinfo(name, buff), buff)
+            for name, data in [("segmentation.tif", analysis_project.roi), ("mask.tif", analysis_project.mask)]:
+                buff = BytesIO()
+                tifffile.imwrite(buff, data.astype(np.uint8), compress=9)
+                tar.addfile(get_tarinfo(name, buff), buff)
+            buff = BytesIO()
+            ImageWriter.save(analysis_project.image, buff)
+            tar.addfile(get_tarinfo("image.tif", buff), buff)
+        load_data = LoadProject.load([tmp_path / "test1.tgz"])
+        assert np.all(load_data.image.get_data() == analysis_project.image.get_data())
+        assert np.all(load_data.roi == analysis_project.roi)
+        assert np.all(load_data.mask == analysis_project.mask)
+        assert load_data.history == []
+
     def test_save_tiff(self, tmpdir, analysis_project):
         SaveAsTiff.save(os.path.join(tmpdir, "test1.tiff"), analysis_project)
         array = tifffile.imread(os.path.join(tmpdir, "test1.tiff"))
@@ -446,6 +635,57 @@ class TestSaveFunctions:
         assert np.all(array == analysis_project.roi)
 
 
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.float32, bool])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_chunked_array(monkeypatch, dtype, workers):
+    monkeypatch.setattr(io_utils, "ARRAY_CHUNK_SIZE", 1000)
+    array = (np.arange(7 * 30 * 40) % 7).reshape((7, 30, 40)).astype(dtype)
+    buffer = BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        description = save_chunked_array(tar, "array.bin", array[:, ::2], workers=workers)
+        save_chunked_array(tar, "empty.bin", np.zeros((0, 5), dtype=dtype))
+    assert len(description["chunks"]) == int(np.ceil(array[:, ::2].nbytes / 1000))
+    buffer.seek(0)
+    with tarfile.open(fileobj=buffer, mode="r") as tar:
+        res = load_chunked_array(tar, json.loads(json.dumps(description)), workers=workers)
+    assert res.dtype == array.dtype
+    assert np.all(res == array[:, ::2])
+
+
+@pytest.mark.parametrize("interval", [2, 10])
+def test_history_element_diff(monkeypatch, mask_property, interval):
+    monkeypatch.setattr(io_utils, "HISTORY_KEYFRAME_INTERVAL", interval)
+    monkeypatch.setattr(io_utils, "HISTORY_DIFF_BLOCK", 4)
+    roi = np.zeros((4, 20, 20), dtype=np.uint8)
+    roi[:, 2:8, 2:8] = 1
+    roi[:, 10:18, 10:18] = 2
+    roi[1:3, 2:8, 12:18] = 3
+    states = [
+        (roi, None),
+        (roi, roi > 0),
+        (reduce_array(roi, [3, 1], dtype=np.uint8), roi > 0),
+        (np.where(roi == 2, 0, roi).astype(np.uint8), None),
+        (roi.astype(np.uint16), roi > 1),
+        (np.zeros_like(roi), roi > 1),
+        (np.ones((2, 20, 20), dtype=np.uint8), None),
+    ]
+    history = []
+    for segmentation, mask in states:
+        history.append(HistoryElement.create(segmentation, mask, {}, mask_property, history[-1] if history else None))
+    assert isinstance(history[1].arrays, HistoryArraysBuffer)
+    assert isinstance(history[2].arrays, HistoryArraysBuffer) == (interval > 2)
+    # only compressed data are kept in history
+    assert not any(isinstance(x, (np.ndarray, dict)) for x in vars(history[1].arrays).values())
+    for element, (segmentation, mask) in reversed(list(zip(history, states))):
+        for arrays in [element.get_arrays(), np.load(element.arrays)]:
+            assert arrays["segmentation"].dtype == segmentation.dtype
+            assert np.all(arrays["segmentation"] == segmentation)
+            assert ("mask" in arrays) == (mask is not None)
+            if mask is not None:
+                assert np.all(arrays["mask"] == mask)
+        element.arrays.seek(0)
+
+
 def test_json_parameters_mask(stack_segmentation1, tmp_path):
     SaveParametersJSON.save(tmp_path / "test.json", stack_segmentation1)
     load_param = LoadROIParameters.load([tmp_path / "test.json"])
@@ -1,3 +1,5 @@
+import itertools
+
 import numpy as np
 import pytest
 
@@ -181,6 +183,27 @@ class TestCalculateMask:
         mask1 = calculate_mask(MaskProperty(RadiusType.NO, 0, RadiusType.R3D, -1, True, True), mask2, None, (1, 1, 1))
         assert np.all(mask == mask1)
 
+    @pytest.mark.parametrize("fill_holes", [RadiusType.R2D, RadiusType.R3D])
+    @pytest.mark.parametrize("max_holes_size", [-1, 8])
+    def test_save_component_fill_holes_many_components(self, fill_holes, max_holes_size):
+        mask = np.zeros((10, 60, 60), dtype=np.uint16)
+        mask2 = np.copy(mask)
+        expected = np.copy(mask)
+        for i, (x, y) in enumerate(itertools.product(range(0, 60, 6), range(0, 60, 6)), start=1):
+            hole_width = i % 3 + 1
+            mask[2:8, x + 1 : x + 6, y + 1 : y + 6] = i
+            mask2[2:8, x + 1 : x + 6, y + 1 : y + 6] = i
+            mask2[3:7, x + 2 : x + 2 + hole_width, y + 3] = 0
+            # 3d hole has volume 4 * hole_width, 2d holes have area hole_width
+            if fill_holes == RadiusType.R3D and 0 < max_holes_size < 4 * hole_width:
+                expected[mask2 == i] = i
+            else:
+                expected[mask == i] = i
+        mask_property = MaskProperty(RadiusType.NO, 0, fill_holes, max_holes_size, True, False)
+        mask1 = calculate_mask(mask_property, mask2, None, (1, 1, 1), time_axis=None)
+        assert np.all(mask1 == expected)
+        assert np.all(calculate_mask(mask_property, mask2, None, (1, 1, 1), time_axis=None, workers=3) == mask1)
+
     @pytest.mark.xfail(reason="problem with alone pixels")
     def test_save_component_fill_holes_problematic(self):
         mask = np.zeros((12, 12, 12), dtype=np.uint8)
@@ -284,5 +307,31 @@ class TestCalculateMask:
         mask1 = calculate_mask(mp, mask, None, (1, 1, 1))
         assert mask1.shape == mask.shape
 
+    @pytest.mark.parametrize("workers", [1, 3])
+    @pytest.mark.parametrize("time_axis", [0, 1])
+    def test_time_axis_workers(self, workers, time_axis):
+        mask = np.zeros((5, 10, 10, 10), dtype=np.uint8)
+        for i in range(5):
+            mask[i, 2:8, 2:8, 2 + i % 2 : 8] = i + 1
+            mask[i, 3:7, 4:6, 4:6] = 0
+        mask = np.moveaxis(mask, 0, time_axis)
+        old_mask = np.ones(mask.shape, dtype=np.uint8)
+        old_mask[..., 7:] = 0
+        mp = MaskProperty(
+            dilate=RadiusType.R3D,
+            dilate_radius=1,
+            fill_holes=RadiusType.R2D,
+            max_holes_size=-1,
+            save_components=True,
+            clip_to_mask=True,
+        )
+        mask1 = calculate_mask(mp, mask, old_mask, (1, 1, 1), time_axis=time_axis, workers=workers)
+        assert mask1.shape == mask.shape
+        for i in range(5):
+            frame = np.take(mask, i, axis=time_axis)
+            old_frame = np.take(old_mask, i, axis=time_axis)
+            expected = calculate_mask(mp, frame, old_frame, (1, 1, 1), time_axis=None)
+            assert np.all(np.take(mask1, i, axis=time_axis) == expected)
+
 
 # TODO add test with touching boundaries.
@@ -1,16 +1,20 @@
 import itertools
 import os
+import pickle
 from functools import partial, reduce
 from math import isclose, pi
 from operator import eq, lt
 
 import numpy as np
 import pytest
+from scipy import ndimage
+from scipy.spatial.distance import cdist
 from sympy import symbols
 
 from PartSegCore.analysis import load_metadata
 from PartSegCore.analysis.measurement_base import AreaType, Leaf, MeasurementEntry, Node, PerComponent
 from PartSegCore.analysis.measurement_calculation import (
+    Compactness,
     ComponentsInfo,
     ComponentsNumber,
     Diameter,
@@ -19,6 +23,8 @@ from PartSegCore.analysis.measurement_calculation import (
     FirstPrincipalAxisLength,
     MaximumPixelBrightness,
     MeanPixelBrightness,
+    MeasurementCache,
+    MeasurementContext,
     MeasurementProfile,
     MeasurementResult,
     MedianPixelBrightness,
@@ -36,8 +42,15 @@ from PartSegCore.analysis.measurement_calculation import (
     ThirdPrincipalAxisLength,
     Volume,
     Voxels,
+    convex_hull_vertices,
+    extend_slices,
+    farthest_pair_distance,
+    get_components_bounds,
+    line_extreme_points,
 )
-from PartSegCore.autofit import density_mass_center
+from PartSegCore.autofit import bounding_box, density_mass_center, density_moments, find_density_orientation
+from PartSegCore.channel_class import Channel
+from PartSegCore.mask_partition_utils import BorderRim, MaskDistanceSplit
 from PartSegCore.universal_const import UNIT_SCALE, Units
 from PartSegImage import Image
 
@@ -142,6 +155,31 @@ class TestDiameter:
         mask = image.get_channel(0)[0] > 80
         assert Diameter.calculate_property(mask, image.spacing, 1) == 0
 
+    def test_touch_border(self):
+        mask = np.zeros((10, 20, 30), dtype=np.uint8)
+        mask[:, :, :5] = 1
+        assert isclose(Diameter.calculate_property(mask, (2, 1, 1), 1), np.sqrt(18 ** 2 + 19 ** 2 + 4 ** 2))
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_random_shapes(self, seed):
+        rng = np.random.default_rng(seed)
+        mask = ndimage.gaussian_filter(rng.random((15, 30, 30)), 2) > 0.5
+        voxel_size = (3, 1, 1)
+        points = np.transpose(np.nonzero(mask)) * np.array(voxel_size)
+        expected = np.sqrt(np.max(cdist(points, points, "sqeuclidean")))
+        assert isclose(Diameter.calculate_property(mask, voxel_size, 1), expected)
+
+    def test_degenerated_points(self):
+        assert convex_hull_vertices(np.array([[1.0, 2, 3]])).shape == (1, 0)
+        points = np.array([[0, 0, 0], [0, 1, 1], [0, 2, 2], [0, 3, 3], [0, 0, 3]], dtype=float)
+        assert sorted(map(tuple, convex_hull_vertices(points))) == [(0, 0), (0, 3), (3, 3)]
+        assert farthest_pair_distance(points) == 18
+        assert farthest_pair_distance(points[:1]) == 0
+        line = np.zeros((1, 1, 10), dtype=np.uint8)
+        line[0, 0, 2:7] = 1
+        assert Diameter.calculate_property(line, (1, 1, 1), 1) == 4
+        assert line_extreme_points(line).tolist() == [[0, 0, 2], [0, 0, 6]]
+
 
 class TestPixelBrightnessSum:
     def test_parameters(self):
@@ -362,6 +400,44 @@ def test_parameters_pixel_brightness(calc_class):
     assert leaf.channel is None
 
 
+@pytest.mark.parametrize(
+    "calc_class",
+    [
+        Volume,
+        Voxels,
+        PixelBrightnessSum,
+        MinimumPixelBrightness,
+        MaximumPixelBrightness,
+        MeanPixelBrightness,
+        StandardDeviationOfPixelBrightness,
+    ],
+)
+def test_calculate_components(calc_class):
+    image = get_two_components_image()
+    channel = image.get_channel(0)[0].astype(float)
+    segmentation = np.zeros(channel.shape, dtype=np.uint8)
+    segmentation[channel == 50] = 1
+    segmentation[channel == 60] = 3
+    segmentation[5, 5, 5:10] = 3
+    components = np.array([1, 2, 3])
+    kwargs = {"channel": channel, "voxel_size": image.voxel_size, "result_scalar": 1}
+    result = calc_class.calculate_components(segmentation, components, **kwargs)
+    expected = [calc_class.calculate_property(area_array=segmentation == i, **kwargs) for i in components]
+    assert np.allclose(result, expected)
+
+
+def test_get_components_bounds():
+    labels = np.zeros((10, 20), dtype=np.uint8)
+    labels[2:4, 5:8] = 1
+    labels[0:10, 19] = 3
+    bounds = get_components_bounds(labels)
+    assert len(bounds) == 3
+    assert bounds[0] == (slice(2, 4), slice(5, 8))
+    assert bounds[1] is None
+    assert extend_slices(bounds[0], labels.shape) == (slice(1, 5), slice(4, 9))
+    assert extend_slices(bounds[2], labels.shape) == (slice(0, 10), slice(18, 20))
+
+
 class TestMoment:
     def test_parameters(self):
         assert Moment.get_units(3) == symbols("{}") ** 2 * symbols("Pixel_brightness")
@@ -429,6 +505,35 @@ class TestMoment:
         assert np.all(np.array(density_mass_center(image_array[5], spacing[1:])) == np.array((57, 48)))
         assert np.all(np.array(density_mass_center(image_array[5:6], spacing)) == np.array((0, 57, 48)))
 
+    @pytest.mark.parametrize("seed", range(3))
+    def test_density_moments(self, seed):
+        spacing = (3, 1, 0.5)
+        image_array = np.zeros((12, 20, 24))
+        image_array[2:10, 3:17, 5:20] = np.random.default_rng(seed).random((8, 14, 15))
+        points = np.transpose(np.nonzero(np.ones(image_array.shape))) * spacing
+        weights = image_array.flatten()
+        mass, center, second = density_moments(image_array, spacing)
+        assert np.isclose(mass, np.sum(weights))
+        assert np.allclose(center, density_mass_center(image_array, spacing))
+        shifted = points - center
+        assert np.allclose(second, np.dot((shifted * weights[:, np.newaxis]).T, shifted))
+        assert np.isclose(Moment.calculate_property(image_array > 0, image_array, spacing), np.trace(second))
+
+    def test_flat_object(self):
+        spacing = (10, 6, 3)
+        image_array = np.zeros((10, 16, 16))
+        mask = np.ones(image_array.shape)
+        image_array[2, 8, 8] = 1
+        image_array[6, 8, 10] = 1
+        assert Moment.calculate_property(mask, image_array, spacing) == 2 * (20 ** 2 + 3 ** 2)
+
+    def test_bounding_box(self):
+        image_array = np.zeros((10, 16, 16))
+        assert bounding_box(image_array) is None
+        image_array[2, 5, 8] = 1
+        image_array[6, 8, 7] = 1
+        assert bounding_box(image_array) == (slice(2, 7), slice(5, 9), slice(7, 9))
+
 
 class TestMainAxis:
     @pytest.mark.parametrize("method", [FirstPrincipalAxisLength, SecondPrincipalAxisLength, ThirdPrincipalAxisLength])
@@ -500,6 +605,42 @@ class TestMainAxis:
             == result
         )
 
+    @pytest.mark.parametrize("seed", range(3))
+    def test_random_shape(self, seed):
+        spacing = (30, 10, 5)
+        rng = np.random.default_rng(seed)
+        channel = np.zeros((1, 15, 30, 30))
+        channel[0, 2:13, 4:26, 3:28] = rng.random((11, 22, 25)) * 10
+        mask = ndimage.gaussian_filter(rng.random((15, 30, 30)), 2) > 0.5
+        mask[channel[0] == 0] = 0
+        cut_img = np.where(mask, channel[0], 0)
+        orientation_matrix, _ = find_density_orientation(cut_img, spacing, 1)
+        projected = np.dot(np.transpose(np.nonzero(cut_img)) * spacing, orientation_matrix)
+        expected = np.max(projected, axis=0) - np.min(projected, axis=0)
+        for i, method in enumerate((FirstPrincipalAxisLength, SecondPrincipalAxisLength, ThirdPrincipalAxisLength)):
+            assert np.isclose(
+                method.calculate_property(
+                    area_array=mask, channel=channel, voxel_size=spacing, result_scalar=1, _area=AreaType.Mask
+                ),
+                expected[i],
+            )
+
+    def test_binary_channel(self):
+        spacing = (3, 2, 1)
+        channel = np.zeros((1, 8, 16, 20))
+        channel[0, 2:5, 3:10, 4:15] = 1
+        mask = channel[0] > 0
+        orientation_matrix, _ = find_density_orientation(channel[0], spacing, 1)
+        assert np.all(orientation_matrix == np.identity(3))
+        methods = (FirstPrincipalAxisLength, SecondPrincipalAxisLength, ThirdPrincipalAxisLength)
+        for method, expected in zip(methods, (6, 12, 10)):
+            assert (
+                method.calculate_property(
+                    area_array=mask, channel=channel, voxel_size=spacing, result_scalar=1, _area=AreaType.Mask
+                )
+                == expected
+            )
+
 
 class TestSurface:
     def test_parameters(self):
@@ -1752,6 +1893,29 @@ class TestStatisticProfile:
         assert result["LongestMainAxisLength per component"][0][0] == 35 * 50 * UNIT_SCALE[Units.nm.value]
         assert result["LongestMainAxisLength per component"][0][1] == 26 * 50 * UNIT_SCALE[Units.nm.value]
 
+    @pytest.mark.parametrize("method", [Diameter, Surface, Sphericity, Compactness, MedianPixelBrightness])
+    def test_per_component_crop(self, method):
+        image = get_two_components_image()
+        channel = image.get_channel(0)
+        segmentation = np.zeros(channel.shape, dtype=np.uint8)
+        segmentation[channel == 50] = 1
+        segmentation[channel == 60] = 2
+        statistics = [
+            MeasurementEntry(
+                "per component",
+                method.get_starting_leaf().replace_(area=AreaType.ROI, per_component=PerComponent.Yes),
+            )
+        ]
+        profile = MeasurementProfile("statistic", statistics)
+        result = profile.calculate(image, 0, segmentation, result_units=Units.nm)
+        kwargs = {
+            "channel": channel[0].astype(float),
+            "voxel_size": image.voxel_size,
+            "result_scalar": UNIT_SCALE[Units.nm.value],
+        }
+        expected = [method.calculate_property(area_array=segmentation[0] == i, **kwargs) for i in [1, 2]]
+        assert np.allclose(np.array(result["per component"][0], dtype=float), np.array(expected, dtype=float))
+
     def test_all_variants(self, bundle_test_dir):
         """ This test check if all calculations finished, not values. """
         file_path = os.path.join(bundle_test_dir, "measurements_profile.json")
@@ -1810,6 +1974,263 @@ class TestStatisticProfile:
         assert len(result["Mask Volume per component/Mask without ROI Volume per component"][0]) == 1
         assert len(result["Density per component"][0]) == 2
 
+    def test_rim_and_split_calculated_once(self, monkeypatch):
+        calls = {"rim": 0, "split": 0}
+        border_mask, split = BorderRim.border_mask, MaskDistanceSplit.split
+
+        def _border_mask(**kwargs):
+            calls["rim"] += 1
+            return border_mask(**kwargs)
+
+        def _split(**kwargs):
+            calls["split"] += 1
+            return split(**kwargs)
+
+        monkeypatch.setattr(BorderRim, "border_mask", staticmethod(_border_mask))
+        monkeypatch.setattr(MaskDistanceSplit, "split", staticmethod(_split))
+        image = get_two_components_image()
+        image.set_spacing(tuple([x / UNIT_SCALE[Units.nm.value] for x in image.spacing]))
+        image.set_mask(get_two_component_mask())
+        segmentation = np.zeros(image.mask.shape, dtype=np.uint8)
+        segmentation[image.get_channel(0) == 50] = 1
+        segmentation[image.get_channel(0) == 60] = 2
+        rim = {"distance": 200, "units": Units.nm}
+        split_params = {"num_of_parts": 3, "equal_volume": False, "part_selection": 2}
+        leaves = {
+            "rim volume": (RimVolume, rim, PerComponent.Yes),
+            "rim sum": (RimPixelBrightnessSum, rim, PerComponent.Yes),
+            "rim volume total": (RimVolume, rim, PerComponent.No),
+            "split volume": (SplitOnPartVolume, split_params, PerComponent.Yes),
+            "split sum": (SplitOnPartPixelBrightnessSum, split_params, PerComponent.Yes),
+        }
+        statistics = [
+            MeasurementEntry(name, Leaf(method.text_info[0], dict=params, area=AreaType.Mask, per_component=per_comp))
+            for name, (method, params, per_comp) in leaves.items()
+        ]
+        profile = MeasurementProfile("statistic", statistics)
+        result = profile.calculate(image, 0, segmentation, result_units=Units.nm)
+        assert calls == {"rim": 1, "split": 1}
+        kwargs = {
+            "mask": image.mask[0],
+            "channel": image.get_channel(0)[0].astype(float),
+            "voxel_size": image.spacing,
+            "result_scalar": UNIT_SCALE[Units.nm.value],
+        }
+        for name, (method, params, per_comp) in leaves.items():
+            if per_comp == PerComponent.No:
+                continue
+            expected = [method.calculate_property(area_array=segmentation[0] == i, **params, **kwargs) for i in [1, 2]]
+            assert np.allclose(result[name][0], expected)
+            assert result[name][0] != [0, 0]
+
+    def test_measurement_context(self):
+        data = get_two_components_array()
+        image = Image(np.concatenate([data, data * 2], axis=-1), (100, 50, 50), "")
+        image.set_mask(get_two_component_mask())
+        segmentation = np.zeros(image.mask.shape, dtype=np.uint8)
+        segmentation[image.get_channel(0) == 50] = 1
+        segmentation[image.get_channel(0) == 60] = 2
+        statistics = [
+            MeasurementEntry(
+                "Diameter", Diameter.get_starting_leaf().replace_(area=AreaType.ROI, per_component=PerComponent.Yes)
+            ),
+            MeasurementEntry(
+                "Sum",
+                PixelBrightnessSum.get_starting_leaf().replace_(area=AreaType.ROI, per_component=PerComponent.Yes),
+            ),
+            MeasurementEntry(
+                "Axis",
+                FirstPrincipalAxisLength.get_starting_leaf().replace_(area=AreaType.ROI, per_component=PerComponent.No),
+            ),
+            MeasurementEntry(
+                "Distance",
+                Leaf(
+                    name=DistanceMaskSegmentation.text_info[0],
+                    dict={
+                        "distance_from_mask": DistancePoint.Border,
+                        "distance_to_segmentation": DistancePoint.Mass_center,
+                    },
+                    area=AreaType.Mask,
+                    per_component=PerComponent.No,
+                ),
+            ),
+            MeasurementEntry(
+                "Rim volume",
+                Volume.get_starting_leaf().replace_(area=AreaType.Mask_without_ROI, per_component=PerComponent.No),
+            ),
+        ]
+        profile = MeasurementProfile("statistic", statistics)
+        context = MeasurementContext()
+        for channel in [0, 1, 0]:
+            result = profile.calculate(image, channel, segmentation, Units.nm, measurement_context=context)
+            assert list(result.items()) == list(profile.calculate(image, channel, segmentation, Units.nm).items())
+        assert result["Sum"][0] == [655200, 371280]
+        assert isinstance(result["Distance"][0], float)
+        area_cache = context.get(0)
+        assert set(area_cache[("component masks", AreaType.ROI)]) == {1, 2}
+        assert "mask_without_segmentation" in area_cache
+        assert any(isinstance(key, tuple) and key[0] == "border" for key in area_cache)
+        assert context.nbytes > 0
+
+    def test_border_cache_size_per_component(self):
+        data = np.zeros((1, 10, 20, 80, 1), dtype=np.uint8)
+        mask = np.zeros(data.shape[:-1], dtype=np.uint8)
+        mask[0, 1:-1, 1:-1, 1:-1] = 1
+        segmentation = np.zeros(mask.shape, dtype=np.uint8)
+        for i in range(8):
+            segmentation[0, 3:7, 5:15, 3 + i * 9 : 9 + i * 9] = i + 1
+        data[..., 0] = 10 * segmentation
+        image = Image(data, (1, 1, 1), "")
+        image.set_mask(mask)
+        statistics = [
+            MeasurementEntry(
+                "Distance",
+                Leaf(
+                    name=DistanceMaskSegmentation.text_info[0],
+                    dict={
+                        "distance_from_mask": DistancePoint.Border,
+                        "distance_to_segmentation": DistancePoint.Border,
+                    },
+                    area=AreaType.ROI,
+                    per_component=PerComponent.Yes,
+                ),
+            ),
+        ]
+        profile = MeasurementProfile("statistic", statistics)
+        sizes = []
+        for components_num in [2, 8]:
+            context = MeasurementContext()
+            roi = np.where(segmentation <= components_num, segmentation, 0)
+            result = profile.calculate(image, 0, roi, Units.nm, measurement_context=context)
+            assert len(result["Distance"][0]) == components_num
+            area_cache = context.get(0)
+            assert [key for key in area_cache if isinstance(key, tuple) and key[0] == "border"] == [("border", "mask")]
+            sizes.append(len(area_cache))
+        assert sizes[0] == sizes[1]
+
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_time_series(self, workers):
+        data = get_two_components_array()
+        image = Image(np.concatenate([data * (i + 1) for i in range(3)], axis=0), (100, 50, 50), "")
+        image.set_mask(np.stack([get_two_component_mask()] * 3))
+        segmentation = np.zeros(image.mask.shape, dtype=np.uint8)
+        segmentation[image.get_channel(0) > 0] = 1
+        segmentation[:2][image.get_channel(0)[:2] % 60 == 0] = 2
+        statistics = [
+            MeasurementEntry(
+                "Sum",
+                PixelBrightnessSum.get_starting_leaf().replace_(area=AreaType.ROI, per_component=PerComponent.Yes),
+            ),
+            MeasurementEntry(
+                "Moment", Moment.get_starting_leaf().replace_(area=AreaType.ROI, per_component=PerComponent.No)
+            ),
+            MeasurementEntry(
+                "Mask volume", Volume.get_starting_leaf().replace_(area=AreaType.Mask, per_component=PerComponent.No)
+            ),
+        ]
+        profile = MeasurementProfile("statistic", statistics)
+        steps = []
+        result = profile.calculate_time_series(
+            image, 0, segmentation, Units.nm, lambda *args: steps.append(args), steps.append, workers=workers
+        )
+        assert steps[0] == (0, 3)
+        assert sorted(steps[1:]) == [1, 2, 3]
+        assert list(result) == [0, 1, 2]
+        for time in range(3):
+            expected = profile.calculate(image, 0, segmentation, Units.nm, time=time)
+            assert list(result[time].items()) == list(expected.items())
+        assert result[1]["Sum"][0] == [2 * 50 * 14 * 26 * 36, 2 * 60 * 14 * 26 * 17]
+        assert result[2]["Sum"][0] == [3 * (50 * 36 + 60 * 17) * 14 * 26]
+        assert result[1, 2]["Sum"] == 2 * 60 * 14 * 26 * 17
+        assert result[1, 2]["Segmentation component"] == 2
+        with pytest.raises(KeyError):
+            _ = result[2, 2]
+        assert result.get_labels() == ["Time", "Segmentation component", "Sum", "Moment", "Mask volume"]
+        assert [row[:2] for row in result.get_separated()] == [[0, 1], [0, 2], [1, 1], [1, 2], [2, 1]]
+
+    def test_channel_dtype_preserved(self):
+        data = get_two_components_array()
+        data[0, 5:10, 4:8, 3:10] = 1000
+        image = Image(data, (100, 50, 50), "")
+        image_float = image.substitute(data=data.astype(np.float64))
+        segmentation = np.zeros(image.get_channel(0).shape[1:], dtype=np.uint8)
+        segmentation[image.get_channel(0)[0] >= 50] = 1
+        segmentation[image.get_channel(0)[0] == 60] = 2
+        methods = [
+            PixelBrightnessSum,
+            MaximumPixelBrightness,
+            MinimumPixelBrightness,
+            MeanPixelBrightness,
+            MedianPixelBrightness,
+            StandardDeviationOfPixelBrightness,
+            Moment,
+            FirstPrincipalAxisLength,
+        ]
+        statistics = [
+            MeasurementEntry(
+                f"{method.text_info[0]} {per_component.name}",
+                method.get_starting_leaf().replace_(area=AreaType.ROI, per_component=per_component),
+            )
+            for method in methods
+            for per_component in [PerComponent.No, PerComponent.Yes]
+        ]
+        profile = MeasurementProfile("statistic", statistics)
+        result = profile.calculate(image, 0, segmentation, Units.nm)
+        expected = profile.calculate(image_float, 0, segmentation, Units.nm)
+        for key in expected:
+            assert np.allclose(result[key][0], expected[key][0]), key
+        assert isinstance(result["Maximum pixel brightness No"][0], float)
+        assert image.get_channel(0).dtype == np.uint16
+
+    def test_leaf_channel(self):
+        data = get_two_components_array()
+        image = Image(np.concatenate([data, data * 2], axis=-1), (100, 50, 50), "")
+        segmentation = (image.get_channel(0)[0] > 0).astype(np.uint8)
+        statistics = [
+            MeasurementEntry(
+                "Sum", PixelBrightnessSum.get_starting_leaf().replace_(area=AreaType.ROI, per_component=PerComponent.No)
+            ),
+            MeasurementEntry(
+                "Sum channel 2",
+                Leaf(
+                    name=PixelBrightnessSum.text_info[0],
+                    area=AreaType.ROI,
+                    per_component=PerComponent.No,
+                    channel=Channel(1),
+                ),
+            ),
+        ]
+        result = MeasurementProfile("statistic", statistics).calculate(image, 0, segmentation, Units.nm)
+        assert result["Sum channel 2"][0] == 2 * result["Sum"][0]
+
+
+class TestMeasurementCache:
+    def test_get_context(self):
+        cache = MeasurementCache()
+        roi1, roi2, mask = np.zeros(10), np.zeros(10), np.ones(10)
+        context = cache.get_context(roi1, mask)
+        assert cache.get_context(roi1, mask) is context
+        assert cache.get_context(roi2, mask) is not context
+        assert cache.get_context(roi1, None) is not context
+        assert len(cache) == 3
+        cache.invalidate(mask)
+        assert len(cache) == 1
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_memory_limit(self):
+        cache = MeasurementCache(memory_limit=150)
+        roi_list = [np.zeros(10) for _ in range(3)]
+        for roi in roi_list:
+            cache.get_context(roi, None).get(0)["data"] = np.zeros(10)
+        assert len(cache) == 2
+        context = cache.get_context(roi_list[1], None)
+        assert len(cache) == 1
+        assert "data" in context.get(0)
+        cache.memory_limit = 0
+        cache.prune()
+        assert len(cache) == 1
+
 
 # noinspection DuplicatedCode
 class TestMeasurementResult:
@@ -1886,6 +2307,25 @@ class TestMeasurementResult:
         assert storage.get_separated() == [["test.tif", 1, 1, 4, 11], ["test.tif", 2, 1, 5, 3]]
         assert storage.get_labels() == ["File name", "Mask component", "aa", "bb", "cc"]
 
+    def test_pickle(self):
+        info = ComponentsInfo(np.arange(1, 4), np.arange(1, 3), {1: [1], 2: [2], 3: [1]})
+        storage = MeasurementResult(info)
+        storage["aa"] = 1, "", (PerComponent.No, AreaType.ROI)
+        storage["bb"] = list(np.array([4.5, 5, 6])), "np", (PerComponent.Yes, AreaType.ROI)
+        storage["cc"] = [11, 3], "np", (PerComponent.Yes, AreaType.Mask)
+        storage["dd"] = ["a", "b", "c"], "", (PerComponent.Yes, AreaType.ROI)
+        storage.set_filename("test.tif")
+        state = storage.__getstate__()
+        assert isinstance(state["_data_dict"]["bb"], np.ndarray)
+        assert isinstance(state["_data_dict"]["cc"], np.ndarray)
+        assert isinstance(state["_data_dict"]["dd"], list)
+        storage2 = pickle.loads(pickle.dumps(storage))
+        assert isinstance(storage2["bb"][0], list)
+        assert list(storage2.items()) == list(storage.items())
+        assert storage2.get_separated() == storage.get_separated()
+        assert storage2.get_labels() == storage.get_labels()
+        assert storage2.get_units() == storage.get_units()
+
     def test_mask_segmentation_components(self):
         info = ComponentsInfo(np.arange(1, 3), np.arange(1, 3), {1: [1], 2: [2]})
         storage = MeasurementResult(info)
@@ -11,12 +11,17 @@ from PartSegCore.analysis.algorithm_description import analysis_algorithm_dict
 from PartSegCore.analysis.analysis_utils import SegmentationPipeline, SegmentationPipelineElement
 from PartSegCore.analysis.calculate_pipeline import calculate_pipeline
 from PartSegCore.convex_fill import _convex_fill, convex_fill
-from PartSegCore.image_operations import RadiusType
+from PartSegCore.image_operations import RadiusType, to_sitk_image
 from PartSegCore.mask_create import MaskProperty, calculate_mask
 from PartSegCore.roi_info import BoundInfo, ROIInfo
 from PartSegCore.segmentation import SegmentationAlgorithm, algorithm_base
 from PartSegCore.segmentation import restartable_segmentation_algorithms as sa
-from PartSegCore.segmentation.noise_filtering import noise_filtering_dict
+from PartSegCore.segmentation.noise_filtering import (
+    DimensionType,
+    NoiseFilteringBase,
+    noise_filter,
+    noise_filtering_dict,
+)
 from PartSegCore.segmentation.watershed import sprawl_dict
 from PartSegImage import Image
 
@@ -150,6 +155,57 @@ class BaseOneThreshold(BaseThreshold, ABC):  # pylint: disable=W0223
         result = alg.calculation_run(empty)
         self.check_result(result, [96000 + 5 + 72000 + 5], operator.eq, parameters)
 
+    def test_parameters_cache(self, monkeypatch):
+        image = self.get_base_object()
+        alg: sa.ThresholdBaseAlgorithm = self.get_algorithm_class()()
+        parameters = self.get_parameters()
+        alg.set_image(image)
+        alg.set_parameters(**parameters)
+        alg.calculation_run(empty)
+        parameters2 = self.get_parameters()
+        parameters2["threshold"]["values"]["threshold"] += self.get_shift()
+        alg.set_parameters(**parameters2)
+        alg.calculation_run(empty)
+        assert len(alg._threshold_cache) == 2
+
+        def _fail(*_args, **_kwargs):
+            raise AssertionError("result should be taken from cache")
+
+        monkeypatch.setattr(alg, "_threshold", _fail)
+        monkeypatch.setattr(sa.SimpleITK, "ConnectedComponent", _fail)
+        alg.set_parameters(**parameters)
+        result = alg.calculation_run(empty)
+        self.check_result(result, [96000, 72000], operator.eq, parameters)
+        alg.set_parameters(**parameters2)
+        result = alg.calculation_run(empty)
+        self.check_result(result, [192000], operator.eq, parameters2)
+
+        alg.set_mask(None)
+        assert len(alg._threshold_cache) == 0
+
+    def test_cleaned_image_sitk(self):
+        image = self.get_base_object()
+        alg: sa.ThresholdBaseAlgorithm = self.get_algorithm_class()()
+        alg.set_image(image)
+        alg.set_parameters(**self.get_parameters())
+        alg.calculation_run(empty)
+        assert not alg.cleaned_image.flags.writeable
+        assert to_sitk_image(alg.cleaned_image) is alg.cleaned_image_sitk
+        alg.set_image(image)
+        assert alg.cleaned_image is None
+        assert alg.cleaned_image_sitk is None
+
+    def test_parameters_cache_limit(self):
+        image = self.get_base_object()
+        alg: sa.ThresholdBaseAlgorithm = self.get_algorithm_class()()
+        alg.cache_memory_limit = 0
+        parameters = self.get_parameters()
+        alg.set_image(image)
+        alg.set_parameters(**parameters)
+        result = alg.calculation_run(empty)
+        self.check_result(result, [96000, 72000], operator.eq, parameters)
+        assert len(alg._threshold_cache) == 0
+
 
 class TestLowerThreshold(BaseOneThreshold):
     parameters = {
@@ -286,6 +342,24 @@ class BaseFlowThreshold(BaseThreshold, ABC):  # pylint: disable=W0223
         result = alg.calculation_run(empty)
         self.check_result(result, [96000 + 5, 72000 + 5], operator.eq, parameters)
 
+    def test_parameters_cache(self):
+        image = self.get_multiple_part(3)
+        alg = self.get_algorithm_class()()
+        parameters = self.get_parameters()
+        parameters["sprawl_type"] = {"name": "Path", "values": sprawl_dict["Path"].get_default_values()}
+        alg.set_image(image)
+        alg.set_parameters(**parameters)
+        result1 = alg.calculation_run(empty)
+        parameters2 = deepcopy(parameters)
+        parameters2["threshold"]["values"]["base_threshold"]["values"]["threshold"] += self.get_shift()
+        alg.set_parameters(**parameters2)
+        result2 = alg.calculation_run(empty)
+        alg.set_parameters(**parameters)
+        assert np.all(alg.calculation_run(empty).roi == result1.roi)
+        alg.set_parameters(**parameters2)
+        assert np.all(alg.calculation_run(empty).roi == result2.roi)
+        assert len(alg._threshold_cache) == 2
+
     def get_multiple_part(self, parts_num):
         raise NotImplementedError
 
@@ -667,6 +741,48 @@ class TestNoiseFiltering:
         data = get_two_parts_array()[0, ..., 0]
         noise_remove_algorithm.noise_filter(data, (1, 1, 1), noise_remove_algorithm.get_default_values())
 
+    @pytest.mark.parametrize("algorithm_name", noise_filtering_dict.keys())
+    def test_workers(self, algorithm_name):
+        noise_remove_algorithm = noise_filtering_dict[algorithm_name]
+        data = get_two_parts_array()[0, ..., 0]
+        parameters = noise_remove_algorithm.get_default_values()
+        res1 = noise_remove_algorithm.noise_filter(data, (1, 1, 1), parameters)
+        res2 = noise_remove_algorithm.noise_filter(data, (1, 1, 1), parameters, workers=4)
+        assert res1.dtype == res2.dtype
+        assert np.all(res1 == res2)
+
+    def test_filter_without_workers(self):
+        class OldFilter(NoiseFilteringBase):
+            @classmethod
+            def get_name(cls):
+                return "Old"
+
+            @classmethod
+            def get_fields(cls):
+                return []
+
+            @classmethod
+            def noise_filter(cls, channel: np.ndarray, spacing, arguments: dict):
+                return channel + 1
+
+        data = get_two_parts_array()[0, ..., 0]
+        assert np.all(noise_filter(OldFilter, data, (1, 1, 1), {}, workers=4) == data + 1)
+
+    def test_algorithm_workers(self):
+        parameters = dict(TestLowerThreshold.parameters)
+        parameters["noise_filtering"] = {
+            "name": "Gauss",
+            "values": {"dimension_type": DimensionType.Layer, "radius": 1.0},
+        }
+        results = []
+        for workers in (1, 4):
+            alg = sa.LowerThresholdAlgorithm()
+            alg.workers = workers
+            alg.set_image(get_two_parts())
+            alg.set_parameters(**parameters)
+            results.append(alg.calculation_run(empty).roi)
+        assert np.all(results[0] == results[1])
+
 
 class TestConvexFill:
     def test_simple(self):
@@ -782,6 +898,20 @@ class TestSegmentationInfo:
         assert np.all(si.bound_info[1].lower == 2)
         assert np.all(si.bound_info[1].upper == [10 * comp_num - 1, 8])
 
+    def test_bound_arrays(self):
+        data = np.zeros((20, 10), dtype=np.uint8)
+        data[2:8, 2:8] = 1
+        data[12:14, 3:9] = 3
+        si = ROIInfo(data)
+        assert si.bound_arrays.lower.shape == (4, 2)
+        assert si.bound_arrays.upper.shape == (4, 2)
+        assert np.all(si.bound_arrays.present() == [1, 3])
+        assert np.all(si.bound_arrays.lower[3] == [12, 3])
+        assert np.all(si.bound_arrays.upper[3] == [13, 8])
+        assert np.all(si.bound_arrays.box_size()[[0, 2]] == 0)
+        assert np.all(si.bound_arrays.box_size()[1] == [6, 6])
+        assert set(ROIInfo.calc_bounds(data).keys()) == {1, 3}
+
 
 def test_bound_info():
     bi = BoundInfo(lower=np.array([1, 1, 1]), upper=np.array([5, 5, 5]))
@@ -1,9 +1,27 @@
 import itertools
 
 import numpy as np
+import pytest
+from scipy import ndimage
 
-from PartSegCore.segmentation.border_smoothing import IterativeVoteSmoothing, OpeningSmoothing, VoteSmoothing
-from PartSegCore.segmentation.watershed import NeighType
+from PartSegCore.segmentation.border_smoothing import (
+    IterativeVoteSmoothing,
+    OpeningSmoothing,
+    VoteSmoothing,
+    neighbour_count,
+)
+from PartSegCore.segmentation.watershed import NeighType, get_neighbourhood
+
+
+@pytest.mark.parametrize("neighbourhood_type", NeighType.__members__.values())
+@pytest.mark.parametrize("shape", [(10, 15, 20), (1, 15, 20)])
+def test_neighbour_count(neighbourhood_type, shape):
+    data = (np.random.default_rng(0).random(shape) > 0.5).astype(np.uint8)
+    kernel = np.zeros((3, 3, 3), dtype=np.uint8)
+    kernel[tuple((get_neighbourhood(data.squeeze().shape, neighbourhood_type) + 1).T)] = 1
+    res = neighbour_count(data, neighbourhood_type)
+    assert res.dtype == np.uint8
+    assert np.all(res == ndimage.correlate(data, kernel, mode="constant"))
 
 
 class TestVoteSmoothing:
@@ -81,6 +99,18 @@ class TestVoteSmoothing:
         res2[3:-3, 3:-3, 3:-3] = 1
         assert np.all(res2 == res)
 
+    def test_image_border(self):
+        data = np.ones((1, 10, 10), dtype=np.uint8)
+        res = VoteSmoothing.smooth(data, {"neighbourhood_type": NeighType.sides, "support_level": 3})
+        res2 = np.copy(data)
+        for pos in itertools.product([0, -1], repeat=2):
+            res2[(0,) + pos] = 0
+        assert np.all(res == res2)
+        res = VoteSmoothing.smooth(data, {"neighbourhood_type": NeighType.sides, "support_level": 4})
+        res2 = np.zeros(data.shape, dtype=data.dtype)
+        res2[:, 1:-1, 1:-1] = 1
+        assert np.all(res == res2)
+
     def test_square_sides(self):
         data = np.zeros((1, 50, 50), dtype=np.uint8)
         data[:, 2:-2, 2:-2] = 1
@@ -159,6 +189,25 @@ def generate_neighbour_edge(dist, ndim):
 
 
 class TestIterativeVoteSmoothing:
+    def test_image_border(self):
+        data = np.ones((1, 10, 10), dtype=np.uint8)
+        res = IterativeVoteSmoothing.smooth(
+            data, {"neighbourhood_type": NeighType.sides, "support_level": 3, "max_steps": 1}
+        )
+        res2 = np.copy(data)
+        for pos in itertools.product([0, -1], repeat=2):
+            res2[(0,) + pos] = 0
+        assert np.all(res == res2)
+        res = IterativeVoteSmoothing.smooth(
+            data, {"neighbourhood_type": NeighType.sides, "support_level": 3, "max_steps": 3}
+        )
+        res2 = np.copy(data)
+        for pos in itertools.product([0, -1], repeat=2):
+            sign = np.where(np.array(pos) < 0, -1, 1)
+            for shift in generate_neighbour_sides(2, 2):
+                res2[(0,) + calc_cord(pos, sign, shift)] = 0
+        assert np.all(res == res2)
+
     def test_cube_sides_base(self):
         data = np.zeros((50, 50, 50), dtype=np.uint8)
         data[2:-2, 2:-2, 2:-2] = 1
@@ -298,6 +298,10 @@ class TestImageBase:
         im = image.cut_image(mask == 2, replace_mask=True)
         assert np.all(im.mask[:, 1:-1, 1:-1, 1:-1] == 1)
         assert im.shape == self.image_shape((1, 8, 9, 28, 3), axes="TZYXC")
+        bounding_box = tuple(slice(x.min(), x.max() + 1) for x in np.nonzero(mask == 2))
+        im2 = image.cut_image(mask[bounding_box] == 2, replace_mask=True, bounding_box=bounding_box)
+        assert im2.shape == im.shape
+        assert np.all(im2.mask == im.mask)
 
         # Test cutting with list of slices
         points = np.nonzero(mask == 2)
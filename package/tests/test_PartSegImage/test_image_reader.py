@@ -1,3 +1,4 @@
+import gc
 import math
 import os.path
 
@@ -6,7 +7,16 @@ import pytest
 import tifffile
 
 import PartSegData
-from PartSegImage import CziImageReader, GenericImageReader, Image, OifImagReader, TiffImageReader
+from PartSegImage import (
+    CziImageReader,
+    GenericImageReader,
+    Image,
+    ImageWriter,
+    OifImagReader,
+    TiffImageReader,
+    image_reader,
+)
+from PartSegImage.lazy_array import LazyArray
 
 
 class TestImageClass:
@@ -111,3 +121,112 @@ def test_xml2dict():
     """
     data = tifffile.xml2dict(sample_text)
     assert math.isclose(data["level1"]["level2"], 3.5322)
+
+
+class TestLazyTiffRead:
+    @staticmethod
+    def _write_image(path, compress):
+        data = np.arange(3 * 4 * 2 * 10 * 12, dtype=np.uint16).reshape((3, 4, 2, 10, 12))
+        kwargs = {"compression": "zlib"} if compress else {}
+        tifffile.imwrite(path, data, imagej=True, metadata={"axes": "TZCYX"}, **kwargs)
+        return path
+
+    @pytest.mark.parametrize("compress,array_type", [(False, np.memmap), (True, LazyArray)])
+    def test_lazy_read(self, tmp_path, compress, array_type):
+        path = self._write_image(str(tmp_path / "image.tif"), compress)
+        image = TiffImageReader.read_image(path, lazy=True)
+        image_eager = TiffImageReader.read_image(path, lazy=False)
+        assert isinstance(image._image_array, array_type)
+        assert isinstance(image_eager._image_array, np.ndarray)
+        assert image.shape == image_eager.shape
+        assert image.get_ranges() == image_eager.get_ranges()
+        assert np.all(image.get_channel(1) == image_eager.get_channel(1))
+        assert np.all(image.get_layer(2, 3) == image_eager.get_layer(2, 3))
+        cut_area = [slice(1, 2), slice(1, 3), slice(2, 8), slice(3, 9)]
+        assert np.all(image.cut_image(cut_area).get_data() == image_eager.cut_image(cut_area).get_data())
+        mask = np.zeros(image.shape[:-1], dtype=np.uint8)
+        mask[1, 1:3, 2:8, 3:9] = 1
+        mask[1, 2, 3, 4] = 0
+        assert np.all(image.cut_image(mask).get_data() == image_eager.cut_image(mask).get_data())
+        assert np.all(image.get_data() == image_eager.get_data())
+
+    def test_read_only_needed_pages(self, tmp_path, monkeypatch):
+        path = self._write_image(str(tmp_path / "image.tif"), True)
+        # cache of two pages
+        monkeypatch.setattr(TiffImageReader, "page_cache_size", 2 * 10 * 12 * 2)
+        reader = TiffImageReader(lazy=True)
+        image = reader.read(path)
+        read_pages = []
+        asarray = reader.image_file.asarray
+
+        def count_asarray(*args, **kwargs):
+            read_pages.append(kwargs["key"])
+            return asarray(*args, **kwargs)
+
+        reader.image_file.asarray = count_asarray
+        assert image.get_layer(1, 2).shape == (10, 12, 2)
+        assert sorted(read_pages) == [(1 * 4 + 2) * 2, (1 * 4 + 2) * 2 + 1]
+        image.get_layer(1, 2)
+        assert len(read_pages) == 2
+        image_file = reader.image_file
+        del image, reader
+        gc.collect()
+        assert image_file.filehandle.closed
+
+    def test_ranges_lazy(self, tmp_path, monkeypatch):
+        path = self._write_image(str(tmp_path / "image.tif"), True)
+        monkeypatch.setattr(TiffImageReader, "page_cache_size", 2 * 10 * 12 * 2)
+        monkeypatch.setattr(Image, "ranges_sample_layers", 2)
+        reader = TiffImageReader(lazy=True)
+        read_pages = []
+
+        class CountTiffFile(tifffile.TiffFile):
+            def asarray(self, *args, **kwargs):
+                read_pages.append(kwargs["key"])
+                return super().asarray(*args, **kwargs)
+
+        monkeypatch.setattr(image_reader, "TiffFile", CountTiffFile)
+        image = reader.read(path)
+        assert read_pages == []
+        ranges = image.get_ranges()
+        # first and last layer, two channels each
+        assert sorted(read_pages) == [0, 1, 22, 23]
+        assert ranges == [(0, 11 * 240 + 119), (120, 11 * 240 + 239)]
+        assert image.get_ranges() == ranges
+        assert len(read_pages) == 4
+
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_ranges_exact(self, tmp_path, monkeypatch, compress):
+        data = np.zeros((3, 4, 2, 10, 12), dtype=np.uint16)
+        data[1, 2, 0, 5, 5] = 1000
+        path = str(tmp_path / "image.tif")
+        tifffile.imwrite(path, data, imagej=True, metadata={"axes": "TZCYX"}, compression="zlib" if compress else None)
+        monkeypatch.setattr(Image, "ranges_sample_layers", 2)
+        image = TiffImageReader.read_image(path, lazy=True)
+        if compress:
+            # estimated from first and last layer
+            assert image.get_ranges() == [(0, 0), (0, 0)]
+        else:
+            # memory mapped data are reduced layer by layer
+            assert image.get_ranges() == [(0, 1000), (0, 0)]
+        assert image.get_ranges(exact=True) == [(0, 1000), (0, 0)]
+        ImageWriter.save(image, tmp_path / "image2.tif")
+        assert TiffImageReader.read_image(tmp_path / "image2.tif").get_ranges() == [(0, 1000), (0, 0)]
+
+    def test_ranges_recalculated_after_read(self, tmp_path, monkeypatch):
+        data = np.zeros((3, 4, 2, 10, 12), dtype=np.uint16)
+        data[1, 2, 1, 5, 5] = 1000
+        path = str(tmp_path / "image.tif")
+        tifffile.imwrite(path, data, imagej=True, metadata={"axes": "TZCYX"}, compression="zlib")
+        monkeypatch.setattr(Image, "ranges_sample_layers", 2)
+        image = TiffImageReader.read_image(path, lazy=True)
+        assert image.get_ranges() == [(0, 0), (0, 0)]
+        image.get_data()
+        assert image.get_ranges() == [(0, 0), (0, 1000)]
+
+    def test_auto_lazy(self, tmp_path, monkeypatch):
+        path = self._write_image(str(tmp_path / "image.tif"), False)
+        assert isinstance(TiffImageReader.read_image(path)._image_array, np.ndarray)
+        assert not isinstance(TiffImageReader.read_image(path)._image_array, np.memmap)
+        monkeypatch.setattr(TiffImageReader, "lazy_size_limit", 100)
+        assert isinstance(TiffImageReader.read_image(path)._image_array, np.memmap)
@@ -0,0 +1,86 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from PartSegImage.lazy_array import LazyArray
+
+
+@pytest.fixture
+def data():
+    return np.arange(2 * 3 * 4 * 5 * 6).reshape((2, 3, 4, 5, 6))
+
+
+@pytest.fixture
+def read_list():
+    return []
+
+
+@pytest.fixture
+def lazy_array(data, read_list):
+    def read_chunk(index):
+        read_list.append(index)
+        return data[index]
+
+    return LazyArray(read_chunk, data.shape, data.dtype, 2)
+
+
+def test_base_properties(lazy_array, data, read_list):
+    assert lazy_array.shape == data.shape
+    assert lazy_array.ndim == data.ndim
+    assert lazy_array.dtype == data.dtype
+    assert lazy_array.size == data.size
+    assert lazy_array.nbytes == data.nbytes
+    assert len(lazy_array) == 2
+    assert not read_list
+    assert np.all(np.asarray(lazy_array) == data)
+    assert len(read_list) == 2 * 3 * 4
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        1,
+        (slice(None), 2),
+        (Ellipsis, 3),
+        (0, Ellipsis, slice(1, 4), 2),
+        (slice(None, None, -1), None, slice(1, None, 2)),
+        (-1, slice(2, 0, -1), 3, None, slice(None), -2),
+    ],
+)
+def test_indexing(lazy_array, data, key):
+    assert lazy_array[key].shape == data[key].shape
+    assert np.all(np.asarray(lazy_array[key]) == data[key])
+
+
+def test_read_only_needed_chunks(lazy_array, data, read_list):
+    res = np.asarray(lazy_array[1, 1:3, 2, 1:3])
+    assert np.all(res == data[1, 1:3, 2, 1:3])
+    assert read_list == [(1, 1, 2), (1, 2, 2)]
+
+
+def test_axes_operations(lazy_array, data, read_list):
+    assert np.all(np.asarray(np.moveaxis(lazy_array, [0, 1], [3, 4])) == np.moveaxis(data, [0, 1], [3, 4]))
+    assert np.all(np.asarray(np.swapaxes(lazy_array, 1, 4)) == np.swapaxes(data, 1, 4))
+    assert np.all(np.asarray(lazy_array.transpose()) == data.transpose())
+    assert np.all(np.asarray(np.reshape(lazy_array[:1], (3, 1, 4, 5, 6, 1))) == data[:1].reshape((3, 1, 4, 5, 6, 1)))
+    read_list.clear()
+    np.asarray(np.moveaxis(lazy_array, 0, -1)[..., 1])
+    assert len(read_list) == 3 * 4
+    with pytest.raises(NotImplementedError):
+        lazy_array.reshape((6, 4, 5, 6))
+
+
+def test_unsupported_indexing(lazy_array):
+    with pytest.raises(IndexError):
+        lazy_array[[0, 1]]
+    with pytest.raises(IndexError):
+        lazy_array[0, 0, 0, 0, 0, 0]
+    with pytest.raises(IndexError):
+        lazy_array[5]
+
+
+def test_pickle(lazy_array, data):
+    res = pickle.loads(pickle.dumps(lazy_array[1]))
+    assert isinstance(res, np.ndarray)
+    assert np.all(res == data[1])